@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AnalyticsmanagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.analyticsmanagement'
+
+    def ready(self):
+        from apps.contentmanagement.caching import content_changed
+        from .rollup import refresh_after_content_change
+        content_changed.connect(refresh_after_content_change)
@@ -0,0 +1,94 @@
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.analyticsmanagement.views import build_analytics_summary, build_content_analytics
+from apps.contentmanagement.models import ContentItem, ContentPage
+
+
+def legacy_summary():
+    # The per-metric COUNT queries the summary endpoint used to run
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    ContentItem.objects.count()
+    ContentItem.objects.filter(status=ContentItem.STATUS_PUBLISHED).count()
+    ContentItem.objects.filter(
+        status__in=[ContentItem.STATUS_FOR_APPROVAL, ContentItem.STATUS_FOR_PUBLISHING]
+    ).count()
+    ContentPage.objects.count()
+    ContentItem.objects.filter(created_at__gte=thirty_days_ago).count()
+
+
+def legacy_content():
+    # One COUNT per status, then a lazy published_by load per recent item
+    for status_choice, _ in ContentItem.STATUS_CHOICES:
+        ContentItem.objects.filter(status=status_choice).count()
+    for item in ContentItem.objects.filter(status=ContentItem.STATUS_PUBLISHED).order_by('-published_at')[:10]:
+        item.published_by.username if item.published_by else None
+
+
+class Command(BaseCommand):
+    help = 'Compare query counts and latency of the analytics endpoints before/after aggregation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>10} {'endpoint':<10} {'impl':<8} {'queries':>7} {'ms':>10}")
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the benchmark leaves the database untouched.
+        with transaction.atomic():
+            seeded = ContentItem.objects.count()
+            for size in sorted(options['sizes']):
+                if size > seeded:
+                    self._seed(seeded, size)
+                    seeded = size
+                for endpoint, legacy, current in (
+                    ('summary', legacy_summary, async_to_sync(build_analytics_summary)),
+                    ('content', legacy_content, async_to_sync(build_content_analytics)),
+                ):
+                    for impl, func in (('legacy', legacy), ('current', current)):
+                        queries, ms = self._measure(func, options['repeat'])
+                        self.stdout.write(f"{seeded:>10} {endpoint:<10} {impl:<8} {queries:>7} {ms:>10.2f}")
+            transaction.set_rollback(True)
+
+    def _seed(self, start, stop, batch_size=5000):
+        statuses = [choice for choice, _ in ContentItem.STATUS_CHOICES]
+        now = timezone.now()
+        run = f'benchmark-{now.timestamp():.0f}-{start}'
+        for offset in range(start, stop, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, stop)):
+                status = statuses[i % len(statuses)]
+                batch.append(ContentItem(
+                    title='Benchmark item',
+                    # the age bucket in the slug lets us backdate created_at below
+                    slug=f'{run}-d{i % 9}-{i}',
+                    status=status,
+                    published_at=now - timedelta(minutes=i) if status == ContentItem.STATUS_PUBLISHED else None,
+                    is_deleted=status == ContentItem.STATUS_DELETED,
+                ))
+            ContentItem.objects.bulk_create(batch)
+        # Spread creation dates over ~90 days so the 30-day window is selective,
+        # and treat the rows as settled history rather than fresh edits
+        for bucket in range(9):
+            ContentItem.objects.filter(slug__startswith=f'{run}-d{bucket}-').update(
+                created_at=now - timedelta(days=bucket * 10 + 1),
+                updated_at=now - timedelta(days=bucket * 10 + 1),
+            )
+
+    def _measure(self, func, repeat):
+        # Warm up first so the rollup catch-up after seeding is not counted
+        func()
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        queries = len(ctx)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return queries, (time.perf_counter() - start) * 1000 / repeat
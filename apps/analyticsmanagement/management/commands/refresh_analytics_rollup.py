@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.analyticsmanagement.rollup import refresh_rollup
+
+
+class Command(BaseCommand):
+    help = 'Fold ContentItem changes since the last run into the daily analytics rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the rollup from scratch instead of from the high-water mark',
+        )
+
+    def handle(self, *args, **options):
+        days = refresh_rollup(full=options['full'])
+        if days is None:
+            self.stdout.write(self.style.SUCCESS('Analytics rollup rebuilt.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Analytics rollup refreshed ({days} day(s) recomputed).'))
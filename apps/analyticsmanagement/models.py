@@ -1,3 +1,35 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class ContentDailyRollup(models.Model):
+    """ContentItem counts per creation day, current status and creator.
+
+    Maintained incrementally by ``apps.analyticsmanagement.rollup`` so the
+    dashboards read O(days) rows instead of scanning the content table.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=32)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    item_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        indexes = [
+            models.Index(fields=['day', 'status'], name='rollup_day_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.item_count}"
+
+
+class RollupState(models.Model):
+    """High-water mark (max ContentItem.updated_at folded in) per rollup."""
+    name = models.CharField(max_length=64, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
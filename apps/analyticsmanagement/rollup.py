@@ -0,0 +1,130 @@
+"""Incremental refresh of ContentDailyRollup.
+
+Each refresh looks only at ContentItems whose ``updated_at`` moved past the
+stored high-water mark, collects the creation days they belong to and
+recomputes just those days. A status change therefore moves an item between
+buckets without touching the rest of the table.
+
+Every ContentItem write triggers a refresh once its transaction commits
+(``refresh_after_content_change``, connected to ``content_changed``), so the
+dashboard only ever reads the rollup. ``manage.py refresh_analytics_rollup``
+does the same by hand or from cron.
+
+Hard deletes (e.g. from the Django admin) do not bump ``updated_at``; run
+``manage.py refresh_analytics_rollup --full`` after purging rows.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.contentmanagement.models import ContentItem
+
+from .models import ContentDailyRollup, RollupState
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'content_daily'
+
+# The mark never advances past "now - SETTLE" so rows committed slightly late
+# by a concurrent transaction are still picked up by the next refresh;
+# recomputing a day is idempotent.
+SETTLE = timedelta(seconds=5)
+
+
+def _grouped(queryset):
+    return (
+        queryset.annotate(day=TruncDate('created_at'))
+        .values('day', 'status', 'created_by')
+        .annotate(item_count=Count('id'))
+        .order_by()
+    )
+
+
+def _created_on(days):
+    """Q matching items created on any of ``days``, one range per run of consecutive days."""
+    tz = timezone.get_current_timezone()
+    condition = Q()
+    run_start = previous = days[0]
+    for day in days[1:] + [None]:
+        if day is not None and day == previous + timedelta(days=1):
+            previous = day
+            continue
+        condition |= Q(
+            created_at__gte=datetime.combine(run_start, time.min, tzinfo=tz),
+            created_at__lt=datetime.combine(previous + timedelta(days=1), time.min, tzinfo=tz),
+        )
+        run_start = previous = day
+    return condition
+
+
+def refresh_rollup(full=False, wait=True):
+    """Fold changes since the last refresh into the rollup.
+
+    Returns the number of days recomputed (None for a full rebuild). With
+    ``wait=False`` a refresh already running elsewhere is left to finish and
+    0 is returned straight away.
+    """
+    RollupState.objects.get_or_create(name=ROLLUP_NAME)
+    with transaction.atomic():
+        # The row lock serialises concurrent refreshes from several workers
+        state = (
+            RollupState.objects.select_for_update(skip_locked=not wait)
+            .filter(name=ROLLUP_NAME).first()
+        )
+        if state is None:
+            return 0
+        full = full or state.high_water_mark is None
+        refresh_started = timezone.now()
+
+        if full:
+            changed = ContentItem.objects.all()
+            days = None
+            ContentDailyRollup.objects.all().delete()
+            source = ContentItem.objects.all()
+        else:
+            changed = ContentItem.objects.filter(updated_at__gt=state.high_water_mark)
+            days = sorted(set(
+                changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True).order_by()
+            ))
+            if not days:
+                return 0
+            ContentDailyRollup.objects.filter(day__in=days).delete()
+            # Only the changed days, not everything between the first and last
+            source = ContentItem.objects.filter(_created_on(days))
+        latest_change = changed.aggregate(mark=Max('updated_at'))['mark']
+
+        ContentDailyRollup.objects.bulk_create(
+            [
+                ContentDailyRollup(
+                    day=row['day'],
+                    status=row['status'],
+                    created_by_id=row['created_by'],
+                    item_count=row['item_count'],
+                )
+                for row in _grouped(source).iterator()
+            ],
+            batch_size=1000,
+        )
+
+        if latest_change is not None:
+            mark = min(latest_change, refresh_started - SETTLE)
+            state.high_water_mark = max(filter(None, [state.high_water_mark, mark]))
+        elif state.high_water_mark is None:
+            state.high_water_mark = refresh_started - SETTLE
+        state.refreshed_at = timezone.now()
+        state.save(update_fields=['high_water_mark', 'refreshed_at'])
+        return None if full else len(days)
+
+
+def refresh_after_content_change(sender, **kwargs):
+    # Runs after the write committed; a failed refresh must not fail the
+    # request, and the next one picks the change up from the high-water mark.
+    try:
+        refresh_rollup()
+    except Exception:
+        logger.exception('Analytics rollup refresh failed')
@@ -1,3 +1,172 @@
-from django.test import TestCase
+import gzip
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.contentmanagement.models import ContentItem
+
+from .models import ContentDailyRollup, RollupState
+from . import rollup
+from .rollup import ROLLUP_NAME, refresh_rollup
+from .views import accepts_gzip
+
+
+def make_item(days_ago, status=ContentItem.STATUS_FOR_EDITING):
+    created = timezone.now() - timedelta(days=days_ago)
+    item = ContentItem.objects.create(title=f'Item {days_ago}', status=status)
+    # auto_now_add ignores the value passed to create()
+    ContentItem.objects.filter(pk=item.pk).update(created_at=created, updated_at=created)
+    return item
+
+
+def counts(days_ago):
+    day = timezone.localdate() - timedelta(days=days_ago)
+    return {row.status: row.item_count for row in ContentDailyRollup.objects.filter(day=day)}
+
+
+class RollupRefreshTests(TestCase):
+
+    def setUp(self):
+        self.items = {days_ago: make_item(days_ago) for days_ago in (10, 5, 1)}
+        refresh_rollup(full=True)
+
+    def test_recomputes_only_the_changed_days(self):
+        # A day in between that did not change keeps whatever row it has
+        ContentDailyRollup.objects.filter(day=timezone.localdate() - timedelta(days=5)).update(item_count=99)
+        ContentItem.objects.filter(pk__in=[self.items[10].pk, self.items[1].pk]).update(
+            status=ContentItem.STATUS_PUBLISHED, updated_at=timezone.now(),
+        )
+
+        self.assertEqual(refresh_rollup(), 2)
+        self.assertEqual(counts(10), {ContentItem.STATUS_PUBLISHED: 1})
+        self.assertEqual(counts(1), {ContentItem.STATUS_PUBLISHED: 1})
+        self.assertEqual(counts(5), {ContentItem.STATUS_FOR_EDITING: 99})
+
+    def test_nothing_changed(self):
+        self.assertEqual(refresh_rollup(), 0)
+
+    def test_content_writes_refresh_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = ContentItem.objects.create(title='New')
+            self.assertEqual(counts(0), {})
+        self.assertEqual(counts(0), {ContentItem.STATUS_FOR_EDITING: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ContentItem.bulk_transition([item.pk], 'send_for_approval')
+        self.assertEqual(counts(0), {ContentItem.STATUS_FOR_APPROVAL: 1})
+
+    def test_failed_refresh_does_not_fail_the_write(self):
+        with mock.patch.object(rollup, 'refresh_rollup', side_effect=DatabaseError('locked')):
+            with self.assertLogs('apps.analyticsmanagement.rollup', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    ContentItem.objects.create(title='New')
+        self.assertTrue(ContentItem.objects.filter(title='New').exists())
+
+    def test_dashboard_reads_do_not_write(self):
+        make_item(0)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('analyst'))
+        for url in ('/api/analytics/summary/', '/api/analytics/content/', '/api/analytics/users/'):
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(url).status_code, 200)
+            writes = [q['sql'] for q in queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+            self.assertEqual(writes, [])
+        # The item made above is left for the next refresh
+        self.assertEqual(counts(0), {})
+
+
+class RollupLockTests(TransactionTestCase):
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_refresh_without_wait_skips_a_running_refresh(self):
+        RollupState.objects.create(name=ROLLUP_NAME)
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    RollupState.objects.select_for_update().get(name=ROLLUP_NAME)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        try:
+            locked.wait(10)
+            self.assertEqual(refresh_rollup(wait=False), 0)
+        finally:
+            release.set()
+            holder.join()
+        self.assertIsNone(RollupState.objects.get(name=ROLLUP_NAME).refreshed_at)
+
+
+class AcceptsGzipTests(SimpleTestCase):
+
+    def test_q_values(self):
+        cases = {
+            '': False,
+            'gzip': True,
+            'gzip, deflate, br': True,
+            'br;q=1.0, gzip;q=0.5': True,
+            'gzip;q=0': False,
+            'gzip;q=0.000, identity': False,
+            'GZIP; Q=0.8': True,
+            'x-gzip': True,
+            '*': True,
+            '*;q=0': False,
+            'gzip;q=0, *': False,
+            'deflate, identity': False,
+            'gzip;q=nonsense': False,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertIs(accepts_gzip(header), expected)
+
+
+class DownloadReportTests(TestCase):
+
+    def setUp(self):
+        make_item(1)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('analyst'))
+
+    def download(self, accept_encoding):
+        response = self.client.get(
+            '/api/analytics/download-report', {'output': 'csv'}, HTTP_ACCEPT_ENCODING=accept_encoding,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        return response, b''.join(response.streaming_content)
+
+    def test_gzip_when_accepted(self):
+        response, body = self.download('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'Item 1', gzip.decompress(body))
+
+    def test_plain_when_gzip_is_refused(self):
+        response, body = self.download('gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'Item 1', body)
+
+    async def test_streams_chunk_by_chunk_under_asgi(self):
+        # A sync iterator would be read into memory whole by the ASGI handler
+        token = await sync_to_async(AccessToken.for_user)(await User.objects.aget(username='analyst'))
+        response = await self.async_client.get(
+            '/api/analytics/download-report', {'output': 'csv'},
+            headers={'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b'Item 1', gzip.decompress(body))
@@ -6,4 +6,7 @@ urlpatterns = [
     path('summary/', views.get_analytics_summary, name='analytics-summary-detail'),
     path('content/', views.get_content_analytics, name='content-analytics'),
     path('users/', views.get_user_activity_analytics, name='user-analytics'),
+    # The frontend requests this without a trailing slash
+    path('download-report', views.download_report, name='analytics-download-report'),
+    path('download-report/', views.download_report),
 ]
\ No newline at end of file
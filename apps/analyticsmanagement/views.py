@@ -1,114 +1,269 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, Trunc
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 from apps.contentmanagement.models import ContentItem, ContentPage
 from django.contrib.auth import get_user_model
+from apps.authentication.asyncapi import async_api_view
+from utils.streaming import streaming_content
+from .models import ContentDailyRollup
+from . import exports
 
+GRANULARITIES = ('day', 'week', 'month')
 
-@api_view(['GET'])
-def get_analytics_summary(request):
-    """Get basic analytics summary for the content management system."""
-    try:
-        # Calculate content metrics
-        total_content_items = ContentItem.objects.count()
-        published_content = ContentItem.objects.filter(status=ContentItem.STATUS_PUBLISHED).count()
-        content_in_review = ContentItem.objects.filter(
+
+async def cached_analytics(key, builder, *args):
+    """Serve dashboard data from the cache for ANALYTICS_CACHE_SECONDS."""
+    timeout = getattr(settings, 'ANALYTICS_CACHE_SECONDS', 30)
+    if timeout <= 0:
+        return await builder(*args)
+    cache_key = ':'.join(['analytics', key] + [str(arg) for arg in args])
+    data = await cache.aget(cache_key)
+    if data is None:
+        data = await builder(*args)
+        await cache.aset(cache_key, data, timeout)
+    return data
+
+
+def parse_report_params(request):
+    """Read ?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week|month.
+
+    Raises ValueError with a readable message on bad input.
+    """
+    params = request.query_params
+    start = parse_date(params['start']) if params.get('start') else None
+    end = parse_date(params['end']) if params.get('end') else None
+    if (params.get('start') and start is None) or (params.get('end') and end is None):
+        raise ValueError('start and end must be dates in YYYY-MM-DD format')
+    granularity = params.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    return start, end, granularity
+
+
+def rollup_rows(start=None, end=None):
+    """Rollup rows for items created between start and end (inclusive).
+
+    Reads only: ContentItem writes refresh the rollup once they commit (see
+    ``rollup.refresh_after_content_change``).
+    """
+    rows = ContentDailyRollup.objects.all()
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+    return rows
+
+
+def _item_sum(condition=None):
+    return Coalesce(Sum('item_count', filter=condition), 0)
+
+
+async def build_analytics_summary(start=None, end=None):
+    thirty_days_ago = timezone.localdate() - timedelta(days=30)
+    rows = rollup_rows(start, end)
+    summary = await rows.aaggregate(
+        total_content_items=_item_sum(),
+        published_content=_item_sum(Q(status=ContentItem.STATUS_PUBLISHED)),
+        content_in_review=_item_sum(Q(
             status__in=[ContentItem.STATUS_FOR_APPROVAL, ContentItem.STATUS_FOR_PUBLISHING]
-        ).count()
-        
-        # Calculate content pages metrics
-        total_content_pages = ContentPage.objects.count()
-        
-        # Calculate recent activity (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recently_created = ContentItem.objects.filter(created_at__gte=thirty_days_ago).count()
-        
-        data = {
-            'summary': {
-                'total_content_items': total_content_items,
-                'published_content': published_content,
-                'content_in_review': content_in_review,
-                'total_content_pages': total_content_pages,
-                'recently_created': recently_created,
-                'timestamp': timezone.now().isoformat(),
-            }
+        )),
+        recently_created=_item_sum(Q(day__gte=thirty_days_ago)),
+    )
+    summary['total_content_pages'] = await ContentPage.objects.acount()
+    summary['timestamp'] = timezone.now().isoformat()
+    return {'summary': summary}
+
+
+async def build_content_analytics(start=None, end=None, granularity='day'):
+    rows = rollup_rows(start, end)
+    counts = await rows.aaggregate(**{
+        status_choice: _item_sum(Q(status=status_choice))
+        for status_choice, _ in ContentItem.STATUS_CHOICES
+    })
+    content_by_status = {
+        status_choice: {'label': status_label, 'count': counts[status_choice]}
+        for status_choice, status_label in ContentItem.STATUS_CHOICES
+    }
+
+    # Items created per period, broken down by current status
+    series = {}
+    periods = (
+        rows.annotate(period=Trunc('day', granularity))
+        .values('period', 'status')
+        .annotate(count=Sum('item_count'))
+        .order_by('period')
+    )
+    async for row in periods:
+        bucket = series.setdefault(row['period'], {'period': row['period'].isoformat(), 'total': 0, 'by_status': {}})
+        bucket['by_status'][row['status']] = row['count']
+        bucket['total'] += row['count']
+
+    # is_deleted=False matches the partial published-feed index
+    published_items = ContentItem.objects.filter(
+        is_deleted=False, status=ContentItem.STATUS_PUBLISHED
+    ).select_related('published_by').only(
+        'id', 'title', 'published_at', 'published_by__username'
+    ).order_by('-published_at')[:10]
+    recently_published = [
+        {
+            'id': item.id,
+            'title': item.title,
+            'published_at': item.published_at.isoformat() if item.published_at else None,
+            'published_by': item.published_by.username if item.published_by else None
         }
+        async for item in published_items
+    ]
+
+    return {
+        'content_by_status': content_by_status,
+        'granularity': granularity,
+        'series': list(series.values()),
+        'recently_published': recently_published,
+        'timestamp': timezone.now().isoformat(),
+    }
+
+
+@async_api_view(['GET'])
+async def get_analytics_summary(request):
+    """Get basic analytics summary for the content management system."""
+    try:
+        start, end, _ = parse_report_params(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        data = await cached_analytics('summary', build_analytics_summary, start, end)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-def get_content_analytics(request):
+@async_api_view(['GET'])
+async def get_content_analytics(request):
     """Detailed analytics about content items."""
     try:
-        # Get content by status
-        content_by_status = {}
-        for status_choice, status_label in ContentItem.STATUS_CHOICES:
-            count = ContentItem.objects.filter(status=status_choice).count()
-            content_by_status[status_choice] = {
-                'label': status_label,
-                'count': count
-            }
-        
-        # Get recently published content
-        recently_published = []
-        published_items = ContentItem.objects.filter(
-            status=ContentItem.STATUS_PUBLISHED
-        ).order_by('-published_at')[:10]
-        
-        for item in published_items:
-            recently_published.append({
-                'id': item.id,
-                'title': item.title,
-                'published_at': item.published_at.isoformat() if item.published_at else None,
-                'published_by': item.published_by.username if item.published_by else None
-            })
-        
-        data = {
-            'content_by_status': content_by_status,
-            'recently_published': recently_published,
-            'timestamp': timezone.now().isoformat(),
-        }
+        start, end, granularity = parse_report_params(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        data = await cached_analytics('content', build_content_analytics, start, end, granularity)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-def get_user_activity_analytics(request):
+@async_api_view(['GET'])
+async def get_user_activity_analytics(request):
     """Analytics about user activities."""
+    try:
+        start, end, _ = parse_report_params(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     try:
         User = get_user_model()
-        
+
         # Get user statistics
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        
-        # Get content creators
-        content_creators = []
-        creators = User.objects.extra(select={
-            'content_count': 'SELECT COUNT(*) FROM contentmanagement_contentitem WHERE contentmanagement_contentitem.created_by_id = auth_user.id'
-        }).order_by('-content_count')[:10]
-        
-        for creator in creators:
-            content_creators.append({
-                'id': creator.id,
-                'username': creator.username,
-                'email': creator.email,
-                'content_count': getattr(creator, 'content_count', 0)
-            })
-        
+        user_stats = await User.objects.aaggregate(
+            total_users=Count('id'),
+            active_users=Count('id', filter=Q(is_active=True)),
+        )
+
+        # Get content creators (items created in the selected range)
+        rows = rollup_rows(start, end)
+        creators = (
+            rows.exclude(created_by=None)
+            .values('created_by', 'created_by__username', 'created_by__email')
+            .annotate(content_count=Sum('item_count'))
+            .order_by('-content_count')[:10]
+        )
+        content_creators = [
+            {
+                'id': creator['created_by'],
+                'username': creator['created_by__username'],
+                'email': creator['created_by__email'],
+                'content_count': creator['content_count'],
+            }
+            async for creator in creators
+        ]
+
         data = {
-            'user_stats': {
-                'total_users': total_users,
-                'active_users': active_users,
-            },
+            'user_stats': user_stats,
             'top_content_creators': content_creators,
             'timestamp': timezone.now().isoformat(),
         }
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def accepts_gzip(header):
+    """Whether an Accept-Encoding header allows gzip, honouring q-values.
+
+    ``gzip;q=0`` refuses it; ``*`` covers gzip unless gzip is listed itself.
+    """
+    qualities = {}
+    for part in header.split(','):
+        coding, *params = [piece.strip() for piece in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    if 'gzip' in qualities:
+        return qualities['gzip'] > 0
+    if 'x-gzip' in qualities:
+        return qualities['x-gzip'] > 0
+    return qualities.get('*', 0) > 0
+
+
+@api_view(['GET'])
+def download_report(request):
+    """Stream a report as CSV or NDJSON.
+
+    Query params:
+      report=items|creators   (default items: every item with workflow timestamps)
+      output=csv|ndjson       (default csv; `format` is reserved by DRF)
+      start, end              (YYYY-MM-DD, filter on creation date)
+
+    The body is gzip-compressed on the fly when the client accepts it.
+    """
+    report = request.query_params.get('report', 'items')
+    output = request.query_params.get('output', 'csv')
+    if report not in exports.REPORTS:
+        return Response({'error': f"report must be one of {', '.join(exports.REPORTS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    if output not in exports.FORMATS:
+        return Response({'error': f"output must be one of {', '.join(exports.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        start, end, _ = parse_report_params(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    columns, rows = exports.REPORTS[report](start, end)
+    write_lines, content_type = exports.FORMATS[output]
+    body = exports.buffered(write_lines(columns, rows))
+
+    use_gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if use_gzip:
+        body = exports.gzipped(body)
+
+    response = StreamingHttpResponse(streaming_content(request, body), content_type=content_type)
+    filename = f"content-{report}-report-{timezone.localdate().isoformat()}.{output}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if use_gzip:
+        response['Content-Encoding'] = 'gzip'
+    return response
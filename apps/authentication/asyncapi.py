@@ -0,0 +1,63 @@
+"""Async DRF views for the ASGI deployment (``SERVER_MODE=asgi``).
+
+DRF dispatches synchronously, so ``AsyncAPIView`` runs authentication,
+permission and throttle checks (which may query the database) in one
+``sync_to_async`` hop and then awaits the handler, which uses the async ORM.
+Under ASGI a request waiting on the database or a slow client no longer
+holds a worker. The views also work under WSGI, where Django runs them in
+an event loop per request.
+"""
+
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose ``get``/``post``/... handlers are coroutines."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS is answered by DRF's synchronous metadata handler
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def async_api_view(http_method_names):
+    """``@api_view`` for ``async def`` function views."""
+    def decorator(func):
+        WrappedAPIView = type('WrappedAPIView', (AsyncAPIView,), {'__doc__': func.__doc__})
+        WrappedAPIView.http_method_names = [method.lower() for method in set(http_method_names) | {'options'}]
+
+        async def handler(self, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        for method in http_method_names:
+            setattr(WrappedAPIView, method.lower(), handler)
+        WrappedAPIView.__name__ = func.__name__
+        WrappedAPIView.__module__ = func.__module__
+        # Honour @permission_classes and friends applied below this decorator
+        for attr in ('renderer_classes', 'parser_classes', 'authentication_classes',
+                     'throttle_classes', 'permission_classes'):
+            if hasattr(func, attr):
+                setattr(WrappedAPIView, attr, getattr(func, attr))
+        return WrappedAPIView.as_view()
+    return decorator
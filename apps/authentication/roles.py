@@ -0,0 +1,32 @@
+"""Role (Django auth Group) resolution shared by the permission checks.
+
+A user's group names are loaded with one query and memoised on the user
+instance. DRF builds a fresh ``request.user`` for every request, so this
+amounts to a per-request cache: a `list` that checks four roles, the object
+permission check and the approve/publish/deny guards all share one lookup.
+"""
+
+
+def get_role_names(user):
+    """Return the user's group names as a frozenset."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    names = getattr(user, '_role_names', None)
+    if names is None:
+        prefetched = getattr(user, '_prefetched_objects_cache', {}).get('groups')
+        if prefetched is not None:
+            names = frozenset(group.name for group in prefetched)
+        else:
+            names = frozenset(user.groups.values_list('name', flat=True))
+        user._role_names = names
+    return names
+
+
+def user_has_role(user, *names):
+    """True if the user belongs to any of the given groups."""
+    return not get_role_names(user).isdisjoint(names)
+
+
+def clear_role_cache(user):
+    """Forget memoised roles after the user's groups have been changed."""
+    user.__dict__.pop('_role_names', None)
@@ -1,3 +1,243 @@
-from django.test import TestCase
+import io
+import json
+import time
+import urllib.request
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.permissions import IsAdminUser
+from rest_framework.throttling import UserRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.analyticsmanagement import views as analytics_views
+from apps.contentmanagement.models import ContentItem
+from utils.supabase_jwt import SupabaseJWTVerifier, TokenCache
+
+from .views import MeView
+
+SUPABASE_URL = 'https://project.supabase.test'
+HS256_SECRET = 'a-test-secret-that-is-at-least-32-bytes-long'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def jwks(*keys):
+    """A JWKS document for ``(kid, private_key)`` pairs."""
+    entries = []
+    for kid, key in keys:
+        entry = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+        entries.append(dict(entry, kid=kid, alg='RS256', use='sig'))
+    return {'keys': entries}
+
+
+class SupabaseJWTVerifierTests(SimpleTestCase):
+    """Local verification against a stubbed JWKS endpoint; nothing leaves the process."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = rsa_key()
+        cls.rotated_key = rsa_key()
+
+    def setUp(self):
+        self.published = jwks(('key-1', self.key))
+        self.fetches = 0
+        # urlopen and PyJWKClient's own opener both end up in OpenerDirector.open
+        patcher = mock.patch.object(
+            urllib.request.OpenerDirector, 'open', lambda opener, request, *args, **kwargs: self.serve_jwks(request),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.verifier = SupabaseJWTVerifier(SUPABASE_URL, jwt_secret=HS256_SECRET)
+
+    def serve_jwks(self, request):
+        self.fetches += 1
+        return io.BytesIO(json.dumps(self.published).encode())
+
+    def claims(self, **overrides):
+        claims = {
+            'sub': 'user-1', 'aud': 'authenticated', 'iss': f'{SUPABASE_URL}/auth/v1',
+            'exp': int(time.time()) + 300, 'role': 'authenticated',
+        }
+        claims.update(overrides)
+        return claims
+
+    def rs256(self, key=None, kid='key-1', **claims):
+        return jwt.encode(self.claims(**claims), key or self.key, algorithm='RS256', headers={'kid': kid})
+
+    def hs256(self, secret=HS256_SECRET, **claims):
+        return jwt.encode(self.claims(**claims), secret, algorithm='HS256')
+
+    def test_rs256_token_verifies_against_the_jwks(self):
+        self.assertEqual(self.verifier.verify(self.rs256())['sub'], 'user-1')
+
+    def test_hs256_token_verifies_with_the_secret(self):
+        self.assertEqual(self.verifier.verify(self.hs256())['sub'], 'user-1')
+        self.assertEqual(self.fetches, 0)
+
+    def test_rejects_invalid_tokens(self):
+        cases = {
+            'expired': self.rs256(exp=int(time.time()) - 60),
+            'wrong audience': self.rs256(aud='anon'),
+            'wrong issuer': self.rs256(iss='https://other.supabase.test/auth/v1'),
+            'signed by another key': self.rs256(key=rsa_key()),
+            'wrong HS256 secret': self.hs256(secret='not-the-project-secret-but-long-enough'),
+        }
+        for case, token in cases.items():
+            with self.subTest(case), self.assertRaises(jwt.InvalidTokenError):
+                self.verifier.verify(token)
+
+    def test_fetches_the_jwks_once_for_many_tokens(self):
+        for i in range(20):
+            # Distinct tokens, so every one is checked rather than served from the token cache
+            self.verifier.verify(self.rs256(sub=f'user-{i}'))
+        self.assertEqual(self.fetches, 1)
+
+    def test_refetches_the_jwks_for_an_unknown_kid(self):
+        clock = FakeClock()
+        with mock.patch('time.monotonic', clock):
+            self.verifier.verify(self.rs256())
+            self.published = jwks(('key-1', self.key), ('key-2', self.rotated_key))
+            clock.now += 60
+            claims = self.verifier.verify(self.rs256(key=self.rotated_key, kid='key-2'))
+        self.assertEqual(claims['sub'], 'user-1')
+        self.assertEqual(self.fetches, 2)
+
+    def test_repeated_token_is_served_from_the_cache(self):
+        token = self.rs256()
+        self.verifier.verify(token)
+        with mock.patch.object(jwt, 'decode', side_effect=AssertionError('decoded twice')):
+            self.assertEqual(self.verifier.verify(token)['sub'], 'user-1')
+
+
+class TokenCacheTests(SimpleTestCase):
+
+    def test_entries_expire_after_the_ttl(self):
+        clock = FakeClock()
+        with mock.patch('time.monotonic', clock):
+            cache = TokenCache(ttl=60)
+            cache.set('token', {'sub': '1'})
+            clock.now += 59
+            self.assertEqual(cache.get('token'), {'sub': '1'})
+            clock.now += 2
+            self.assertIsNone(cache.get('token'))
+
+    def test_entry_ttl_is_capped_by_the_cache_ttl(self):
+        clock = FakeClock()
+        with mock.patch('time.monotonic', clock):
+            cache = TokenCache(ttl=60)
+            cache.set('short', 1, ttl=5)
+            cache.set('long', 2, ttl=600)
+            clock.now += 30
+            self.assertIsNone(cache.get('short'))
+            self.assertEqual(cache.get('long'), 2)
+            clock.now += 31
+            self.assertIsNone(cache.get('long'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+
+class TwoPerMinute(UserRateThrottle):
+    rate = '2/min'
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CONTENT_PACK_BUILD_ON_PUBLISH=False,
+    QUERY_BUDGET_STRICT=True,
+)
+class AsyncAPIViewTests(TestCase):
+    """The async views through the ASGI handler, as under SERVER_MODE=asgi.
+
+    Any synchronous ORM call left in a handler raises SynchronousOnlyOperation
+    here and comes back as a 500.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('player', email='player@example.com')
+        self.user.groups.add(Group.objects.get_or_create(name='Editor')[0])
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def test_me(self):
+        response = await self.async_client.get('/api/auth/me/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'player')
+        self.assertEqual(response.json()['roles'], ['Editor'])
+
+    async def test_game_feed(self):
+        await ContentItem.objects.acreate(
+            title='Published', status=ContentItem.STATUS_PUBLISHED, published_at=timezone.now(), created_by=self.user,
+        )
+        await ContentItem.objects.acreate(title='Draft', created_by=self.user)
+        response = await self.async_client.get('/api/content/game/content/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['title'] for row in response.json()], ['Published'])
+
+        # The cached feed is served on the next poll, and a matching ETag gets a 304
+        again = await self.async_client.get('/api/content/game/content/', headers=self.auth)
+        self.assertEqual(again.json(), response.json())
+        unchanged = await self.async_client.get(
+            '/api/content/game/content/', headers={**self.auth, 'If-None-Match': response['ETag']},
+        )
+        self.assertEqual(unchanged.status_code, 304)
+
+    async def test_analytics_function_view(self):
+        response = await self.async_client.get('/api/analytics/summary/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('summary', response.json())
+
+    async def test_unauthenticated_requests_get_401(self):
+        for url in ('/api/auth/me/', '/api/content/game/content/', '/api/analytics/summary/'):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 401)
+                self.assertIn('Bearer', response['WWW-Authenticate'])
+
+    async def test_permission_denied_gets_403(self):
+        with mock.patch.object(MeView, 'permission_classes', (IsAdminUser,)):
+            response = await self.async_client.get('/api/auth/me/', headers=self.auth)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('detail', response.json())
+
+    async def test_options_and_disallowed_methods(self):
+        for url in ('/api/auth/me/', '/api/analytics/summary/'):
+            with self.subTest(url=url):
+                options = await self.async_client.options(url, headers=self.auth)
+                self.assertEqual(options.status_code, 200)
+                self.assertIn('GET', options['Allow'])
+                self.assertNotIn('POST', options['Allow'])
+                post = await self.async_client.post(url, headers=self.auth)
+                self.assertEqual(post.status_code, 405)
+
+    async def test_throttling(self):
+        view_classes = (MeView, analytics_views.get_analytics_summary.cls)
+        urls = ('/api/auth/me/', '/api/analytics/summary/')
+        for view_class, url in zip(view_classes, urls):
+            with self.subTest(url=url), mock.patch.object(view_class, 'throttle_classes', [TwoPerMinute]):
+                await cache.aclear()
+                statuses = [(await self.async_client.get(url, headers=self.auth)).status_code for _ in range(3)]
+                self.assertEqual(statuses, [200, 200, 429])
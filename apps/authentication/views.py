@@ -1,5 +1,6 @@
 from django.shortcuts import render
 from django.contrib.auth import authenticate
+from django.db.models import aprefetch_related_objects
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -11,6 +12,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
+from .asyncapi import AsyncAPIView
 from .serializers import RegisterSerializer, UserSerializer
 
 
@@ -25,8 +27,10 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class MeView(APIView):
+class MeView(AsyncAPIView):
     permission_classes = (IsAuthenticated,)
 
-    def get(self, request):
+    async def get(self, request):
+        # Load the roles before serializing; the serializer itself stays query-free
+        await aprefetch_related_objects([request.user], 'groups')
         return Response(UserSerializer(request.user).data)
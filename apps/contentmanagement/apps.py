@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ContentmanagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.contentmanagement'
+
+    def ready(self):
+        from .search import repair_sqlite_index
+        post_migrate.connect(repair_sqlite_index, sender=self)
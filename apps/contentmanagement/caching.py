@@ -0,0 +1,172 @@
+"""Shared response cache for ContentItem reads.
+
+Serialized ContentItems are kept in the default cache, which every worker
+on a host shares (a file-based cache, see ``CACHES``). The file cache is per
+container: with more than one, set REDIS_URL so a write invalidates the
+entries of every host. Keys carry a generation number
+that any ContentItem write bumps once its transaction commits, so a publish
+invalidates every cached feed and detail in one cache write; the old entries
+simply stop being read and expire.
+
+A miss takes a short lock with ``cache.add``. One worker rebuilds the entry
+while the others serve the copy built under an earlier generation, so a
+publish does not make every worker rebuild the feed at the same moment. With
+no earlier copy they wait up to WAIT_SECONDS for the rebuild, then build it
+themselves. A response built from an earlier copy must not carry validators
+computed from the current rows (see ``conditional.mark_stale``), or a client
+would keep the old body under the new ETag until the next change.
+
+The same commit sends ``content_changed``, for apps that keep data derived
+from ContentItems (the analytics rollup).
+
+Cached data is shared between users. ``file_url`` is cached unsigned and
+signed for the requesting user on the way out.
+"""
+
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+
+from utils.timing import timed
+
+from .downloads import download_signature, file_version
+
+GENERATION_KEY = 'content:generation'
+# Sent once a transaction that wrote ContentItems has committed
+content_changed = Signal()
+# How long a rebuild may hold the lock
+LOCK_SECONDS = 10
+# How long a request with no stale copy to serve waits for another worker's
+# rebuild before building the entry itself, and how often it looks
+WAIT_SECONDS = 1
+WAIT_INTERVAL = 0.05
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # Start from the clock so a lost key never brings an old generation back
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+async def ageneration():
+    value = await cache.aget(GENERATION_KEY)
+    if value is None:
+        await cache.aadd(GENERATION_KEY, time.time_ns(), None)
+        value = await cache.aget(GENERATION_KEY)
+    return value
+
+
+def _key(name, generation, parts):
+    return ':'.join(['content', name, str(generation)] + [str(part) for part in parts])
+
+
+def _stale_key(name, parts):
+    # The latest copy of an entry under any generation
+    return _key(name, 'stale', parts)
+
+
+def _bump():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+    content_changed.send(sender=None)
+
+
+def bump_generation():
+    """Invalidate every cached ContentItem response once the transaction commits.
+
+    Every ContentItem write calls this, so it also sends ``content_changed``.
+    """
+    transaction.on_commit(_bump)
+
+
+def cached(name, build, *parts):
+    """Return ``(build(), stale)``, shared through the cache for CONTENT_CACHE_SECONDS.
+
+    ``stale`` is true when the value is a copy from an earlier generation.
+    """
+    timeout = settings.CONTENT_CACHE_SECONDS
+    if timeout <= 0:
+        return build(), False
+    key = _key(name, generation(), parts)
+    value = cache.get(key)
+    if value is not None:
+        return value, False
+
+    lock = f'{key}:lock'
+    if not cache.add(lock, 1, LOCK_SECONDS):
+        # Another worker is rebuilding this entry; serve the previous copy
+        value = cache.get(_stale_key(name, parts))
+        if value is not None:
+            return value, True
+        deadline = time.monotonic() + WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                return value, False
+        return build(), False
+    try:
+        value = build()
+        cache.set_many({key: value, _stale_key(name, parts): value}, timeout)
+    finally:
+        cache.delete(lock)
+    return value, False
+
+
+async def acached(name, build, *parts):
+    """``cached`` for async views; ``build`` is a coroutine function."""
+    timeout = settings.CONTENT_CACHE_SECONDS
+    if timeout <= 0:
+        return await build(), False
+    key = _key(name, await ageneration(), parts)
+    value = await cache.aget(key)
+    if value is not None:
+        return value, False
+
+    lock = f'{key}:lock'
+    if not await cache.aadd(lock, 1, LOCK_SECONDS):
+        value = await cache.aget(_stale_key(name, parts))
+        if value is not None:
+            return value, True
+        deadline = time.monotonic() + WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_INTERVAL)
+            value = await cache.aget(key)
+            if value is not None:
+                return value, False
+        return await build(), False
+    try:
+        value = await build()
+        await cache.aset_many({key: value, _stale_key(name, parts): value}, timeout)
+    finally:
+        await cache.adelete(lock)
+    return value, False
+
+
+def serialize_shared(serializer_class, instance, request, many=False):
+    """``(data, file_versions)`` for caching: ``file_url`` left unsigned."""
+    with timed('serialize'):
+        serializer = serializer_class(instance, many=many, context={'request': request, 'unsigned': True})
+        items = instance if many else [instance]
+        versions = {item.pk: file_version(item.file.name) for item in items if item.file}
+        return serializer.data, versions
+
+
+def sign_file_urls(request, data, versions):
+    """Sign the cached ``file_url`` values for ``request.user``."""
+    def sign(row):
+        if not row.get('file_url'):
+            return row
+        signature = download_signature(row['id'], versions.get(row['id']), request.user)
+        return dict(row, file_url=f"{row['file_url']}?sig={signature}")
+
+    return [sign(row) for row in data] if isinstance(data, list) else sign(data)
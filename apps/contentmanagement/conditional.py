@@ -0,0 +1,114 @@
+"""Conditional GET for the content read endpoints.
+
+Validators come from one or two aggregate queries over the rows a response
+would be built from (row count, newest ``updated_at``, page version numbers),
+so an unchanged resource is answered with 304 before any row data is loaded
+or serialized.
+
+The validators track the content rows themselves. Renaming a user or
+changing their roles shows up in nested user data at the next content change.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .downloads import signature_window
+from .models import ContentItem
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value else None
+
+
+def item_validators(request, queryset):
+    """``(etag, last_modified)`` for a response built from ContentItems.
+
+    ``file_url`` is signed per user and per signing window, so both are part
+    of the ETag. The newest ``updated_at`` is taken over all items, deleted
+    ones included, so items leaving the set change it too; the count of the
+    set itself catches hard deletes.
+    """
+    count = queryset.order_by().aggregate(count=Count('pk'))['count']
+    last = ContentItem.objects.aggregate(last=Max('updated_at'))['last']
+    return _item_validators(request, count, last)
+
+
+async def aitem_validators(request, queryset):
+    count = (await queryset.order_by().aaggregate(count=Count('pk')))['count']
+    last = (await ContentItem.objects.aaggregate(last=Max('updated_at')))['last']
+    return _item_validators(request, count, last)
+
+
+def _item_validators(request, count, last):
+    etag = make_etag('items', count, last and last.isoformat(), request.user.pk, signature_window())
+    return etag, _timestamp(last)
+
+
+def item_detail_validators(request, pk):
+    if not str(pk).isdigit():
+        return None, None
+    row = ContentItem.objects.filter(pk=pk, is_deleted=False).values('updated_at').first()
+    if row is None:
+        return None, None
+    etag = make_etag('item', pk, row['updated_at'].isoformat(), request.user.pk, signature_window())
+    return etag, _timestamp(row['updated_at'])
+
+
+def page_validators(queryset):
+    row = queryset.order_by().aggregate(count=Count('pk'), last=Max('updated_at'), versions=Sum('version_number'))
+    etag = make_etag('pages', row['count'], row['last'] and row['last'].isoformat(), row['versions'])
+    return etag, _timestamp(row['last'])
+
+
+def mark_stale(response):
+    """Mark ``response`` as built from a cached copy older than the rows.
+
+    The validators describe the current rows, not that copy, so the response
+    goes out without them and is not stored by the client.
+    """
+    response.stale = True
+    return response
+
+
+def conditional_response(request, validators, build):
+    """Return 304/412 when the validators match the request, else ``build()``.
+
+    Either way the response carries the validators and asks clients to
+    revalidate before reusing it, unless it was marked with ``mark_stale``.
+    """
+    etag, last_modified = validators
+    if etag is None:
+        return build()
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+    return _with_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, validators, build):
+    """``conditional_response`` for async views; ``build`` is a coroutine function."""
+    etag, last_modified = validators
+    if etag is None:
+        return await build()
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await build()
+    return _with_validators(response, etag, last_modified)
+
+
+def _with_validators(response, etag, last_modified):
+    if getattr(response, 'stale', False):
+        response['Cache-Control'] = 'no-store'
+    elif response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,175 @@
+"""Authorized file downloads.
+
+Content files are not served from ``/media/``; the download views check who
+is asking and then hand the file over with ``serve_file``:
+
+- behind nginx (``CONTENT_DOWNLOAD_ACCEL_PREFIX`` set) the response is just
+  an ``X-Accel-Redirect`` header and nginx sends the bytes, Range and
+  conditional requests included;
+- otherwise Django streams the file itself, answering single byte ranges and
+  If-None-Match / If-Modified-Since / If-Range. Under ASGI the file is read
+  through ``utils.streaming`` rather than FileResponse, which Django would
+  read into memory whole.
+
+``file_url`` values are signed download URLs, so ``<img>`` and ``<video>``
+tags that cannot send an Authorization header still work. A signature names
+the user it was issued to and stays valid until the end of the next
+``CONTENT_DOWNLOAD_URL_SECONDS`` window, which keeps the URL stable (and
+cacheable) in between.
+"""
+
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+from utils.streaming import is_asgi, streaming_content
+
+from .storage import PREFIX as CAS_PREFIX
+
+SIGNATURE_SALT = 'contentmanagement.download'
+READ_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_CAS_NAME = re.compile(rf'^{CAS_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[a-z0-9]+)?$')
+
+
+def file_version(name):
+    """The SHA-256 of a content-addressed file, or None for other names."""
+    match = _CAS_NAME.match(name or '')
+    return match[1] if match else None
+
+
+def signature_window():
+    """Index of the current signing window; signed URLs change when it does."""
+    return int(time.time()) // settings.CONTENT_DOWNLOAD_URL_SECONDS
+
+
+def download_signature(pk, version, user):
+    expires = (signature_window() + 2) * settings.CONTENT_DOWNLOAD_URL_SECONDS
+    return signing.Signer(salt=SIGNATURE_SALT).sign_object({'i': pk, 'u': user.pk, 'e': expires, 'v': version})
+
+
+def signed_download_url(item, user):
+    signature = download_signature(item.pk, file_version(item.file.name), user)
+    return f"{reverse('contentitem-download', kwargs={'pk': item.pk})}?sig={signature}"
+
+
+def read_download_signature(signature, pk):
+    """Return the signature's payload if it is valid for item ``pk``, else None."""
+    try:
+        payload = signing.Signer(salt=SIGNATURE_SALT).unsign_object(signature)
+    except (signing.BadSignature, ValueError):
+        return None
+    if payload.get('i') != pk or payload.get('e', 0) <= time.time():
+        return None
+    return payload
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` for a single byte range, inclusive.
+
+    None means "send the whole file": no header, or one we do not handle
+    (multiple ranges, other units). Raises ValueError for an unsatisfiable
+    range.
+    """
+    match = _RANGE.match((header or '').strip())
+    if not match or not (match[1] or match[2]):
+        return None
+    if match[1]:
+        start = int(match[1])
+        end = min(int(match[2]), size - 1) if match[2] else size - 1
+        if start >= size or end < start:
+            raise ValueError(header)
+    else:
+        suffix = int(match[2])
+        if not suffix or not size:
+            raise ValueError(header)
+        start, end = max(size - suffix, 0), size - 1
+    return start, end
+
+
+def _read_range(handle, start, length):
+    with handle:
+        handle.seek(start)
+        while length > 0:
+            data = handle.read(min(READ_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def serve_file(request, field_file, cache_control, filename=None):
+    name = field_file.name
+    content_type = mimetypes.guess_type(filename or name)[0] or 'application/octet-stream'
+    disposition = content_disposition_header(False, filename) if filename else None
+
+    accel_prefix = settings.CONTENT_DOWNLOAD_ACCEL_PREFIX
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(name)}"
+        response['Cache-Control'] = cache_control
+        if disposition:
+            response['Content-Disposition'] = disposition
+        return response
+
+    storage = field_file.storage
+    try:
+        size = storage.size(name)
+        modified = storage.get_modified_time(name).timestamp()
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404('File not found')
+    version = file_version(name)
+    etag = f'"{version}"' if version else f'"{size:x}-{int(modified):x}"'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        response['Cache-Control'] = cache_control
+        response['Accept-Ranges'] = 'bytes'
+        if disposition:
+            response['Content-Disposition'] = disposition
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(modified))
+    if not_modified is not None:
+        return finish(not_modified)
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range in (etag, http_date(modified)):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return finish(response)
+
+    handle = storage.open(name, 'rb')
+    if byte_range is None:
+        if not is_asgi(request):
+            return finish(FileResponse(handle, content_type=content_type))
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+    content = streaming_content(request, _read_range(handle, start, end - start + 1))
+    response = StreamingHttpResponse(content, status=status, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return finish(response)
+
+
+def download_filename(slug, name):
+    """A readable name for Content-Disposition; stored names may be hashes."""
+    extension = os.path.splitext(name or '')[1]
+    return f'{slug or "download"}{extension}'
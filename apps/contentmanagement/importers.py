@@ -0,0 +1,248 @@
+"""Batch import of ContentItems from CSV, NDJSON or a ZIP with files.
+
+Rows are read lazily, validated a chunk at a time and inserted with
+``ContentItem.bulk_create_with_slugs``, so a spreadsheet of thousands of
+items costs a few queries per chunk rather than several per row. A bad row
+is reported with its line number and skipped; it never aborts the import.
+A file that turns unreadable part-way (bad encoding, a corrupt archive
+member) keeps the rows read before the damage and reports the rest as one
+failed row.
+
+Columns: ``title`` (required), ``body``, ``file`` and, for imports run by
+``manage.py import_content``, ``created_by`` (a username). A ZIP upload holds
+one manifest (``items.csv``/``items.ndjson``, or the only CSV or NDJSON file in
+the archive) whose ``file`` column names other members of the archive.
+"""
+
+import csv
+import io
+import json
+import os
+import zipfile
+import zlib
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import DatabaseError, transaction
+
+from .models import ContentItem
+from .serializers import ContentItemImportSerializer
+
+CHUNK_SIZE = 500
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.zip': 'zip',
+}
+FORMATS = sorted(set(EXTENSIONS.values()))
+MANIFEST_NAMES = ('items.csv', 'items.ndjson', 'items.jsonl')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+# Raised while reading a file that cannot be parsed any further
+READ_ERRORS = (ImportFormatError, UnicodeDecodeError, csv.Error, zipfile.BadZipFile, zlib.error)
+
+
+def detect_format(name):
+    fmt = EXTENSIONS.get(os.path.splitext(name or '')[1].lower())
+    if fmt is None:
+        raise ImportFormatError(f"Cannot tell the format of {name!r}; expected one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row)`` from a binary stream.
+
+    ``row`` is a dict, or the error for a line that could not be parsed.
+    CSV line numbers count the header, so they match the spreadsheet row.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            row.pop(None, None)  # cells beyond the header
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, ImportFormatError(f'Invalid JSON: {exc}')
+                continue
+            if not isinstance(row, dict):
+                row = ImportFormatError('Each line must be a JSON object')
+            yield number, row
+    else:
+        raise ImportFormatError(f'Unsupported format: {fmt}')
+
+
+def find_manifest(archive):
+    names = [name for name in archive.namelist() if not name.endswith('/')]
+    for name in MANIFEST_NAMES:
+        if name in names:
+            return name, detect_format(name)
+    candidates = [
+        name for name in names
+        if os.path.splitext(name)[1].lower() in ('.csv', '.ndjson', '.jsonl')
+    ]
+    if len(candidates) != 1:
+        raise ImportFormatError(
+            'The archive needs one manifest: items.csv or items.ndjson '
+            '(or a single CSV/NDJSON file)'
+        )
+    return candidates[0], detect_format(candidates[0])
+
+
+def chunked(iterable, size):
+    chunk = []
+    for entry in iterable:
+        chunk.append(entry)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ContentImporter:
+    """Imports rows as new ContentItems in the initial workflow state.
+
+    ``user`` becomes ``created_by``. With ``allow_created_by`` a row may name a
+    different creator in its ``created_by`` column; the API leaves this off so
+    uploaders cannot attribute content to other users.
+    """
+
+    def __init__(self, user=None, chunk_size=CHUNK_SIZE, allow_created_by=False):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.allow_created_by = allow_created_by
+        self.created_ids = []
+        self.errors = []
+
+    def import_file(self, stream, fmt):
+        if fmt != 'zip':
+            return self.import_rows(read_rows(stream, fmt))
+        with zipfile.ZipFile(stream) as archive:
+            manifest, manifest_fmt = find_manifest(archive)
+            with archive.open(manifest) as manifest_stream:
+                return self.import_rows(read_rows(manifest_stream, manifest_fmt), archive=archive)
+
+    def import_records(self, records):
+        """Import already-parsed rows, e.g. the ``items`` list of a JSON request."""
+        return self.import_rows(
+            (number, record if isinstance(record, dict) else ImportFormatError('Each item must be an object'))
+            for number, record in enumerate(records, start=1)
+        )
+
+    def import_rows(self, rows, archive=None):
+        for chunk in chunked(self._readable(rows), self.chunk_size):
+            self._import_chunk(chunk, archive)
+        self.errors.sort(key=lambda error: error['row'])
+        return self
+
+    @property
+    def summary(self):
+        return {
+            'created': len(self.created_ids),
+            'failed': len(self.errors),
+            'ids': self.created_ids,
+            'errors': self.errors,
+        }
+
+    def _readable(self, rows):
+        """Pass rows through until the file cannot be read any further.
+
+        Rows already read are still imported; the unreadable remainder
+        becomes a failure on the row after the last one read.
+        """
+        number = 0
+        try:
+            for number, row in rows:
+                yield number, row
+        except READ_ERRORS as exc:
+            self._fail(number + 1, f'Could not read the file past this row: {exc}')
+
+    def _fail(self, number, errors):
+        self.errors.append({'row': number, 'errors': errors if isinstance(errors, dict) else [str(errors)]})
+
+    def _import_chunk(self, chunk, archive):
+        valid = []
+        for number, row in chunk:
+            if isinstance(row, Exception):
+                self._fail(number, row)
+                continue
+            serializer = ContentItemImportSerializer(data=row)
+            if not serializer.is_valid():
+                self._fail(number, serializer.errors)
+                continue
+            valid.append((number, row, serializer.validated_data))
+
+        creators = self._resolve_creators(row for _, row, _ in valid)
+        pending = []
+        for number, row, fields in valid:
+            created_by = self.user
+            username = str(row.get('created_by') or '').strip() if self.allow_created_by else ''
+            if username:
+                created_by = creators.get(username)
+                if created_by is None:
+                    self._fail(number, f'Unknown user: {username}')
+                    continue
+            item = ContentItem(created_by=created_by, status=ContentItem.STATUS_FOR_EDITING, **fields)
+            file_name = str(row.get('file') or '').strip()
+            if file_name:
+                error = self._attach(item, file_name, archive)
+                if error:
+                    self._fail(number, error)
+                    continue
+            pending.append((number, item))
+        self._insert(pending)
+
+    def _resolve_creators(self, rows):
+        if not self.allow_created_by:
+            return {}
+        usernames = {str(row.get('created_by') or '').strip() for row in rows} - {''}
+        if not usernames:
+            return {}
+        return {user.username: user for user in get_user_model().objects.filter(username__in=usernames)}
+
+    def _attach(self, item, file_name, archive):
+        if archive is None:
+            return 'The file column needs a ZIP upload that contains the file'
+        try:
+            member = archive.open(file_name)
+        except KeyError:
+            return f'{file_name} is not in the archive'
+        with member:
+            item.file.save(os.path.basename(file_name), File(member), save=False)
+        return None
+
+    def _insert(self, pending):
+        if not pending:
+            return
+        items = [item for _, item in pending]
+        try:
+            ContentItem.bulk_create_with_slugs(items)
+        except DatabaseError:
+            # Something in the chunk is unacceptable to the database; fall
+            # back to row-by-row inserts so only the offending rows fail.
+            for number, item in pending:
+                item.pk, item.slug = None, ''
+                item._state.adding = True
+                try:
+                    with transaction.atomic():
+                        item.save()
+                except DatabaseError as exc:
+                    # The failed save took no reference on the file's blob; it may
+                    # be shared, so gc_content_blobs removes it if nothing else does
+                    self._fail(number, exc)
+                else:
+                    self.created_ids.append(item.pk)
+            return
+        self.created_ids.extend(item.pk for item in items)
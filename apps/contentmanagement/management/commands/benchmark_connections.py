@@ -0,0 +1,121 @@
+import io
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class Command(BaseCommand):
+    help = 'Compare request latency with a new database connection per request, persistent connections and the pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/content/items/')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--user', help='Username to authenticate as (default: the first superuser)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to authenticate as; pass --user')
+        token = str(AccessToken.for_user(user))
+        host = next((name for name in settings.ALLOWED_HOSTS if name != '*' and not name.startswith('.')), 'localhost')
+
+        configured = connections['default'].settings_dict
+        per_request = dict(configured, CONN_MAX_AGE=0, OPTIONS={
+            key: value for key, value in configured.get('OPTIONS', {}).items() if key != 'pool'
+        })
+        modes = [
+            ('per-request', per_request),
+            ('persistent', dict(per_request, CONN_MAX_AGE=settings.DB_CONN_MAX_AGE or 600)),
+        ]
+        if 'pool' in configured.get('OPTIONS', {}):
+            modes.append(('pool', configured))
+
+        opened = []
+
+        def count(sender, **kwargs):
+            opened.append(1)
+
+        # Go through the WSGI handler rather than the test client, which keeps
+        # connections open across requests whatever CONN_MAX_AGE says
+        handler = WSGIHandler()
+        original = connections['default']
+        original.close()
+        connection_created.connect(count)
+        self.stdout.write(f"{'mode':<12} {'requests':>8} {'opened':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+        try:
+            for mode, settings_dict in modes:
+                wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'default')
+                connections['default'] = wrapper
+                try:
+                    for _ in range(options['warmup']):
+                        self._request(handler, options['path'], host, token)
+                    opened.clear()
+                    latencies = []
+                    for _ in range(options['requests']):
+                        started = time.perf_counter()
+                        status = self._request(handler, options['path'], host, token)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        if status != 200:
+                            raise CommandError(f'{options["path"]} answered {status}')
+                finally:
+                    wrapper.close()
+                    if mode == 'pool':
+                        wrapper.close_pool()
+                latencies.sort()
+                self.stdout.write(
+                    f"{mode:<12} {len(latencies):>8} {len(opened):>7} {self._percentile(latencies, 0.50):>8.2f} "
+                    f"{self._percentile(latencies, 0.95):>8.2f} {self._percentile(latencies, 0.99):>8.2f} "
+                    f"{statistics.fmean(latencies):>8.2f}"
+                )
+        finally:
+            connection_created.disconnect(count)
+            connections['default'] = original
+        self.stdout.write(self.style.SUCCESS(
+            f"{connections['default'].vendor}: per-request opens a connection for every request; "
+            'the other modes should open none after warm-up'
+        ))
+
+    def _request(self, handler, path, host, token):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_ACCEPT': 'application/json',
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        statuses = []
+        response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            for _ in response:
+                pass
+        finally:
+            # Sends request_finished, which closes or keeps the connection
+            response.close()
+        return int(statuses[0].split()[0])
+
+    @staticmethod
+    def _percentile(values, fraction):
+        return values[min(int(len(values) * fraction), len(values) - 1)]
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from apps.contentmanagement.models import ContentItem
+
+
+def legacy_save(item):
+    # The probe loop ContentItem.save() used to run: one query per collision
+    base = slugify(item.title) if item.title else 'content'
+    slug = base
+    idx = 1
+    while ContentItem.objects.filter(slug=slug).exclude(pk=item.pk).exists():
+        slug = f"{base}-{idx}"
+        idx += 1
+    item.slug = slug
+    item.save()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark slug allocation when importing many items with the same title'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10_000)
+        parser.add_argument(
+            '--legacy-count',
+            type=int,
+            default=1_000,
+            help='Rows for the old probe loop, which is quadratic (default 1000)',
+        )
+        parser.add_argument('--title', default='Quiz')
+
+    def handle(self, *args, **options):
+        title = options['title']
+        runs = [
+            ('legacy save()', options['legacy_count'], lambda n: [legacy_save(ContentItem(title=title)) for _ in range(n)]),
+            ('save()', options['count'], lambda n: [ContentItem.objects.create(title=title) for _ in range(n)]),
+            ('bulk_create_with_slugs', options['count'], lambda n: ContentItem.bulk_create_with_slugs(
+                [ContentItem(title=title) for _ in range(n)], batch_size=1000,
+            )),
+        ]
+        self.stdout.write(f"{'path':<24} {'rows':>8} {'queries':>9} {'seconds':>9} {'rows/s':>9}")
+        for name, count, run in runs:
+            queries = [0]
+
+            def count_queries(execute, sql, params, many, context):
+                queries[0] += 1
+                return execute(sql, params, many, context)
+
+            # Each run starts from an empty slug namespace and is rolled back
+            with transaction.atomic():
+                with connection.execute_wrapper(count_queries):
+                    start = time.perf_counter()
+                    run(count)
+                    elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+            self.stdout.write(f"{name:<24} {count:>8} {queries[0]:>9} {elapsed:>9.2f} {count / elapsed:>9.0f}")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.contentmanagement.packs import build_lock, build_locked, build_pending
+
+
+class Command(BaseCommand):
+    help = 'Build a content pack of the published content for the game client (skipped when nothing changed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Only build when a publish has requested it since the last build (for cron or a worker)',
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            builds = build_pending()
+            if builds is None:
+                self.stdout.write(self.style.WARNING('Another process is building a content pack.'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Ran {builds} pending content pack build(s).'))
+            return
+
+        with build_lock() as taken:
+            if not taken:
+                raise CommandError('Another process is building a content pack.')
+            pack, created = build_locked()
+        if pack is None:
+            self.stdout.write(self.style.WARNING('No content pack was built.'))
+            return
+        if not created:
+            self.stdout.write(self.style.WARNING(f'Content unchanged; latest pack is v{pack.version}.'))
+            return
+        patch = f', patch {pack.patch_size} bytes' if pack.patch else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'Built content pack v{pack.version}: {pack.item_count} items, {pack.asset_count} assets, '
+            f'{pack.archive_size} bytes{patch}.'
+        ))
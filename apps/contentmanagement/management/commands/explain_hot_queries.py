@@ -0,0 +1,82 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.contentmanagement.models import ContentItem
+
+
+def hot_queries():
+    """The querysets behind the busiest endpoints, as they are issued in production."""
+    now = timezone.now()
+    live = ContentItem.objects.filter(is_deleted=False)
+    published = live.filter(status=ContentItem.STATUS_PUBLISHED)
+    return [
+        ('editor list (ContentItemViewSet.list)', live.order_by('-created_at', 'id')[:50]),
+        ('editor list by status', live.filter(status=ContentItem.STATUS_FOR_APPROVAL).order_by('-created_at', 'id')[:50]),
+        ('game feed (GamePublishedContentList)', published.order_by('-published_at')),
+        ('game delta sync', ContentItem.objects.filter(updated_at__gt=now - timedelta(hours=1))),
+        ('analytics recently published', published.order_by('-published_at')[:10]),
+        ('analytics rollup refresh (created_at range)', ContentItem.objects.filter(
+            created_at__gte=now - timedelta(days=1), created_at__lt=now,
+        )),
+    ]
+
+
+def full_scans(plan, table):
+    """Plan lines that read the whole table instead of using an index."""
+    # PostgreSQL: "Seq Scan on <table>"; sqlite: "SCAN <table>" without "USING ... INDEX"
+    pattern = re.compile(rf'\b(Seq Scan on|SCAN) "?{re.escape(table)}\b')
+    return [
+        line.strip() for line in plan.splitlines()
+        if pattern.search(line) and 'INDEX' not in line
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the content hot-path queries and flag sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force-index',
+            action='store_true',
+            help='PostgreSQL only: SET enable_seqscan = off to check an index *can* serve each query '
+                 '(the planner rightly prefers seq scans on small tables)',
+        )
+        parser.add_argument(
+            '--fail',
+            action='store_true',
+            help='Exit with an error if any query needs a sequential scan',
+        )
+
+    def handle(self, *args, **options):
+        table = ContentItem._meta.db_table
+        if options['force_index']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--force-index is only supported on PostgreSQL')
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+        flagged_total = 0
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            flagged = full_scans(plan, table)
+            flagged_total += bool(flagged)
+            if flagged:
+                self.stdout.write(self.style.WARNING(f'❌ {name}: sequential scan'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✅ {name}'))
+            if flagged or options['verbosity'] > 1:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        self.stdout.write('')
+        if flagged_total:
+            message = f'{flagged_total} hot quer{"y" if flagged_total == 1 else "ies"} fell back to a sequential scan.'
+            if options['fail']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('All hot queries use an index.'))
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.contentmanagement.models import StoredBlob
+from apps.contentmanagement.storage import content_storage
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed blobs that no live item or page has used for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24, help='How long a blob must be unreferenced (default 24)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        storage = content_storage()
+        idle = StoredBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff)
+        deleted, freed = 0, 0
+        for pk, name, size in idle.values_list('pk', 'name', 'size').iterator():
+            if options['dry_run']:
+                self.stdout.write(name)
+                deleted, freed = deleted + 1, freed + size
+                continue
+            with transaction.atomic():
+                # Re-check: the blob may have been reused since the scan
+                if not idle.filter(pk=pk).delete()[0]:
+                    continue
+                storage.delete(name)
+            deleted, freed = deleted + 1, freed + size
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} blobs ({freed} bytes).'))
@@ -0,0 +1,52 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.contentmanagement.importers import CHUNK_SIZE, FORMATS, READ_ERRORS, ContentImporter, detect_format
+
+
+def describe(errors):
+    if isinstance(errors, dict):
+        return '; '.join(f"{field}: {' '.join(str(message) for message in messages)}" for field, messages in errors.items())
+    return '; '.join(str(message) for message in errors)
+
+
+class Command(BaseCommand):
+    help = 'Import content items from a CSV, NDJSON or ZIP (manifest plus files) export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - to read CSV/NDJSON from stdin')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--user', help='Username recorded as created_by when a row has no created_by column')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        importer = ContentImporter(user=user, chunk_size=options['chunk_size'], allow_created_by=True)
+        try:
+            if path == '-':
+                fmt = options['format'] or 'csv'
+                if fmt == 'zip':
+                    raise CommandError('ZIP archives cannot be read from stdin')
+                importer.import_file(sys.stdin.buffer, fmt)
+            else:
+                fmt = options['format'] or detect_format(path)
+                with open(path, 'rb') as stream:
+                    importer.import_file(stream, fmt)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except READ_ERRORS as exc:
+            raise CommandError(f'{path}: {exc}')
+
+        for error in importer.errors:
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {describe(error['errors'])}"))
+        summary = importer.summary
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary['created']} items, {summary['failed']} rows failed."))
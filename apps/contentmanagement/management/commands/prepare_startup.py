@@ -0,0 +1,71 @@
+import hashlib
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# Written to STATIC_ROOT after collectstatic; the hash of the sources it collected
+FINGERPRINT_FILE = '.source-fingerprint'
+
+
+def static_fingerprint():
+    """SHA-256 over every source file collectstatic would copy, with its path."""
+    manifest = {}
+    for finder in get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            # The first finder to list a path wins, as in collectstatic
+            if path in manifest:
+                continue
+            digest = hashlib.sha256()
+            with storage.open(path) as handle:
+                for chunk in iter(lambda: handle.read(64 * 1024), b''):
+                    digest.update(chunk)
+            manifest[path] = digest.hexdigest()
+    fingerprint = hashlib.sha256(settings.STORAGES['staticfiles']['BACKEND'].encode())
+    for path in sorted(manifest):
+        fingerprint.update(f'{path}\0{manifest[path]}\n'.encode())
+    return fingerprint.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Run migrate and collectstatic on container start, skipping whichever has nothing to do'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Run both unconditionally')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self._migrate(options['full'])
+        self._collectstatic(options['full'])
+        self.stdout.write(f'Startup tasks took {time.perf_counter() - started:.2f}s')
+
+    def _migrate(self, full):
+        started = time.perf_counter()
+        connection = connections[DEFAULT_DB_ALIAS]
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan and not full:
+            self.stdout.write(f'Migrations: nothing to apply, skipped ({time.perf_counter() - started:.2f}s)')
+            return
+        call_command('migrate', interactive=False, verbosity=1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Migrations: applied {len(plan)} ({time.perf_counter() - started:.2f}s)'
+        ))
+
+    def _collectstatic(self, full):
+        started = time.perf_counter()
+        stamp = Path(settings.STATIC_ROOT) / FINGERPRINT_FILE
+        fingerprint = static_fingerprint()
+        if not full and stamp.exists() and stamp.read_text().strip() == fingerprint:
+            self.stdout.write(f'Static files: unchanged, skipped ({time.perf_counter() - started:.2f}s)')
+            return
+        call_command('collectstatic', interactive=False, verbosity=1)
+        stamp.write_text(fingerprint + '\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Static files: collected ({time.perf_counter() - started:.2f}s)'
+        ))
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.contentmanagement.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable upload sessions (and their partial files) that have been idle too long'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48, help='Idle time before a session is purged (default 48)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        purged = 0
+        for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+            session.discard()
+            session.delete()
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} upload sessions idle for more than {options["hours"]} hours.'))
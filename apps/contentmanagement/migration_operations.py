@@ -0,0 +1,23 @@
+"""Migration operations shared by the contentmanagement migrations."""
+
+from django.contrib.postgres import operations as postgres_operations
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """Django's AddIndexConcurrently, as a plain AddIndex off PostgreSQL.
+
+    sqlite in development has no CREATE INDEX CONCURRENTLY. Migrations using
+    this must set ``atomic = False``; if a concurrent build fails, PostgreSQL
+    leaves an INVALID index behind that has to be dropped before re-running.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+        return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+        return super().database_backwards(app_label, schema_editor, from_state, to_state)
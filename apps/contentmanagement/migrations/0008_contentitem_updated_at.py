@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contentmanagement', '0007_auto_20260129_0948'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentitem',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:46
+
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+# The delta format as of this migration, copied from versioning.py so later
+# changes there cannot change what this migration writes or reads.
+SNAPSHOT_INTERVAL = 10
+
+_TOKEN_BOUNDARY = re.compile(r'(?<=[>\n])')
+
+
+def _tokenize(text):
+    return [token for token in _TOKEN_BOUNDARY.split(text or '') if token]
+
+
+def _make_delta(old, new):
+    old_tokens, new_tokens = _tokenize(old), _tokenize(new)
+    ops = []
+    matcher = SequenceMatcher(None, old_tokens, new_tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(new_tokens[j1:j2]))
+    return ops
+
+
+def _apply_delta(old, ops):
+    old_tokens = _tokenize(old)
+    return ''.join(
+        ''.join(old_tokens[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in ops
+    )
+
+
+def _pack(payload):
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def _encode_version(body, previous_body, chain_length):
+    if previous_body is None or chain_length >= SNAPSHOT_INTERVAL:
+        return True, _pack(body or '')
+    return False, _pack(_make_delta(previous_body, body))
+
+
+def move_previous_versions(apps, schema_editor):
+    """Re-encode each page's previous_versions blob as ContentPageVersion rows."""
+    ContentPage = apps.get_model('contentmanagement', 'ContentPage')
+    ContentPageVersion = apps.get_model('contentmanagement', 'ContentPageVersion')
+
+    for page in ContentPage.objects.only('pk', 'previous_versions').iterator():
+        entries = sorted(
+            ((int(key), value) for key, value in (page.previous_versions or {}).items() if key.isdigit()),
+            key=lambda entry: entry[0],
+        )
+        rows = []
+        previous_body, chain_length = None, 0
+        for version_number, entry in entries:
+            body = entry.get('body') or ''
+            is_snapshot, data = _encode_version(body, previous_body, chain_length)
+            chain_length = 1 if is_snapshot else chain_length + 1
+            previous_body = body
+            rows.append(ContentPageVersion(
+                page_id=page.pk,
+                version_number=version_number,
+                status=entry.get('status') or '',
+                updated_at=parse_datetime(entry.get('updated_at') or ''),
+                is_snapshot=is_snapshot,
+                data=data,
+            ))
+        ContentPageVersion.objects.bulk_create(rows, batch_size=500)
+
+
+def restore_previous_versions(apps, schema_editor):
+    ContentPage = apps.get_model('contentmanagement', 'ContentPage')
+    ContentPageVersion = apps.get_model('contentmanagement', 'ContentPageVersion')
+
+    history = {}
+    body = None
+    versions = ContentPageVersion.objects.order_by('page_id', 'version_number').iterator()
+    for version in versions:
+        payload = _unpack(version.data)
+        body = payload if version.is_snapshot else _apply_delta(body, payload)
+        history.setdefault(version.page_id, {})[str(version.version_number)] = {
+            'status': version.status,
+            'body': body,
+            'updated_at': str(version.updated_at),
+        }
+    for page_id, previous_versions in history.items():
+        ContentPage.objects.filter(pk=page_id).update(previous_versions=previous_versions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contentmanagement', '0008_contentitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentPageVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version_number', models.IntegerField()),
+                ('status', models.CharField(max_length=20)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('data', models.BinaryField()),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='contentmanagement.contentpage')),
+            ],
+            options={
+                'ordering': ['-version_number'],
+                'constraints': [models.UniqueConstraint(fields=('page', 'version_number'), name='unique_contentpage_version')],
+            },
+        ),
+        migrations.RunPython(move_previous_versions, restore_previous_versions),
+        migrations.RemoveField(
+            model_name='contentpage',
+            name='previous_versions',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+from apps.contentmanagement.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('contentmanagement', '0009_contentpageversion'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='contentitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', 'id'], name='contentitem_live_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='contentitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['status', '-created_at', 'id'], name='contentitem_live_status'),
+        ),
+        AddIndexConcurrently(
+            model_name='contentitem',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('status', 'published')), fields=['-published_at'], name='contentitem_published_feed'),
+        ),
+        AddIndexConcurrently(
+            model_name='contentitem',
+            index=models.Index(fields=['created_at'], name='contentitem_created_at'),
+        ),
+    ]
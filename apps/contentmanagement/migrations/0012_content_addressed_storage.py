@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:06
+
+import apps.contentmanagement.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contentmanagement', '0011_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contentitem',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=apps.contentmanagement.storage.content_storage, upload_to='content_files/%Y/%m/%d'),
+        ),
+        migrations.AlterField(
+            model_name='contentpage',
+            name='documents',
+            field=models.FileField(blank=True, null=True, storage=apps.contentmanagement.storage.content_storage, upload_to='documents/'),
+        ),
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('refcount', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('refcount__lte', 0)), fields=['updated_at'], name='storedblob_unreferenced')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contentmanagement', '0012_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentPack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(unique=True)),
+                ('content_sha256', models.CharField(max_length=64)),
+                ('archive', models.FileField(upload_to='packs/')),
+                ('archive_sha256', models.CharField(max_length=64)),
+                ('archive_size', models.BigIntegerField()),
+                ('patch', models.FileField(blank=True, upload_to='packs/')),
+                ('patch_size', models.BigIntegerField(blank=True, null=True)),
+                ('item_count', models.IntegerField()),
+                ('asset_count', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-version'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.db import migrations, models
+
+import apps.contentmanagement.search
+from apps.contentmanagement import search
+from apps.contentmanagement.migration_operations import AddIndexConcurrently
+
+
+def create_fts_index(apps, schema_editor):
+    search.create_fts_index(schema_editor)
+
+
+def drop_fts_index(apps, schema_editor):
+    search.drop_fts_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+    """Full-text index over ContentItem title, slug and body (see ``search``)."""
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('contentmanagement', '0013_contentpack'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentitem',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=apps.contentmanagement.search.PostgresOnly(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector(django.db.models.functions.text.Replace('slug', models.Value('-'), models.Value(' ')), config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('body', config='english', weight='C'), django.contrib.postgres.search.SearchConfig('english'))), output_field=django.contrib.postgres.search.SearchVectorField(null=True)),
+        ),
+        AddIndexConcurrently(
+            model_name='contentitem',
+            index=apps.contentmanagement.search.SearchVectorIndex(fields=['search_vector'], name='contentitem_search_vector'),
+        ),
+        # SQLite has no tsvector; it searches an FTS5 table kept by triggers
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contentmanagement', '0014_contentitem_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentPackState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('requested', models.PositiveBigIntegerField(default=0)),
+                ('built', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
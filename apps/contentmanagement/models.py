@@ -1,12 +1,95 @@
-from django.db import models
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files import File
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Substr
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from wagtail.models import Page
 from django.conf import settings
 from django.utils import timezone
 from django.utils.text import slugify
 
+from utils.metrics import count_transition
+
+from . import versioning
+from .caching import bump_generation
+from .search import SearchVectorIndex, search_vector
+from .storage import content_storage
+
 class HomePage(Page):
     pass
 
+class StoredBlob(models.Model):
+    """A file kept once by ContentAddressedStorage and the number of uses.
+
+    Live ContentItems and ContentPages hold a reference to their file's blob;
+    soft-deleted items do not. See ``storage`` for the garbage collection.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.BigIntegerField()
+    refcount = models.IntegerField(default=0)
+    # Touched on every save/release; unreferenced blobs are collected after a grace period
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], condition=models.Q(refcount__lte=0), name='storedblob_unreferenced'),
+        ]
+
+    @classmethod
+    def register(cls, name, sha256, size):
+        blob, created = cls.objects.get_or_create(name=name, defaults={'sha256': sha256, 'size': size})
+        if not created:
+            cls.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+        return blob
+
+    @classmethod
+    def _adjust(cls, names, sign):
+        # One UPDATE per distinct count, so N items sharing a blob cost one query
+        by_count = {}
+        for name, count in Counter(name for name in names if name).items():
+            by_count.setdefault(count, []).append(name)
+        for count, batch in by_count.items():
+            cls.objects.filter(name__in=batch).update(
+                refcount=models.F('refcount') + sign * count,
+                updated_at=timezone.now(),
+            )
+
+    @classmethod
+    def retain(cls, names):
+        cls._adjust(names, 1)
+
+    @classmethod
+    def release(cls, names):
+        cls._adjust(names, -1)
+
+    @classmethod
+    def swap(cls, old_name, new_name):
+        """Move one reference from ``old_name`` to ``new_name``."""
+        if old_name != new_name:
+            cls.retain([new_name])
+            cls.release([old_name])
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+class ContentItemManager(models.Manager):
+    def get_queryset(self):
+        # The tsvector is only ever read inside the database (see ``search``)
+        return super().get_queryset().defer('search_vector')
+
+
 class ContentItem(models.Model):
     # Workflow states (storage values chosen for clarity)
     STATUS_FOR_EDITING = 'for_editing'        # Newly uploaded -> For editing
@@ -23,10 +106,18 @@ class ContentItem(models.Model):
         (STATUS_DELETED, 'Deleted'),
     ]
 
+    # Workflow transitions: name -> (allowed source states, target state)
+    TRANSITIONS = {
+        'send_for_approval': ((STATUS_FOR_EDITING,), STATUS_FOR_APPROVAL),
+        'approve': ((STATUS_FOR_APPROVAL,), STATUS_FOR_PUBLISHING),
+        'deny': ((STATUS_FOR_APPROVAL, STATUS_FOR_PUBLISHING), STATUS_FOR_EDITING),
+        'publish': ((STATUS_FOR_PUBLISHING,), STATUS_PUBLISHED),
+    }
+
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     body = models.TextField(blank=True)
-    file = models.FileField(upload_to='content_files/%Y/%m/%d', null=True, blank=True)
+    file = models.FileField(upload_to='content_files/%Y/%m/%d', storage=content_storage, null=True, blank=True)
 
     status = models.CharField(max_length=32, choices=STATUS_CHOICES, default=STATUS_FOR_EDITING)
 
@@ -44,19 +135,199 @@ class ContentItem(models.Model):
 
     is_deleted = models.BooleanField(default=False)
 
+    # Bumped on every save (workflow transitions and soft deletes included) so
+    # game clients can ask for "everything that changed since X".
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    # Full-text index over title, slug and body; NULL off PostgreSQL (see ``search``)
+    search_vector = models.GeneratedField(
+        expression=search_vector(), output_field=SearchVectorField(null=True), db_persist=True,
+    )
+
+    objects = ContentItemManager()
+
     class Meta:
         ordering = ['-created_at']
+        # Matched to the hot queries; `manage.py explain_hot_queries` checks they are used.
+        indexes = [
+            # Editor list: live items newest first, optionally filtered by status
+            models.Index(fields=['-created_at', 'id'], condition=models.Q(is_deleted=False), name='contentitem_live_created'),
+            models.Index(fields=['status', '-created_at', 'id'], condition=models.Q(is_deleted=False), name='contentitem_live_status'),
+            # Game feed: published, not deleted, newest publication first
+            models.Index(
+                fields=['-published_at'],
+                condition=models.Q(is_deleted=False, status='published'),
+                name='contentitem_published_feed',
+            ),
+            # Analytics rollup refresh and report exports scan by creation time
+            models.Index(fields=['created_at'], name='contentitem_created_at'),
+            # ?q= on PostgreSQL
+            SearchVectorIndex(fields=['search_vector'], name='contentitem_search_vector'),
+        ]
+
+    # How often to re-allocate when a concurrent insert grabs the same slug
+    SLUG_ATTEMPTS = 5
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = slugify(self.title) if self.title else 'content'
+        self.updated_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'updated_at' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['updated_at']
+
+        # Keep StoredBlob reference counts in step with the file column
+        tracks_file = not self.is_deleted and (update_fields is None or 'file' in update_fields)
+        old_file = None
+        if tracks_file and self.pk and not self._state.adding:
+            old_file = ContentItem.objects.filter(pk=self.pk).values_list('file', flat=True).first()
+
+        self._save_with_slug(*args, **kwargs)
+        if tracks_file:
+            StoredBlob.swap(old_file or '', self.file.name or '')
+        bump_generation()
+        if self.status == self.STATUS_PUBLISHED and not self.is_deleted:
+            # Publishing or editing published content changes the game's pack
+            from .packs import schedule_pack_build
+            schedule_pack_build()
+
+    def _save_with_slug(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        # Allocate optimistically and let the unique constraint arbitrate:
+        # a concurrent upload that takes the same slug makes us retry.
+        for attempt in range(self.SLUG_ATTEMPTS):
+            self.assign_slugs([self], exclude_pk=self.pk)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == self.SLUG_ATTEMPTS - 1 or not self._slug_taken():
+                    raise
+                self.slug = ''
+
+    def _slug_taken(self):
+        return ContentItem.objects.filter(slug=self.slug).exclude(pk=self.pk).exists()
+
+    @staticmethod
+    def base_slug(title):
+        # Leave room for a "-<n>" suffix within max_length
+        return (slugify(title) if title else '')[:240].strip('-') or 'content'
+
+    @classmethod
+    def slug_usage(cls, bases, exclude_pk=None):
+        """Return ``{base: (base_taken, highest_suffix)}`` for each base slug.
+
+        One aggregate query per 100 distinct bases, however many ``base-N``
+        slugs already exist.
+        """
+        usage = {}
+        bases = list(dict.fromkeys(bases))
+        for offset in range(0, len(bases), 100):
+            chunk = bases[offset:offset + 100]
+            where = models.Q()
+            aggregates = {}
+            for n, base in enumerate(chunk):
+                where |= models.Q(slug=base) | models.Q(slug__startswith=f'{base}-')
+                aggregates[f'taken_{n}'] = models.Count('pk', filter=models.Q(slug=base))
+                aggregates[f'suffix_{n}'] = models.Max(
+                    Cast(Substr('slug', len(base) + 2), models.IntegerField()),
+                    filter=models.Q(slug__regex=rf'^{re.escape(base)}-[0-9]{{1,9}}$'),
+                )
+            qs = cls.objects.filter(where)
+            if exclude_pk is not None:
+                qs = qs.exclude(pk=exclude_pk)
+            row = qs.aggregate(**aggregates)
+            for n, base in enumerate(chunk):
+                usage[base] = (bool(row[f'taken_{n}']), row[f'suffix_{n}'] or 0)
+        return usage
+
+    @classmethod
+    def assign_slugs(cls, items, exclude_pk=None):
+        """Give every slug-less item in ``items`` a free slug.
+
+        Works on unsaved instances, so it can prepare rows for bulk_create.
+        """
+        pending = [item for item in items if not item.slug]
+        if not pending:
+            return items
+        usage = cls.slug_usage([cls.base_slug(item.title) for item in pending], exclude_pk=exclude_pk)
+        # Slugs given out in this batch: one item's base may be another's "base-N"
+        allocated = {item.slug for item in items if item.slug}
+        for item in pending:
+            base = cls.base_slug(item.title)
+            taken, suffix = usage[base]
             slug = base
-            idx = 1
-            while ContentItem.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{idx}"
-                idx += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+            while taken or slug in allocated:
+                taken = False
+                suffix += 1
+                slug = f"{base}-{suffix}"
+            item.slug = slug
+            allocated.add(slug)
+            usage[base] = (True, suffix)
+        return items
+
+    @classmethod
+    def bulk_create_with_slugs(cls, items, batch_size=500):
+        """bulk_create that allocates slugs and retries if one is taken meanwhile."""
+        auto = [item for item in items if not item.slug]
+        now = timezone.now()
+        for item in items:
+            item.updated_at = now
+        for attempt in range(cls.SLUG_ATTEMPTS):
+            cls.assign_slugs(items)
+            try:
+                with transaction.atomic():
+                    created = cls.objects.bulk_create(items, batch_size=batch_size)
+                    StoredBlob.retain([item.file.name for item in items if item.file and not item.is_deleted])
+                    bump_generation()
+                    if any(item.status == cls.STATUS_PUBLISHED and not item.is_deleted for item in items):
+                        from .packs import schedule_pack_build
+                        schedule_pack_build()
+                    return created
+            except IntegrityError:
+                if attempt == cls.SLUG_ATTEMPTS - 1 or not auto:
+                    raise
+                for item in auto:
+                    item.slug = ''
+
+    @classmethod
+    def bulk_transition(cls, ids, transition, user=None):
+        """Apply a workflow transition to many items in one transaction.
+
+        The rows are locked and their states checked with one query, and all
+        eligible items move with a single UPDATE. Returns ``{id: error}``
+        where error is None for items that moved.
+        """
+        sources, target = cls.TRANSITIONS[transition]
+        now = timezone.now()
+        changes = {'status': target, 'updated_at': now}
+        if transition == 'send_for_approval':
+            changes.update(edited_at=now, **({'edited_by': user} if user else {}))
+        elif transition == 'approve':
+            changes.update(approved_at=now, **({'approved_by': user} if user else {}))
+        elif transition == 'deny':
+            changes.update(approved_at=None, approved_by=None)
+        elif transition == 'publish':
+            changes.update(published_at=now, **({'published_by': user} if user else {}))
+
+        results = {pk: 'not found' for pk in ids}
+        with transaction.atomic():
+            rows = cls.objects.select_for_update().filter(pk__in=ids, is_deleted=False).values_list('pk', 'status')
+            eligible = []
+            for pk, status in rows:
+                if status in sources:
+                    eligible.append(pk)
+                    results[pk] = None
+                else:
+                    results[pk] = f"cannot {transition.replace('_', ' ')} an item that is {status.replace('_', ' ')}"
+            if eligible:
+                cls.objects.filter(pk__in=eligible).update(**changes)
+                bump_generation()
+                count_transition(transition, len(eligible))
+                if target == cls.STATUS_PUBLISHED:
+                    from .packs import schedule_pack_build
+                    schedule_pack_build()
+        return results
 
     def send_for_approval(self, user=None):
         # Move from For editing -> For approval
@@ -65,6 +336,7 @@ class ContentItem(models.Model):
         if user:
             self.edited_by = user
         self.save(update_fields=['status', 'edited_at', 'edited_by'])
+        count_transition('send_for_approval')
 
     def approve(self, user=None):
         # Move from For approval -> For publishing
@@ -73,6 +345,15 @@ class ContentItem(models.Model):
         if user:
             self.approved_by = user
         self.save(update_fields=['status', 'approved_at', 'approved_by'])
+        count_transition('approve')
+
+    def deny(self, user=None):
+        # Move back to For editing and clear the approval
+        self.status = self.STATUS_FOR_EDITING
+        self.approved_by = None
+        self.approved_at = None
+        self.save(update_fields=['status', 'approved_by', 'approved_at'])
+        count_transition('deny')
 
     def publish(self, user=None):
         # Move from For publishing -> Published
@@ -80,21 +361,240 @@ class ContentItem(models.Model):
         self.published_at = timezone.now()
         if user:
             self.published_by = user
+        # save() schedules the pack build
         self.save(update_fields=['status', 'published_at', 'published_by'])
+        count_transition('publish')
 
     def soft_delete(self, user=None):
+        was_deleted, was_published = self.is_deleted, self.status == self.STATUS_PUBLISHED
         self.is_deleted = True
         self.status = self.STATUS_DELETED
         self.save(update_fields=['is_deleted', 'status'])
+        if not was_deleted:
+            count_transition('soft_delete')
+        if self.file and not was_deleted:
+            StoredBlob.release([self.file.name])
+        if was_published:
+            # The item has to drop out of the game's content pack
+            from .packs import schedule_pack_build
+            schedule_pack_build()
 
     def __str__(self):
         return f"{self.title} ({self.status})"
 
 
+class ContentPack(models.Model):
+    """A snapshot of every published ContentItem as one archive (see ``packs``).
+
+    ``patch`` turns the previous version's archive into this one.
+    """
+    version = models.PositiveIntegerField(unique=True)
+    # Hash of the manifest's item data; unchanged content is not packed again
+    content_sha256 = models.CharField(max_length=64)
+    archive = models.FileField(upload_to='packs/')
+    archive_sha256 = models.CharField(max_length=64)
+    archive_size = models.BigIntegerField()
+    patch = models.FileField(upload_to='packs/', blank=True)
+    patch_size = models.BigIntegerField(null=True, blank=True)
+    item_count = models.IntegerField()
+    asset_count = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-version']
+
+    def __str__(self):
+        return f"Content pack v{self.version} ({self.item_count} items)"
+
+
+class ContentPackState(models.Model):
+    """Pack build requests (see ``packs``).
+
+    Publishing bumps ``requested``; a finished build stores the value it
+    started from in ``built``. A build that dies part-way leaves the request
+    pending for the next worker or ``build_content_pack --pending``.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    requested = models.PositiveBigIntegerField(default=0)
+    built = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.built}/{self.requested}"
+
+
+class ContentItemTombstone(models.Model):
+    """A hard-deleted ContentItem that game clients may still hold.
+
+    Soft-deleted items keep their row and show up as tombstones in the game
+    sync on their own; a hard delete leaves this behind instead. Rows older
+    than ``KEEP`` are pruned, since sync tokens that old are no longer
+    accepted and those clients get a full snapshot.
+    """
+    KEEP = timedelta(days=30)
+
+    item_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.item_id} deleted {self.deleted_at}"
+
+
+class UploadError(ValueError):
+    pass
+
+
+class _SessionFile(File):
+    # Lets FileSystemStorage move the finished upload into place instead of copying it
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class UploadSession(models.Model):
+    """A resumable upload of a ContentItem file.
+
+    The client creates a session with the file's name and size, PUTs byte
+    ranges in order (resuming from ``received`` after a dropped connection),
+    then finalizes. Bytes go straight to a part file under
+    ``CONTENT_UPLOAD_SESSION_DIR``; nothing is held in memory.
+    """
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETE = 'complete'
+
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    READ_SIZE = 64 * 1024
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+    # Existing item whose file is replaced on finalize; a new item is created otherwise
+    content_item = models.ForeignKey(ContentItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def path(self):
+        return os.path.join(settings.CONTENT_UPLOAD_SESSION_DIR, f'{self.pk}.part')
+
+    def write_chunk(self, start, stream, length):
+        """Write ``length`` bytes read from ``stream`` at offset ``start``.
+
+        Whatever arrives is kept, so a chunk cut short by a dropped connection
+        still moves the offset forward. Returns the number of bytes written.
+
+        The body is spooled to a temp file and copied into the part file only
+        after the session row is locked at ``start``: a racing request cannot
+        overwrite bytes already credited, and a slow client never holds the lock.
+        """
+        if start != self.received:
+            raise UploadError(f'Expected a chunk starting at byte {self.received}')
+        os.makedirs(settings.CONTENT_UPLOAD_SESSION_DIR, exist_ok=True)
+        written = 0
+        with tempfile.TemporaryFile(dir=settings.CONTENT_UPLOAD_SESSION_DIR) as spool:
+            while written < length:
+                data = stream.read(min(self.READ_SIZE, length - written))
+                if not data:
+                    break
+                spool.write(data)
+                written += len(data)
+            spool.seek(0)
+
+            with transaction.atomic():
+                self.status, self.received = UploadSession.objects.select_for_update().values_list(
+                    'status', 'received',
+                ).get(pk=self.pk)
+                if self.status != self.STATUS_UPLOADING:
+                    raise UploadError('This upload has already been finalized')
+                if self.received != start:
+                    raise UploadError(f'Another request moved this upload to byte {self.received}')
+                with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as part:
+                    part.seek(start)
+                    shutil.copyfileobj(spool, part, self.READ_SIZE)
+                    # Drop bytes left over from an earlier attempt that never got counted
+                    part.truncate()
+                UploadSession.objects.filter(pk=self.pk).update(received=start + written, updated_at=timezone.now())
+        self.received = start + written
+        return written
+
+    def checksum(self):
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as part:
+            for block in iter(lambda: part.read(self.READ_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def finalize(self, user, sha256='', title='', body=''):
+        """Verify the upload and attach it to ``content_item`` or a new item.
+
+        Returns the item, or None when the checksum did not match; the part
+        file is then discarded and the upload starts again from byte 0.
+        """
+        with transaction.atomic():
+            # Lock the session so two finalize calls cannot both attach it
+            self.status, self.received = UploadSession.objects.select_for_update().values_list(
+                'status', 'received',
+            ).get(pk=self.pk)
+            if self.status != self.STATUS_UPLOADING:
+                raise UploadError('This upload has already been finalized')
+            if self.received != self.size:
+                raise UploadError(f'Upload incomplete: {self.received} of {self.size} bytes received')
+            expected = (sha256 or self.sha256).lower()
+            if not expected:
+                raise UploadError('A sha256 checksum is required to finalize')
+            if not os.path.exists(self.path) or self.checksum() != expected:
+                # The bad bytes cannot be located, so the upload starts over
+                self.discard()
+                self.received = 0
+                self.save(update_fields=['received', 'updated_at'])
+                return None
+
+            item = self.content_item
+            with open(self.path, 'rb') as part:
+                if item is None:
+                    item = ContentItem(
+                        title=title or os.path.splitext(self.filename)[0] or self.filename,
+                        body=body,
+                        created_by=user,
+                        status=ContentItem.STATUS_FOR_EDITING,
+                    )
+                    item.file.save(self.filename, _SessionFile(part), save=False)
+                    item.save()
+                else:
+                    item.file.save(self.filename, _SessionFile(part), save=False)
+                    item.edited_by = user
+                    item.save(update_fields=['file', 'edited_by'])
+            self.content_item = item
+            self.sha256 = expected
+            self.status = self.STATUS_COMPLETE
+            self.save(update_fields=['content_item', 'sha256', 'status', 'updated_at'])
+        self.discard()
+        return item
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
 # ContentPage model for the workflow system
 from wagtail.models import Page
 from wagtail.fields import RichTextField
 from wagtail.admin.panels import FieldPanel
+from wagtail.search import index
 from django.contrib.auth.models import User
 
 
@@ -116,9 +616,8 @@ class ContentPage(Page):
     reviewer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='content_reviewers')
     approver = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='content_approvers')
     
-    # Store version history
-    previous_versions = models.JSONField(default=dict, blank=True)
-    
+    # Version history lives in ContentPageVersion (delta-compressed)
+
     # Media management fields
     featured_image = models.ForeignKey(
         'wagtailimages.Image',
@@ -127,7 +626,7 @@ class ContentPage(Page):
         on_delete=models.SET_NULL,
         related_name='+'
     )
-    documents = models.FileField(upload_to='documents/', blank=True, null=True)
+    documents = models.FileField(upload_to='documents/', storage=content_storage, blank=True, null=True)
     video_url = models.URLField(blank=True, null=True)
     
     # Main content fields - note: we don't define title since Page already has it
@@ -144,25 +643,110 @@ class ContentPage(Page):
         FieldPanel('featured_image'),
         FieldPanel('documents'),
         FieldPanel('video_url'),
-        FieldPanel('previous_versions'),
+    ]
+
+    # Indexed on save by Wagtail; serves ?q= on the pages endpoint (see ``search``)
+    search_fields = Page.search_fields + [
+        index.SearchField('slug'),
+        index.SearchField('body'),
+        index.FilterField('status'),
     ]
     
     def save(self, *args, **kwargs):
         # Handle versioning when content is updated
+        replaced = None
+        old_documents = ''
         if self.pk:
-            old_instance = ContentPage.objects.get(pk=self.pk)
-            if old_instance.status != self.status or old_instance.body != self.body:
-                # Create version history entry
-                if not self.previous_versions:
-                    self.previous_versions = {}
-                self.previous_versions[str(self.version_number)] = {
-                    'status': old_instance.status,
-                    'body': old_instance.body,
-                    'updated_at': str(old_instance.updated_at),
-                }
+            old = ContentPage.objects.filter(pk=self.pk).values('status', 'body', 'updated_at', 'documents').first()
+            if old and (old['status'] != self.status or old['body'] != self.body):
+                replaced = (self.version_number, old)
                 self.version_number += 1
-        
+            old_documents = (old or {}).get('documents') or ''
+
         super().save(*args, **kwargs)
-        
+        StoredBlob.swap(old_documents, self.documents.name or '')
+
+        if replaced:
+            version_number, old = replaced
+            ContentPageVersion.record(self, version_number, old['status'], old['body'], old['updated_at'])
+
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class ContentPageVersion(models.Model):
+    """A superseded ContentPage body, stored as a snapshot or a delta.
+
+    Version N holds the page as it was before the save that produced N + 1
+    (the same meaning the old ``previous_versions`` keys had). See
+    ``versioning`` for the encoding.
+    """
+    page = models.ForeignKey(ContentPage, on_delete=models.CASCADE, related_name='versions')
+    version_number = models.IntegerField()
+    status = models.CharField(max_length=20)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    is_snapshot = models.BooleanField(default=False)
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['-version_number']
+        constraints = [
+            models.UniqueConstraint(fields=['page', 'version_number'], name='unique_contentpage_version'),
+        ]
+
+    @classmethod
+    def chain(cls, page_id, version_number):
+        """``(is_snapshot, data)`` rows needed to rebuild a version, oldest first."""
+        last_snapshot = cls.objects.filter(
+            page_id=page_id, version_number__lte=version_number, is_snapshot=True,
+        ).order_by('-version_number').values('version_number')[:1]
+        return list(
+            cls.objects.filter(
+                page_id=page_id,
+                version_number__gte=models.Subquery(last_snapshot),
+                version_number__lte=version_number,
+            ).order_by('version_number').values_list('is_snapshot', 'data')
+        )
+
+    @classmethod
+    def record(cls, page, version_number, status, body, updated_at=None):
+        previous = cls.chain(page.pk, version_number - 1)
+        previous_body = versioning.rebuild(previous) if previous else None
+        is_snapshot, data = versioning.encode_version(body, previous_body, len(previous))
+        return cls.objects.create(
+            page=page,
+            version_number=version_number,
+            status=status,
+            updated_at=updated_at,
+            is_snapshot=is_snapshot,
+            data=data,
+        )
+
+    def get_body(self):
+        return versioning.rebuild(self.chain(self.page_id, self.version_number))
+
+    def __str__(self):
+        return f"{self.page_id} v{self.version_number}"
+
+
+@receiver(post_delete, sender=ContentItem)
+def release_content_item_file(sender, instance, **kwargs):
+    # Soft-deleted items already gave their reference back
+    if instance.file and not instance.is_deleted:
+        StoredBlob.release([instance.file.name])
+    bump_generation()
+
+
+@receiver(post_delete, sender=ContentItem)
+def record_content_item_tombstone(sender, instance, **kwargs):
+    # Only items the game could have received need a tombstone
+    if instance.published_at:
+        now = timezone.now()
+        ContentItemTombstone.objects.create(item_id=instance.pk, deleted_at=now)
+        ContentItemTombstone.objects.filter(deleted_at__lt=now - ContentItemTombstone.KEEP).delete()
+
+
+@receiver(post_delete, sender=ContentPage)
+def release_content_page_documents(sender, instance, **kwargs):
+    if instance.documents:
+        StoredBlob.release([instance.documents.name])
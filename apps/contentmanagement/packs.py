@@ -0,0 +1,315 @@
+"""Content packs: every published ContentItem in one versioned archive.
+
+A pack is a ZIP holding ``manifest.json`` and ``assets/<sha256><ext>``, one
+entry per distinct file, so an asset shared by several items is stored once.
+Entries are sorted and carry fixed timestamps, so the same content always
+produces the same bytes, and the archive is named after its own SHA-256.
+
+Each new pack also gets a patch from the previous version: a ZIP with the new
+``manifest.json``, the assets the previous pack lacked and ``patch.json``
+listing the assets to drop. Assets are content-addressed, so this is an exact
+asset-level diff; media files are already compressed and gain little from a
+byte-level diff. A client applies it by removing ``removed_assets``, adding
+the new files and replacing the manifest.
+
+Every publish, save of a published item and unpublish records a build
+request in ContentPackState once it commits. ``manage.py build_content_pack --pending``, run from cron or
+a worker, builds whatever is pending; with ``CONTENT_PACK_BUILD_ON_PUBLISH``
+on, the web worker that published also starts one in a background thread.
+Builds take a PostgreSQL advisory lock, so one runs server-wide at a time; a
+build cut short (a worker killed on deploy) leaves its request pending.
+Content that is unchanged since the latest pack is not packed again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F, Max
+
+from .downloads import file_version
+from .models import ContentItem, ContentPack, ContentPackState
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+READ_SIZE = 64 * 1024
+# Fixed entry timestamps keep archives byte-for-byte reproducible
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+BUILD_STATE = 'content_pack'
+# pg_try_advisory_lock key; any constant no other code locks on
+BUILD_LOCK_KEY = 0x636D7061636B
+# Already-compressed media is stored as is
+STORED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp3', '.mp4', '.m4a', '.mov', '.webm', '.zip', '.pdf'}
+
+
+def _entry(name, compress=True):
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+    info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def _write_json(archive, name, payload):
+    data = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    archive.writestr(_entry(name), data)
+
+
+def _write_asset(archive, name, field_file):
+    info = _entry(name, compress=os.path.splitext(name)[1] not in STORED_EXTENSIONS)
+    # Lets zipfile decide up front whether the entry needs ZIP64
+    info.file_size = field_file.size
+    with field_file.open('rb') as source, archive.open(info, 'w') as target:
+        for block in iter(lambda: source.read(READ_SIZE), b''):
+            target.write(block)
+
+
+def _asset_hash(field_file):
+    version = file_version(field_file.name)
+    if version:
+        return version
+    digest = hashlib.sha256()
+    with field_file.open('rb') as source:
+        for block in iter(lambda: source.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def collect_content():
+    """``(items, assets)`` for the current published content.
+
+    ``assets`` maps archive names to the FieldFile holding the bytes.
+    """
+    items, assets = [], {}
+    published = ContentItem.objects.filter(is_deleted=False, status=ContentItem.STATUS_PUBLISHED).order_by('pk')
+    for item in published.only('pk', 'title', 'slug', 'body', 'file', 'published_at', 'updated_at').iterator():
+        asset = None
+        if item.file:
+            try:
+                asset = f'assets/{_asset_hash(item.file)}{os.path.splitext(item.file.name)[1].lower()}'
+                assets.setdefault(asset, item.file)
+            except FileNotFoundError:
+                logger.warning('Content pack: file of item %s is missing (%s)', item.pk, item.file.name)
+        items.append({
+            'id': item.pk,
+            'title': item.title,
+            'slug': item.slug,
+            'body': item.body,
+            'published_at': item.published_at.isoformat() if item.published_at else None,
+            'updated_at': item.updated_at.isoformat(),
+            'asset': asset,
+        })
+    return items, assets
+
+
+def _pack_assets(pack):
+    try:
+        with pack.archive.open('rb') as handle, zipfile.ZipFile(handle) as archive:
+            return {name for name in archive.namelist() if name.startswith('assets/')}
+    except FileNotFoundError:
+        logger.warning('Content pack v%s is missing its archive; building without a patch', pack.version)
+        return None
+
+
+def _hash_file(handle):
+    handle.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: handle.read(READ_SIZE), b''):
+        digest.update(block)
+    handle.seek(0)
+    return digest.hexdigest()
+
+
+def build_pack():
+    """Build a pack of the published content; returns ``(pack, created)``.
+
+    The latest pack is returned as is when the content has not changed
+    since it was built.
+    """
+    items, assets = collect_content()
+    content_sha256 = hashlib.sha256(
+        json.dumps(items, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    ).hexdigest()
+    previous = ContentPack.objects.order_by('-version').first()
+    if previous and previous.content_sha256 == content_sha256:
+        return previous, False
+
+    version = (previous.version if previous else 0) + 1
+    manifest = {
+        'format': FORMAT,
+        'version': version,
+        'content_sha256': content_sha256,
+        'items': items,
+        'assets': {name: {'size': field_file.size} for name, field_file in sorted(assets.items())},
+    }
+
+    with tempfile.TemporaryFile() as archive_file, tempfile.TemporaryFile() as patch_file:
+        with zipfile.ZipFile(archive_file, 'w') as archive:
+            _write_json(archive, 'manifest.json', manifest)
+            for name, field_file in sorted(assets.items()):
+                _write_asset(archive, name, field_file)
+        archive_sha256 = _hash_file(archive_file)
+
+        patch_name = ''
+        old_assets = _pack_assets(previous) if previous else None
+        if old_assets is not None:
+            with zipfile.ZipFile(patch_file, 'w') as patch:
+                _write_json(patch, 'patch.json', {
+                    'format': FORMAT,
+                    'from_version': previous.version,
+                    'to_version': version,
+                    'to_archive_sha256': archive_sha256,
+                    'removed_assets': sorted(old_assets - set(assets)),
+                })
+                _write_json(patch, 'manifest.json', manifest)
+                for name, field_file in sorted(assets.items()):
+                    if name not in old_assets:
+                        _write_asset(patch, name, field_file)
+            patch_name = f'patch-{previous.version}-{version}-{_hash_file(patch_file)[:16]}.zip'
+
+        pack = ContentPack(
+            version=version,
+            content_sha256=content_sha256,
+            archive_sha256=archive_sha256,
+            archive_size=archive_file.seek(0, os.SEEK_END),
+            item_count=len(items),
+            asset_count=len(assets),
+        )
+        archive_file.seek(0)
+        pack.archive.save(f'pack-{version}-{archive_sha256[:16]}.zip', File(archive_file), save=False)
+        if patch_name:
+            pack.patch_size = patch_file.seek(0, os.SEEK_END)
+            patch_file.seek(0)
+            pack.patch.save(patch_name, File(patch_file), save=False)
+
+    try:
+        with transaction.atomic():
+            pack.save()
+    except IntegrityError:
+        # Another worker built this version first
+        _delete_files(pack)
+        return ContentPack.objects.order_by('-version').first(), False
+    prune_packs()
+    return pack, True
+
+
+def _delete_files(pack):
+    pack.archive.delete(save=False)
+    if pack.patch:
+        pack.patch.delete(save=False)
+
+
+def prune_packs(keep=None):
+    keep = settings.CONTENT_PACK_KEEP if keep is None else keep
+    newest = ContentPack.objects.aggregate(newest=Max('version'))['newest']
+    if newest is None:
+        return
+    for pack in ContentPack.objects.filter(version__lte=newest - keep):
+        _delete_files(pack)
+        pack.delete()
+
+
+def request_pack_build():
+    """Record that the published content changed."""
+    if not ContentPackState.objects.filter(name=BUILD_STATE).update(requested=F('requested') + 1):
+        ContentPackState.objects.get_or_create(name=BUILD_STATE, defaults={'requested': 1})
+
+
+def _pending():
+    """The request count a build would cover, or None when nothing is pending."""
+    state = ContentPackState.objects.filter(name=BUILD_STATE).values_list('requested', 'built').first()
+    if state and state[0] > state[1]:
+        return state[0]
+    return None
+
+
+@contextmanager
+def build_lock():
+    """Hold the server-wide build lock; yields False when another process has it.
+
+    A session advisory lock is not tied to a transaction, so publishes never
+    wait on a build, and the server drops it if the holder's connection dies.
+    sqlite in development has a single process and no such lock.
+    """
+    if connection.vendor != 'postgresql':
+        yield True
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [BUILD_LOCK_KEY])
+        taken = cursor.fetchone()[0]
+    try:
+        yield taken
+    finally:
+        if taken:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [BUILD_LOCK_KEY])
+
+
+def build_locked():
+    """``build_pack`` for a caller holding ``build_lock``; settles pending requests."""
+    requested = _pending()
+    result = build_pack()
+    if requested is not None:
+        ContentPackState.objects.filter(name=BUILD_STATE, built__lt=requested).update(built=requested)
+    return result
+
+
+def build_pending():
+    """Build until no request is pending; returns the number of builds.
+
+    Returns None when another process holds the lock. That build re-checks
+    for requests after it unlocks, so ours is not lost.
+    """
+    builds = 0
+    while _pending() is not None:
+        with build_lock() as taken:
+            if not taken:
+                return None
+            while _pending() is not None:
+                build_locked()
+                builds += 1
+    return builds
+
+
+# One background build thread per process; other processes are held off by
+# build_lock.
+_build_thread_lock = threading.Lock()
+
+
+def schedule_pack_build():
+    transaction.on_commit(_on_content_published)
+
+
+def _on_content_published():
+    request_pack_build()
+    if settings.CONTENT_PACK_BUILD_ON_PUBLISH:
+        _start_background_build()
+
+
+def _start_background_build():
+    if _build_thread_lock.acquire(blocking=False):
+        threading.Thread(target=_run_builds, name='content-pack-build', daemon=True).start()
+
+
+def _run_builds():
+    builds = None
+    try:
+        builds = build_pending()
+    except Exception:
+        logger.exception('Content pack build failed')
+    finally:
+        _build_thread_lock.release()
+    try:
+        # A publish in this process may have found the thread still running
+        if builds is not None and _pending() is not None:
+            _start_background_build()
+    finally:
+        connections.close_all()
@@ -0,0 +1,35 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class ContentItemCursorPagination(CursorPagination):
+    """Keyset pagination over ``(-created_at, id)`` for the content list.
+
+    A cursor encodes a position rather than an offset, so items moving between
+    workflow states while an editor pages through do not shift or repeat rows.
+
+    Every list is paginated. With ``CONTENT_LIST_PAGINATED`` off (for clients
+    still expecting a bare list) it applies only when the request carries
+    ``cursor`` or ``page_size``.
+    """
+    ordering = ('-created_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def is_requested(self, request):
+        if settings.CONTENT_LIST_PAGINATED:
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class ContentPageVersionPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,8 +1,31 @@
 from rest_framework.permissions import BasePermission
 
+from apps.authentication.roles import user_has_role
+
 
 def user_in_group(user, name):
-    return user.groups.filter(name=name).exists()
+    return user_has_role(user, name)
+
+
+# Role required for each ContentItem workflow transition
+TRANSITION_ROLES = {
+    'send_for_approval': 'Editor',
+    'approve': 'Approver',
+    'deny': 'Approver',
+    'publish': 'Approver',
+}
+
+
+def can_transition(user, transition):
+    return user.is_superuser or user_in_group(user, TRANSITION_ROLES[transition])
+
+
+# Roles that see content in every workflow state (game clients only see published items)
+CONTENT_VIEW_ROLES = ('Encoder', 'Editor', 'Approver', 'Admin')
+
+
+def can_view_unpublished(user):
+    return user.is_superuser or user_has_role(user, *CONTENT_VIEW_ROLES)
 
 
 class IsContentWorkflowAllowed(BasePermission):
@@ -27,20 +50,16 @@ class IsContentWorkflowAllowed(BasePermission):
 
         action = getattr(view, 'action', None)
         # map actions according to strict roles:
-        # Encoder -> create (upload)
-        # Editor -> create, update/partial_update, send_for_approval
+        # Encoder -> create, batch_create (upload)
+        # Editor -> create, batch_create, update/partial_update, send_for_approval
         # Approver -> approve, publish, deny
+        # Editor/Approver -> bulk_transition (for their own transitions)
         # Admin -> destroy
         # list/retrieve allowed to any role that needs to view content lists
         if action in ('list', 'retrieve'):
-            return (
-                user_in_group(user, 'Encoder') or
-                user_in_group(user, 'Editor') or
-                user_in_group(user, 'Approver') or
-                user_in_group(user, 'Admin')
-            )
-        if action in ('create',):
-            return user_in_group(user, 'Encoder') or user_in_group(user, 'Editor')
+            return user_has_role(user, *CONTENT_VIEW_ROLES)
+        if action in ('create', 'batch_create'):
+            return user_has_role(user, 'Encoder', 'Editor')
         if action in ('update', 'partial_update'):
             return user_in_group(user, 'Editor')
         if action in ('send_for_approval',):
@@ -49,6 +68,9 @@ class IsContentWorkflowAllowed(BasePermission):
             return user_in_group(user, 'Approver')
         if action in ('destroy',):
             return user_in_group(user, 'Admin')
+        if action in ('bulk_transition',):
+            # the view checks the role for the specific transition requested
+            return user_has_role(user, 'Editor', 'Approver')
 
         # default deny
         return False
@@ -56,3 +78,13 @@ class IsContentWorkflowAllowed(BasePermission):
     def has_object_permission(self, request, view, obj):
         # same as has_permission for our simple case; could be extended for ownership
         return self.has_permission(request, view)
+
+
+class CanUploadContent(BasePermission):
+    """Resumable uploads are open to the roles that may create content."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return user.is_superuser or user_has_role(user, 'Encoder', 'Editor')
@@ -0,0 +1,160 @@
+"""Full-text search for the ``?q=`` parameter of the content endpoints.
+
+ContentItems are indexed by the database itself, so every write (``save``,
+``bulk_create``, ``update``) keeps the index current and no query rebuilds it:
+
+- PostgreSQL: ``ContentItem.search_vector``, a stored GeneratedField (title
+  weighted A, slug B, body C) with a GIN index, ranked with ``ts_rank``. The
+  default manager defers it, so rows never carry the tsvector back;
+- SQLite: an FTS5 table over the same columns, maintained by triggers and
+  ranked with ``bm25``; ``search_vector`` is NULL there. Later migrations that
+  alter the table drop the triggers, so ``repair_sqlite_index`` restores them
+  after every migrate.
+
+On PostgreSQL, changing the type of title, slug or body needs the generated
+column dropped first and re-added afterwards.
+
+ContentPage title and slug live on Wagtail's page table, so pages are
+searched through Wagtail's search index instead (``ContentPage.search_fields``),
+which is kept up to date on save and uses tsvector or FTS5 in the same way.
+"""
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db import connection
+from django.db.models import F, FloatField, Func, Index, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Replace
+
+# Ranked results come back as one list rather than cursor pages
+SEARCH_LIMIT = 100
+SEARCH_CONFIG = 'english'
+
+TABLE = 'contentmanagement_contentitem'
+FTS_TABLE = 'contentmanagement_contentitem_fts'
+
+
+class PostgresOnly(Func):
+    """``expression`` on PostgreSQL and NULL on other databases."""
+    template = '%(expressions)s'
+    output_field = SearchVectorField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return 'NULL', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, **extra_context)
+
+
+class SearchVectorIndex(GinIndex):
+    """GIN on PostgreSQL; a plain index over the NULL column elsewhere.
+
+    SQLite rebuilds the table, indexes included, from the model state on
+    most ALTERs, so the index has to be valid DDL there too.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+def search_vector():
+    """The expression behind ``ContentItem.search_vector``."""
+    return PostgresOnly(
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Replace('slug', Value('-'), Value(' ')), weight='B', config=SEARCH_CONFIG)
+        + SearchVector('body', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, slug, body, content='{TABLE}', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS contentitem_fts_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, slug, body) VALUES (new.id, new.title, new.slug, new.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contentitem_fts_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, slug, body) VALUES ('delete', old.id, old.title, old.slug, old.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contentitem_fts_update AFTER UPDATE OF title, slug, body ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, slug, body) VALUES ('delete', old.id, old.title, old.slug, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, slug, body) VALUES (new.id, new.title, new.slug, new.body);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS contentitem_fts_insert',
+    'DROP TRIGGER IF EXISTS contentitem_fts_delete',
+    'DROP TRIGGER IF EXISTS contentitem_fts_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def create_fts_index(schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_INDEX:
+            schema_editor.execute(statement)
+
+
+def drop_fts_index(schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+def repair_sqlite_index(sender, using='default', **kwargs):
+    """post_migrate: recreate the FTS triggers and rebuild the FTS table.
+
+    SQLite applies most ALTERs by copying the table, which drops triggers.
+    """
+    from django.db import connections
+    target = connections[using]
+    if target.vendor != 'sqlite' or FTS_TABLE not in target.introspection.table_names():
+        return
+    with target.cursor() as cursor:
+        for statement in SQLITE_INDEX:
+            cursor.execute(statement)
+
+
+def _fts_query(query):
+    # Quote every term so user input is never parsed as FTS5 syntax
+    terms = [term.replace('"', '') for term in query.split()]
+    return ' '.join(f'"{term}"' for term in terms if term)
+
+
+def search_items(queryset, query):
+    """``queryset`` narrowed to items matching ``query``, best match first."""
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query),
+        ).order_by('-search_rank', '-created_at', 'id')[:SEARCH_LIMIT]
+
+    if connection.vendor == 'sqlite':
+        match = _fts_query(query)
+        if not match:
+            return queryset.none()
+        # bm25 is lower for better matches; title counts most, then slug
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]),
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {TABLE}.id',
+                [match], output_field=FloatField(),
+            ),
+        ).order_by('-search_rank', '-created_at', 'id')[:SEARCH_LIMIT]
+
+    # Other databases have no index; match substrings so ?q= still works
+    terms = query.split()
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(slug__icontains=term) | Q(body__icontains=term)
+    return queryset.filter(condition)[:SEARCH_LIMIT]
+
+
+def search_pages(queryset, query):
+    """Ranked ContentPage results from Wagtail's search index."""
+    return queryset.search(query)[:SEARCH_LIMIT]
@@ -1,12 +1,31 @@
+import os
+
 from rest_framework import serializers
 from wagtail.models import Page  # Updated import for newer Wagtail versions
-from .models import ContentItem, ContentPage
+from .downloads import signed_download_url
+from .models import ContentItem, ContentPack, ContentPage, ContentPageVersion, UploadSession
 from apps.usermanagement.serializers import UserSerializer
+from django.conf import settings
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+class StoredFileNameField(serializers.FileField):
+    """Accepts an upload; reads back as the stored file's name only.
+
+    The default representation is the ``/media/...`` URL of the blob, which
+    bypasses the authorized download view. The name keeps the extension the
+    frontend uses to pick a preview; ``file_url`` is the link to fetch it.
+    """
+
+    def to_representation(self, value):
+        return os.path.basename(value.name) if value else None
+
+
 class ContentItemSerializer(serializers.ModelSerializer):
+    file = StoredFileNameField(max_length=100, required=False, allow_null=True)
     file_url = serializers.SerializerMethodField(read_only=True)
     # Expose related user objects (read-only) so the frontend can show names
     created_by = UserSerializer(read_only=True)
@@ -20,9 +39,22 @@ class ContentItemSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'body', 'file', 'status',
             'created_by', 'created_at', 'edited_by', 'edited_at',
             'approved_by', 'approved_at', 'published_by', 'published_at', 'is_deleted',
-            'file_url',
+            'updated_at', 'file_url',
         ]
-        read_only_fields = ['slug', 'status', 'created_by', 'created_at', 'edited_by', 'edited_at', 'approved_by', 'approved_at', 'published_by', 'published_at', 'is_deleted']
+        read_only_fields = ['slug', 'status', 'created_by', 'created_at', 'edited_by', 'edited_at', 'approved_by', 'approved_at', 'published_by', 'published_at', 'is_deleted', 'updated_at']
+
+    USER_FIELDS = ('created_by', 'edited_by', 'approved_by', 'published_by')
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Join the nested users and prefetch their roles up front.
+
+        Without this every row costs a query per user FK plus one per
+        ``roles`` lookup, so listing N items runs up to 8N+1 queries.
+        """
+        return queryset.select_related(*cls.USER_FIELDS).prefetch_related(
+            *(f'{field}__groups' for field in cls.USER_FIELDS)
+        )
 
     def create(self, validated_data):
         # file uploads handled by DRF parser
@@ -33,36 +65,135 @@ class ContentItemSerializer(serializers.ModelSerializer):
     def get_file_url(self, obj):
         """Return an absolute URL for the attached file if present.
 
-        Uses request in context when available so the mobile app gets a usable URL.
+        The URL points at the authorized download view, signed for the
+        requesting user so media tags can load it without a JWT header.
+        Shared cached data is serialized ``unsigned`` and signed per request
+        (see ``caching``).
         """
-        try:
-            if not obj.file:
-                return None
-            request = self.context.get('request') if self.context else None
-            url = obj.file.url
-            if request:
-                return request.build_absolute_uri(url)
-            # Fallback: if url is already absolute, return it; else prefix origin
-            if url.startswith('http'):
-                return url
-            return f"{request.scheme if request else 'https'}://{request.get_host() if request else ''}{url}"
-        except Exception:
+        if not obj.file:
+            return None
+        request = self.context.get('request') if self.context else None
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and not self.context.get('unsigned'):
+            url = signed_download_url(obj, user)
+        else:
+            url = reverse('contentitem-download', kwargs={'pk': obj.pk})
+        return request.build_absolute_uri(url) if request else url
+
+
+class ContentItemListSerializer(ContentItemSerializer):
+    """Compact row for paginated content lists.
+
+    Drops ``body`` and the nested user objects; the full payload is still
+    returned by retrieve.
+    """
+    created_by = None
+    edited_by = None
+    approved_by = None
+    published_by = None
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True, default=None)
+
+    class Meta(ContentItemSerializer.Meta):
+        fields = [
+            'id', 'title', 'slug', 'file', 'status', 'created_by_name', 'created_at',
+            'edited_at', 'approved_at', 'published_at', 'is_deleted', 'updated_at', 'file_url',
+        ]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related('created_by').defer('body')
+
+
+class ContentItemImportSerializer(serializers.ModelSerializer):
+    """Validates one row of a batch import (see ``importers``)."""
+
+    class Meta:
+        model = ContentItem
+        fields = ['title', 'body']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+    content_item = serializers.PrimaryKeyRelatedField(
+        queryset=ContentItem.objects.filter(is_deleted=False), required=False, allow_null=True,
+    )
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'sha256', 'offset', 'status', 'content_item', 'created_at']
+        read_only_fields = ['id', 'offset', 'status', 'created_at']
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError('The file is empty.')
+        if value > settings.CONTENT_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Files may be at most {settings.CONTENT_UPLOAD_MAX_SIZE} bytes.')
+        return value
+
+    def validate_sha256(self, value):
+        return value.lower()
+
+
+class UploadFinalizeSerializer(serializers.Serializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+    title = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    body = serializers.CharField(required=False, allow_blank=True)
+
+
+class ContentPackSerializer(serializers.ModelSerializer):
+    archive_url = serializers.SerializerMethodField()
+    patch = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ContentPack
+        fields = [
+            'version', 'content_sha256', 'item_count', 'asset_count',
+            'archive_url', 'archive_sha256', 'archive_size', 'patch', 'created_at',
+        ]
+
+    def _url(self, obj, kind):
+        url = reverse('game-content-pack-file', kwargs={'version': obj.version, 'kind': kind})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_archive_url(self, obj):
+        return self._url(obj, 'archive')
+
+    def get_patch(self, obj):
+        # Only offered to clients that hold the version right before this one
+        if not obj.patch or self.context.get('from_version') != obj.version - 1:
             return None
+        return {'from_version': obj.version - 1, 'url': self._url(obj, 'patch'), 'size': obj.patch_size}
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+    transition = serializers.ChoiceField(choices=sorted(ContentItem.TRANSITIONS))
 
 
 class ContentPageSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
     reviewer_name = serializers.CharField(source='reviewer.username', read_only=True)
     approver_name = serializers.CharField(source='approver.username', read_only=True)
+    documents_url = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = ContentPage
         fields = [
             'id', 'title', 'status', 'version_number', 'created_at', 'updated_at',
             'author', 'reviewer', 'approver', 'author_name', 'reviewer_name', 'approver_name',
-            'previous_versions', 'featured_image', 'documents', 'video_url', 'body'
+            'featured_image', 'documents', 'documents_url', 'video_url', 'body'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'version_number', 'previous_versions']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'version_number']
+
+    def get_documents_url(self, obj):
+        # Documents are served by the authorized download action, not /media/
+        if not obj.documents:
+            return None
+        url = reverse('contentpage-documents', kwargs={'pk': obj.pk})
+        request = self.context.get('request') if self.context else None
+        return request.build_absolute_uri(url) if request else url
 
     def to_representation(self, instance):
         """Custom representation to handle Wagtail Page specifics"""
@@ -80,4 +211,17 @@ class ContentPageSerializer(serializers.ModelSerializer):
         content_page = ContentPage(**validated_data)
         content_page.author = user  # Set the author to the current user
         content_page.save()
-        return content_page
\ No newline at end of file
+        return content_page
+
+
+class ContentPageVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ContentPageVersion
+        fields = ['version_number', 'status', 'updated_at']
+
+
+class ContentPageVersionDetailSerializer(ContentPageVersionSerializer):
+    body = serializers.CharField(source='get_body', read_only=True)
+
+    class Meta(ContentPageVersionSerializer.Meta):
+        fields = ContentPageVersionSerializer.Meta.fields + ['body']
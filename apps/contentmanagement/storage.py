@@ -0,0 +1,104 @@
+"""Content-addressed storage for uploaded content files.
+
+Each file is stored once, under ``cas/<ab>/<cd>/<sha256><ext>``, where the
+hash is computed while the upload streams to disk. The name depends only on
+the bytes, so an asset uploaded by several encoders is kept once. Its URL
+never changes meaning, so nginx serves ``/media/cas/`` as immutable.
+
+Every stored file has a ``StoredBlob`` row counting the items and pages that
+use it. ``manage.py gc_content_blobs`` deletes unreferenced blobs once they
+have been idle for a grace period; deletion is deferred so a save that reuses
+a blob cannot race with its removal. ``delete`` therefore leaves any blob that
+still has a row alone; the command drops the row before unlinking the file.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+
+PREFIX = 'cas'
+READ_SIZE = 64 * 1024
+
+_EXTENSION = re.compile(r'^\.[a-z0-9]{1,16}$')
+
+
+def content_storage():
+    """Storage for ContentItem and ContentPage files (``STORAGES['content']``)."""
+    return storages['content']
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_name(self, sha256, extension=''):
+        return f'{PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        extension = os.path.splitext(name)[1].lower()
+        if not _EXTENSION.match(extension):
+            extension = ''
+
+        spooled = not hasattr(content, 'temporary_file_path')
+        if not spooled:
+            # Already on disk (large uploads, resumable sessions): hash it in
+            # place and move it, rather than copying it first.
+            sha256, size = self._hash_file(content.temporary_file_path())
+            incoming = content.temporary_file_path()
+        else:
+            sha256, size, incoming = self._spool(content)
+
+        name = self.blob_name(sha256, extension)
+        full_path = self.path(name)
+        # Touch the blob row before checking the file so a concurrent
+        # gc_content_blobs run no longer sees it as idle.
+        from .models import StoredBlob
+        StoredBlob.register(name, sha256, size)
+        try:
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                file_move_safe(incoming, full_path, allow_overwrite=True)
+                os.chmod(full_path, self.file_permissions_mode or 0o644)
+        finally:
+            if spooled and os.path.exists(incoming):
+                os.remove(incoming)
+        return name
+
+    def delete(self, name):
+        # Other items and pages may share the blob (FieldFile.delete, admin
+        # clean-up); only gc_content_blobs, which removes the row first, unlinks it
+        from .models import StoredBlob
+        if StoredBlob.objects.filter(name=name).exists():
+            return
+        super().delete(name)
+
+    def _spool(self, content):
+        """Copy ``content`` to a temp file next to the blobs, hashing as it goes."""
+        directory = self.path(f'{PREFIX}/incoming')
+        os.makedirs(directory, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        fd, incoming = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as spool:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    spool.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(incoming)
+            raise
+        return digest.hexdigest(), size, incoming
+
+    def _hash_file(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for block in iter(lambda: source.read(READ_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest(), os.path.getsize(path)
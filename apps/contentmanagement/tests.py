@@ -1,3 +1,1112 @@
-from django.test import TestCase
+import io
+import json
+import re
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import post_migrate
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from wagtail.models import Page
+
+from middleware.performance import QueryBudgetExceeded
+
+from . import caching, downloads, packs, search, versioning
+from .importers import ContentImporter
+from .models import (
+    ContentItem, ContentItemTombstone, ContentPack, ContentPage, ContentPageVersion, StoredBlob, UploadError,
+    UploadSession,
+)
+from .views import GameContentSyncView
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ContentTestCase(TestCase):
+    """Media in a temp dir, a private cache, no background pack builds and
+    strict query budgets."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            CONTENT_UPLOAD_SESSION_DIR=f'{cls.media_root}/upload_sessions',
+            CACHES=LOCMEM_CACHE,
+            CONTENT_PACK_BUILD_ON_PUBLISH=False,
+            QUERY_BUDGET_STRICT=True,
+        )
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def make_user(username, *roles, **fields):
+        user = User.objects.create_user(username, **fields)
+        for role in roles:
+            user.groups.add(Group.objects.get_or_create(name=role)[0])
+        return user
+
+    @staticmethod
+    def client_for(user):
+        # A real token, so every request loads the user and its roles afresh
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+
+class QueryCountTests(ContentTestCase):
+    """Listing content runs the same number of queries for 2 items or 20.
+
+    Each item has its own author and publisher so that dropping
+    ``setup_eager_loading`` costs queries per row.
+    """
+    # Auth user, roles, validators (count + last change) and the page of
+    # compact rows, which only joins created_by and has no nested roles
+    LIST_QUERIES = 5
+    # The legacy bare list: rows with their users joined, and the groups of
+    # the two users set on every item
+    UNPAGINATED_LIST_QUERIES = 7
+    # Open to any authenticated user, so no role lookup
+    FEED_QUERIES = 6
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.make_user('viewer', 'Editor'))
+
+    def seed(self, count):
+        now = timezone.now()
+        for i in range(ContentItem.objects.count(), count):
+            ContentItem.objects.create(
+                title=f'Question {i}', status=ContentItem.STATUS_PUBLISHED, published_at=now,
+                created_by=self.make_user(f'author{i}', 'Encoder'),
+                published_by=self.make_user(f'publisher{i}', 'Approver'),
+            )
+        cache.clear()
+
+    def assert_flat(self, url, expected):
+        for count in (2, 20):
+            self.seed(count)
+            with self.subTest(items=count), self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_content_list(self):
+        self.assert_flat('/api/content/items/', self.LIST_QUERIES)
+
+    @override_settings(CONTENT_LIST_PAGINATED=False)
+    def test_unpaginated_content_list(self):
+        self.assert_flat('/api/content/items/', self.UNPAGINATED_LIST_QUERIES)
+
+    def test_game_feed(self):
+        self.assert_flat('/api/content/game/content/', self.FEED_QUERIES)
+
+
+class ContentListPaginationTests(ContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author', 'Encoder')
+        self.client = self.client_for(self.make_user('viewer', 'Editor'))
+        start = timezone.now() - timedelta(hours=1)
+        self.items = []
+        for n in range(7):
+            item = ContentItem.objects.create(title=f'Item {n}', body='Long body', created_by=self.author)
+            ContentItem.objects.filter(pk=item.pk).update(created_at=start + timedelta(minutes=n))
+            self.items.append(item)
+
+    def titles(self, response):
+        return [row['title'] for row in response.data['results']]
+
+    def test_list_is_paginated_by_default(self):
+        response = self.client.get('/api/content/items/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response), [f'Item {n}' for n in range(6, -1, -1)])
+        self.assertIsNone(response.data['next'])
+
+    def test_rows_are_compact(self):
+        row = self.client.get('/api/content/items/').data['results'][0]
+        self.assertEqual(set(row), {
+            'id', 'title', 'slug', 'file', 'status', 'created_by_name', 'created_at',
+            'edited_at', 'approved_at', 'published_at', 'is_deleted', 'updated_at', 'file_url',
+        })
+        self.assertEqual(row['created_by_name'], 'author')
+        detail = self.client.get(f"/api/content/items/{row['id']}/").data
+        self.assertEqual((detail['body'], detail['created_by']['username']), ('Long body', 'author'))
+
+    def test_cursor_pages_do_not_shift_when_items_change(self):
+        first = self.client.get('/api/content/items/', {'page_size': 3})
+        self.assertEqual(self.titles(first), ['Item 6', 'Item 5', 'Item 4'])
+        # A new item and a workflow change land between page requests
+        ContentItem.objects.create(title='Item 7', created_by=self.author)
+        self.items[6].send_for_approval()
+        seen = self.titles(first)
+        url = first.data['next']
+        while url:
+            page = self.client.get(url)
+            seen += self.titles(page)
+            url = page.data['next']
+        self.assertEqual(seen, [f'Item {n}' for n in range(6, -1, -1)])
+
+    def test_status_filter_applies_to_pages(self):
+        self.items[2].send_for_approval()
+        response = self.client.get('/api/content/items/', {'status': ContentItem.STATUS_FOR_APPROVAL})
+        self.assertEqual(self.titles(response), ['Item 2'])
+
+    @override_settings(CONTENT_LIST_PAGINATED=False)
+    def test_legacy_bare_list_when_switched_off(self):
+        response = self.client.get('/api/content/items/')
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(response.data[0]['body'], 'Long body')
+        self.assertEqual(len(self.client.get('/api/content/items/', {'page_size': 2}).data['results']), 2)
+
+
+class ConditionalGetTests(ContentTestCase):
+    """Unchanged content is answered with 304 from the validators alone."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.make_user('admin', is_superuser=True))
+        self.item = ContentItem.objects.create(title='Item', body='Body')
+        self.page = Page.get_first_root_node().add_child(instance=ContentPage(title='Page', slug='page', body='<p>Body</p>'))
+
+    def urls(self):
+        return {
+            'items': '/api/content/items/',
+            'item': f'/api/content/items/{self.item.pk}/',
+            'pages': '/api/content/pages/',
+            'page': f'/api/content/pages/{self.page.pk}/',
+        }
+
+    def change(self, name):
+        if name in ('items', 'item'):
+            self.item.title = 'Item edited'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.item.save()
+        else:
+            self.page.body = '<p>Edited</p>'
+            self.page.save()
+
+    def test_if_none_match(self):
+        for name, url in self.urls().items():
+            with self.subTest(name):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first['Cache-Control'], 'private, no-cache')
+                etag = first['ETag']
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified.content, b'')
+                self.assertEqual(not_modified['ETag'], etag)
+
+                self.change(name)
+                changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(changed.status_code, 200)
+                self.assertNotEqual(changed['ETag'], etag)
+
+    def test_if_modified_since(self):
+        for name, url in self.urls().items():
+            with self.subTest(name):
+                last_modified = self.client.get(url)['Last-Modified']
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+                earlier = http_date(parse_http_date(last_modified) - 60)
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+
+    def test_soft_delete_changes_the_collection_etag(self):
+        etag = self.client.get('/api/content/items/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/api/content/items/{self.item.pk}/').status_code, 204)
+        response = self.client.get('/api/content/items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get('/api/content/items/')['ETag']
+        other = self.client_for(self.make_user('other', is_superuser=True))
+        self.assertEqual(other.get('/api/content/items/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class BulkTransitionTests(ContentTestCase):
+    url = '/api/content/items/bulk_transition/'
+
+    def setUp(self):
+        super().setUp()
+        self.approver = self.client_for(self.make_user('approver', 'Approver'))
+        self.editor = self.client_for(self.make_user('editor', 'Editor'))
+
+    def make(self, status, **fields):
+        return ContentItem.objects.create(title=status, status=status, **fields)
+
+    def test_results_per_id(self):
+        ready = [self.make(ContentItem.STATUS_FOR_PUBLISHING) for _ in range(2)]
+        editing = self.make(ContentItem.STATUS_FOR_EDITING)
+        deleted = self.make(ContentItem.STATUS_FOR_PUBLISHING, is_deleted=True)
+        ids = [ready[0].pk, editing.pk, deleted.pk, 99999, ready[1].pk, ready[0].pk]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.approver.post(self.url, {'ids': ids, 'transition': 'publish'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'transition': 'publish',
+            'updated': 2,
+            'results': [
+                {'id': ready[0].pk, 'ok': True},
+                {'id': editing.pk, 'ok': False, 'error': 'cannot publish an item that is for editing'},
+                {'id': deleted.pk, 'ok': False, 'error': 'not found'},
+                {'id': 99999, 'ok': False, 'error': 'not found'},
+                {'id': ready[1].pk, 'ok': True},
+            ],
+        })
+        statuses = dict(ContentItem.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[item.pk] for item in (*ready, editing, deleted)],
+            [ContentItem.STATUS_PUBLISHED] * 2 + [ContentItem.STATUS_FOR_EDITING, ContentItem.STATUS_FOR_PUBLISHING],
+        )
+        self.assertEqual(ContentItem.objects.get(pk=ready[0].pk).published_by.username, 'approver')
+
+    def test_each_transition_needs_its_role(self):
+        item = self.make(ContentItem.STATUS_FOR_EDITING)
+        encoder = self.client_for(self.make_user('encoder', 'Encoder'))
+        cases = [
+            (self.editor, 'send_for_approval', 200),
+            (self.editor, 'approve', 403),
+            (self.editor, 'publish', 403),
+            (self.approver, 'send_for_approval', 403),
+            (self.approver, 'approve', 200),
+            (self.approver, 'deny', 200),
+            (encoder, 'send_for_approval', 403),
+        ]
+        for client, transition, expected in cases:
+            with self.subTest(transition=transition, status=expected):
+                response = client.post(self.url, {'ids': [item.pk], 'transition': transition}, format='json')
+                self.assertEqual(response.status_code, expected)
+
+    def test_request_is_validated(self):
+        for body in (
+            {'ids': list(range(1, 1002)), 'transition': 'publish'},
+            {'ids': [], 'transition': 'publish'},
+            {'ids': [1], 'transition': 'archive'},
+        ):
+            with self.subTest(body=str(body)[:40]):
+                self.assertEqual(self.approver.post(self.url, body, format='json').status_code, 400)
+        response = self.approver.post(self.url, {'ids': list(range(1, 1001)), 'transition': 'publish'}, format='json')
+        self.assertEqual((response.status_code, response.data['updated']), (200, 0))
+
+    def test_eligible_rows_move_in_one_update(self):
+        items = [self.make(ContentItem.STATUS_FOR_APPROVAL) for _ in range(20)]
+        with CaptureQueriesContext(connection) as context:
+            ContentItem.bulk_transition([item.pk for item in items], 'approve')
+        updates = [query['sql'] for query in context if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            ContentItem.objects.filter(status=ContentItem.STATUS_FOR_PUBLISHING, approved_at__isnull=False).count(), 20,
+        )
+
+
+class ContentPageVersionTests(ContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.make_user('viewer', 'Editor'))
+        self.page = Page.get_first_root_node().add_child(instance=ContentPage(title='Page', slug='page', body=self.body(1)))
+
+    @staticmethod
+    def body(n):
+        # One-line rich text, as the editor saves it, with a paragraph per edit
+        return ''.join(f'<p>Edit {i}</p>' for i in range(1, n + 1))
+
+    def edit(self, count):
+        for n in range(2, count + 2):
+            self.page.body = self.body(n)
+            self.page.save()
+
+    def test_every_version_rebuilds_across_snapshots(self):
+        self.edit(25)
+        versions = ContentPageVersion.objects.filter(page=self.page).order_by('version_number')
+        self.assertEqual([version.version_number for version in versions], list(range(1, 26)))
+        self.assertEqual(
+            [version.version_number for version in versions if version.is_snapshot],
+            [1, 1 + versioning.SNAPSHOT_INTERVAL, 1 + 2 * versioning.SNAPSHOT_INTERVAL],
+        )
+        for version in versions:
+            with self.subTest(version=version.version_number):
+                self.assertEqual(version.get_body(), self.body(version.version_number))
+        self.assertEqual(self.page.version_number, 26)
+
+    def test_status_change_alone_is_a_version(self):
+        self.page.status = 'review'
+        self.page.save()
+        version = ContentPageVersion.objects.get(page=self.page)
+        self.assertEqual((version.version_number, version.status, version.get_body()), (1, 'draft', self.body(1)))
+
+    def test_version_history_endpoint(self):
+        self.edit(25)
+        url = f'/api/content/pages/{self.page.pk}/version_history/'
+        response = self.client.get(url, {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual([row['version_number'] for row in response.data['results']], list(range(25, 15, -1)))
+        self.assertNotIn('body', response.data['results'][0])
+        self.assertEqual(
+            [row['version_number'] for row in self.client.get(url, {'page_size': 10, 'page': 3}).data['results']],
+            [5, 4, 3, 2, 1],
+        )
+
+        detail = self.client.get(url, {'version': 12})
+        self.assertEqual((detail.status_code, detail.data['body']), (200, self.body(12)))
+        self.assertEqual(self.client.get(url, {'version': 'latest'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'version': 99}).status_code, 404)
+        self.assertEqual(self.client.get('/api/content/pages/99999/version_history/').status_code, 404)
+
+
+class ContentPageVersionMigrationTests(TransactionTestCase):
+    """0009 moves previous_versions into ContentPageVersion rows, and back."""
+    before = [('contentmanagement', '0008_contentitem_updated_at')]
+    after = [('contentmanagement', '0009_contentpageversion')]
+    # Bring back the rows migrations created (root page, locale) for later tests
+    serialized_rollback = True
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def make_page(self, apps, previous_versions):
+        ContentType = apps.get_model('contenttypes', 'ContentType')
+        Locale = apps.get_model('wagtailcore', 'Locale')
+        ContentPage = apps.get_model('contentmanagement', 'ContentPage')
+        return ContentPage.objects.create(
+            title='Page', slug='migrated-page', path='00019999', depth=2, body='<p>now</p>',
+            content_type=ContentType.objects.get_or_create(app_label='contentmanagement', model='contentpage')[0],
+            locale=Locale.objects.get_or_create(language_code='en')[0],
+            version_number=len(previous_versions) + 1, previous_versions=previous_versions,
+        )
+
+    def test_forwards_and_backwards(self):
+        history = {
+            str(n): {'status': 'draft', 'body': f'<p>v{n}</p>\n' * n, 'updated_at': f'2026-01-{n:02d} 10:00:00+00:00'}
+            for n in range(1, 13)
+        }
+        page = self.make_page(self.migrate(self.before), history)
+
+        apps = self.migrate(self.after)
+        ContentPageVersion = apps.get_model('contentmanagement', 'ContentPageVersion')
+        rows = ContentPageVersion.objects.filter(page_id=page.pk).order_by('version_number')
+        self.assertEqual([row.version_number for row in rows], list(range(1, 13)))
+        self.assertEqual([row.version_number for row in rows if row.is_snapshot], [1, 11])
+        chain = [(row.is_snapshot, row.data) for row in rows]
+        for n in (1, 7, 11, 12):
+            with self.subTest(version=n):
+                start = max(i for i in range(n) if chain[i][0])
+                self.assertEqual(versioning.rebuild(chain[start:n]), history[str(n)]['body'])
+
+        apps = self.migrate(self.before)
+        restored = apps.get_model('contentmanagement', 'ContentPage').objects.get(pk=page.pk).previous_versions
+        self.assertEqual({key: value['body'] for key, value in restored.items()},
+                         {key: value['body'] for key, value in history.items()})
+        self.assertEqual(restored['3']['status'], 'draft')
+
+
+class GameContentSyncTests(ContentTestCase):
+    url = '/api/content/game/content/sync/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.make_user('player'))
+        self.kept, self.soft, self.hard = (self.make(title) for title in ('Kept', 'Soft', 'Hard'))
+        self.draft = ContentItem.objects.create(title='Draft')
+        # Old enough to fall outside the overlap window of a fresh token
+        ContentItem.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+
+    def make(self, title):
+        return ContentItem.objects.create(title=title, status=ContentItem.STATUS_PUBLISHED, published_at=timezone.now())
+
+    def sync(self, since=None):
+        response = self.client.get(self.url, {'since': since} if since is not None else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def titles(self, data):
+        return sorted(row['title'] for row in data['items'])
+
+    def test_full_snapshot_then_only_changes(self):
+        first = self.sync()
+        self.assertTrue(first['full_sync'])
+        self.assertEqual(self.titles(first), ['Hard', 'Kept', 'Soft'])
+        self.assertEqual(first['deleted'], [])
+
+        unchanged = self.sync(first['sync_token'])
+        self.assertFalse(unchanged['full_sync'])
+        self.assertEqual((unchanged['items'], unchanged['deleted']), ([], []))
+
+        self.make('New')
+        self.soft.soft_delete()
+        hard_pk = self.hard.pk
+        self.hard.delete()
+        self.draft.delete()
+        changes = self.sync(unchanged['sync_token'])
+        self.assertFalse(changes['full_sync'])
+        self.assertEqual(self.titles(changes), ['New'])
+        self.assertEqual(sorted(row['id'] for row in changes['deleted']), sorted([self.soft.pk, hard_pk]))
+        self.assertTrue(all(row['deleted'] for row in changes['deleted']))
+
+    def test_bad_or_expired_token_falls_back_to_a_full_snapshot(self):
+        token = self.sync()['sync_token']
+        for since in ('', 'garbage', token[:-2] + 'xx', signing.dumps('not a date', salt=GameContentSyncView.TOKEN_SALT)):
+            with self.subTest(since=since):
+                data = self.sync(since)
+                self.assertTrue(data['full_sync'])
+                self.assertEqual(self.titles(data), ['Hard', 'Kept', 'Soft'])
+        with mock.patch.object(GameContentSyncView, 'TOKEN_MAX_AGE', -1):
+            self.assertTrue(self.sync(token)['full_sync'])
+
+    def test_old_tombstones_are_pruned(self):
+        self.hard.delete()
+        ContentItemTombstone.objects.update(deleted_at=timezone.now() - ContentItemTombstone.KEEP - timedelta(days=1))
+        kept_pk = self.kept.pk
+        self.kept.delete()
+        self.assertEqual(list(ContentItemTombstone.objects.values_list('item_id', flat=True)), [kept_pk])
+
+
+class SlugTests(ContentTestCase):
+
+    def slugs(self, *titles):
+        items = ContentItem.bulk_create_with_slugs([ContentItem(title=title) for title in titles])
+        return [item.slug for item in items]
+
+    def test_save_takes_the_next_free_suffix(self):
+        ContentItem.objects.create(title='Quiz', slug='quiz-3')
+        slugs = [ContentItem.objects.create(title='Quiz').slug for _ in range(3)]
+        self.assertEqual(slugs, ['quiz', 'quiz-4', 'quiz-5'])
+
+    def test_save_retries_when_the_slug_is_taken_meanwhile(self):
+        ContentItem.objects.create(title='Quiz')
+        real_usage = ContentItem.slug_usage
+        calls = []
+
+        def usage(bases, exclude_pk=None):
+            # The first lookup misses the row another upload just committed
+            calls.append(bases)
+            return dict.fromkeys(bases, (False, 0)) if len(calls) == 1 else real_usage(bases, exclude_pk)
+
+        with mock.patch.object(ContentItem, 'slug_usage', side_effect=usage):
+            item = ContentItem.objects.create(title='Quiz')
+        self.assertEqual((item.slug, len(calls)), ('quiz-1', 2))
+
+    def test_batch_does_not_repeat_its_own_slugs(self):
+        self.assertEqual(self.slugs('Quiz', 'Quiz', 'Quiz 1'), ['quiz', 'quiz-1', 'quiz-1-1'])
+        self.assertEqual(self.slugs('Quiz 2', 'Quiz', 'Quiz'), ['quiz-2', 'quiz-3', 'quiz-4'])
+
+    def test_batch_skips_slugs_set_explicitly_in_the_batch(self):
+        items = [ContentItem(title='Quiz', slug='quiz'), ContentItem(title='Quiz')]
+        ContentItem.bulk_create_with_slugs(items)
+        self.assertEqual([item.slug for item in items], ['quiz', 'quiz-1'])
+
+    def test_batch_does_not_fall_back_to_row_inserts(self):
+        with mock.patch.object(ContentItem, 'save', side_effect=AssertionError('row insert')):
+            report = ContentImporter().import_records([{'title': 'Quiz'}, {'title': 'Quiz'}, {'title': 'Quiz 1'}])
+        self.assertEqual(report.summary['created'], 3)
+
+    def test_bulk_queries_do_not_grow_with_the_batch(self):
+        def queries(count):
+            titles = [f'Batch {count} item {n % 7}' for n in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                self.slugs(*titles)
+            return len(context)
+
+        # 30 rows still fit in one INSERT on SQLite
+        self.assertEqual(queries(5), queries(30))
+
+
+class ImporterTests(ContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.encoder = self.make_user('encoder', 'Encoder')
+
+    def upload(self, name, content):
+        return self.client_for(self.encoder).post(
+            '/api/content/items/batch/', {'file': SimpleUploadedFile(name, content)}, format='multipart',
+        )
+
+    def test_rows_fail_one_by_one_when_a_chunk_is_rejected(self):
+        original_save = ContentItem.save
+
+        def save(item, *args, **kwargs):
+            if item.title == 'Rejected':
+                raise DatabaseError('rejected by the database')
+            return original_save(item, *args, **kwargs)
+
+        rows = [{'title': 'First'}, {'title': 'Rejected'}, {'title': 'Third'}]
+        with mock.patch.object(ContentItem, 'bulk_create_with_slugs', side_effect=DatabaseError('chunk')), \
+                mock.patch.object(ContentItem, 'save', save):
+            summary = ContentImporter(user=self.encoder).import_records(rows).summary
+
+        self.assertEqual(summary['created'], 2)
+        self.assertEqual([error['row'] for error in summary['errors']], [2])
+        self.assertEqual(
+            sorted(ContentItem.objects.values_list('title', flat=True)), ['First', 'Third'],
+        )
+
+    def test_file_that_breaks_mid_stream_keeps_the_rows_before(self):
+        # Well past the text decoder's 8 KB read, so the bad bytes come after some rows
+        rows = ''.join(f'Question {i},{"x" * 40}\n' for i in range(300))
+        response = self.upload('items.csv', ('title,body\n' + rows).encode() + b'\xff\xfe broken\n')
+
+        self.assertEqual(response.status_code, 201)
+        # Rows decoded before the bad block are created; the failure sits on
+        # the line after the last one read (line 1 is the header)
+        created = response.data['created']
+        self.assertGreater(created, 0)
+        self.assertEqual(ContentItem.objects.count(), created)
+        [error] = response.data['errors']
+        self.assertEqual(error['row'], created + 2)
+        self.assertIn('Could not read the file', error['errors'][0])
+
+    def test_unreadable_archive_is_rejected(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('notes.txt', 'no manifest here')
+        for name, content in (('items.zip', b'not a zip'), ('items.zip', archive.getvalue())):
+            with self.subTest(content=content[:10]):
+                response = self.upload(name, content)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+
+class UploadSessionTests(ContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.session = UploadSession.objects.create(
+            created_by=self.make_user('encoder', 'Encoder'), filename='clip.mp4', size=20,
+        )
+
+    def read_part(self):
+        with open(self.session.path, 'rb') as part:
+            return part.read()
+
+    def test_chunks_append_in_order(self):
+        self.assertEqual(self.session.write_chunk(0, io.BytesIO(b'a' * 10), 10), 10)
+        self.assertEqual(self.session.write_chunk(10, io.BytesIO(b'b' * 10), 10), 10)
+        self.assertEqual(self.read_part(), b'a' * 10 + b'b' * 10)
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).received, 20)
+
+    def test_losing_request_leaves_the_part_file_alone(self):
+        # Both requests saw received=0; the first one wins the offset
+        stale = UploadSession.objects.get(pk=self.session.pk)
+        self.session.write_chunk(0, io.BytesIO(b'a' * 10), 10)
+
+        with self.assertRaisesMessage(UploadError, 'Another request moved this upload to byte 10'):
+            stale.write_chunk(0, io.BytesIO(b'b' * 10), 10)
+        self.assertEqual(self.read_part(), b'a' * 10)
+        self.assertEqual(stale.received, 10)
+
+    def test_short_chunk_moves_the_offset_by_what_arrived(self):
+        self.assertEqual(self.session.write_chunk(0, io.BytesIO(b'a' * 4), 10), 4)
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).received, 4)
+
+
+class ContentAddressedStorageTests(ContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.items = [
+            ContentItem.objects.create(title=f'Copy {i}', file=SimpleUploadedFile('clip.txt', b'same bytes'))
+            for i in range(2)
+        ]
+        self.name = self.items[0].file.name
+        self.storage = self.items[0].file.storage
+
+    def test_items_with_the_same_bytes_share_one_blob(self):
+        self.assertEqual(self.items[1].file.name, self.name)
+        self.assertEqual(StoredBlob.objects.get(name=self.name).refcount, 2)
+
+    def test_deleting_through_one_item_keeps_the_shared_blob(self):
+        self.items[0].file.delete(save=False)
+        self.assertTrue(self.storage.exists(self.name))
+        with self.items[1].file.open('rb') as shared:
+            self.assertEqual(shared.read(), b'same bytes')
+
+    def test_gc_removes_the_blob_once_unreferenced_and_idle(self):
+        for item in self.items:
+            item.delete()
+        self.assertEqual(StoredBlob.objects.get(name=self.name).refcount, 0)
+        call_command('gc_content_blobs', stdout=io.StringIO())
+        self.assertTrue(self.storage.exists(self.name), 'still inside the grace period')
+
+        StoredBlob.objects.filter(name=self.name).update(updated_at=timezone.now() - timedelta(days=2))
+        call_command('gc_content_blobs', stdout=io.StringIO())
+        self.assertFalse(self.storage.exists(self.name))
+        self.assertFalse(StoredBlob.objects.filter(name=self.name).exists())
+
+
+class ContentItemFileFieldTests(ContentTestCase):
+
+    def test_file_is_named_but_never_linked_under_media(self):
+        item = ContentItem.objects.create(
+            title='Clip', status=ContentItem.STATUS_PUBLISHED, published_at=timezone.now(),
+            file=SimpleUploadedFile('clip.mp4', b'frames'),
+        )
+        client = self.client_for(self.make_user('viewer', 'Editor'))
+        for url in (f'/api/content/items/{item.pk}/', '/api/content/items/?page_size=10', '/api/content/game/content/'):
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                row = data['results'][0] if 'results' in data else data[0] if isinstance(data, list) else data
+                self.assertEqual(row['file'], item.file.name.rsplit('/', 1)[-1])
+                self.assertTrue(row['file'].endswith('.mp4'))
+                self.assertNotIn('/media/', str(data))
+                self.assertIn(f'/api/content/items/{item.pk}/download/', row['file_url'])
+
+
+class ContentItemDownloadTests(ContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.item = ContentItem.objects.create(
+            title='Clip', status=ContentItem.STATUS_PUBLISHED, published_at=timezone.now(),
+            file=SimpleUploadedFile('clip.mp4', b'0123456789' * 10000),
+        )
+        self.url = f'/api/content/items/{self.item.pk}/download/'
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.make_user("viewer"))}'}
+
+    def test_whole_file_and_a_range(self):
+        response = self.client.get(self.url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789' * 10000)
+        response = self.client.get(self.url, headers={**self.headers, 'Range': 'bytes=5-14'})
+        self.assertEqual((response.status_code, response['Content-Range']), (206, 'bytes 5-14/100000'))
+        self.assertEqual(b''.join(response.streaming_content), b'5678901234')
+
+    async def test_streams_chunk_by_chunk_under_asgi(self):
+        for headers, status, body in (
+            (self.headers, 200, b'0123456789' * 10000),
+            ({**self.headers, 'Range': 'bytes=99990-'}, 206, b'0123456789'),
+        ):
+            with self.subTest(range=headers.get('Range')):
+                response = await self.async_client.get(self.url, headers=headers)
+                self.assertEqual(response.status_code, status)
+                self.assertTrue(response.is_async)
+                self.assertEqual(response['Content-Length'], str(len(body)))
+                chunks = [chunk async for chunk in response.streaming_content]
+                self.assertEqual(b''.join(chunks), body)
+                self.assertEqual(len(chunks), -(-len(body) // downloads.READ_SIZE))
+
+
+class ContentPackTests(ContentTestCase):
+
+    def publish(self, title, content):
+        item = ContentItem.objects.create(title=title, file=SimpleUploadedFile(f'{title}.txt', content))
+        with self.captureOnCommitCallbacks(execute=True):
+            item.publish()
+        return item
+
+    def test_publish_requests_a_build(self):
+        self.publish('one', b'first asset')
+        self.assertEqual(packs._pending(), 1)
+        self.assertEqual(packs.build_pending(), 1)
+        self.assertIsNone(packs._pending())
+        self.assertEqual(packs.build_pending(), 0)
+        self.assertEqual(ContentPack.objects.get().item_count, 1)
+
+    def test_editing_published_content_requests_a_build(self):
+        item = self.publish('one', b'first asset')
+        packs.build_pending()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.title = 'one, revised'
+            item.save()
+        self.assertEqual(packs._pending(), 2)
+        packs.build_pending()
+        self.assertEqual(ContentPack.objects.latest('version').version, 2)
+
+        # Items that are not published yet leave the pack alone
+        draft = ContentItem.objects.create(title='draft')
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.body = 'still a draft'
+            draft.save()
+        self.assertIsNone(packs._pending())
+
+    def test_no_build_while_another_process_holds_the_lock(self):
+        self.publish('one', b'first asset')
+
+        @contextmanager
+        def held_elsewhere():
+            yield False
+
+        with mock.patch.object(packs, 'build_lock', held_elsewhere):
+            self.assertIsNone(packs.build_pending())
+        self.assertFalse(ContentPack.objects.exists())
+        self.assertEqual(packs._pending(), 1)
+
+    def test_patch_adds_new_assets_and_drops_removed_ones(self):
+        first = self.publish('one', b'first asset')
+        self.publish('two', b'second asset')
+        packs.build_pending()
+        first.soft_delete()
+        self.publish('three', b'third asset')
+        packs.build_pending()
+
+        old, new = ContentPack.objects.order_by('version')
+        with new.patch.open('rb') as handle, zipfile.ZipFile(handle) as patch:
+            info = json.loads(patch.read('patch.json'))
+            added = sorted(name for name in patch.namelist() if name.startswith('assets/'))
+        with old.archive.open('rb') as handle, zipfile.ZipFile(handle) as archive:
+            old_assets = {name for name in archive.namelist() if name.startswith('assets/')}
+        with new.archive.open('rb') as handle, zipfile.ZipFile(handle) as archive:
+            new_assets = {name for name in archive.namelist() if name.startswith('assets/')}
+
+        self.assertEqual((info['from_version'], info['to_version']), (old.version, new.version))
+        self.assertEqual(info['to_archive_sha256'], new.archive_sha256)
+        self.assertEqual(added, sorted(new_assets - old_assets))
+        self.assertEqual(info['removed_assets'], sorted(old_assets - new_assets))
+        self.assertEqual((len(added), len(info['removed_assets'])), (1, 1))
+
+    def test_unchanged_content_is_not_packed_again(self):
+        self.publish('one', b'first asset')
+        pack, created = packs.build_pack()
+        self.assertTrue(created)
+        self.assertEqual(packs.build_pack(), (pack, False))
+
+
+class ContentCacheTests(ContentTestCase):
+
+    def build(self, value):
+        self.builds += 1
+        return value
+
+    def setUp(self):
+        super().setUp()
+        self.builds = 0
+
+    def hold_rebuild_lock(self, name, *parts):
+        cache.add(f'{caching._key(name, caching.generation(), parts)}:lock', 1)
+
+    def test_content_write_invalidates_cached_entries(self):
+        self.assertEqual(caching.cached('feed', lambda: self.build('v1'), 'x'), ('v1', False))
+        self.assertEqual(caching.cached('feed', lambda: self.build('v2'), 'x'), ('v1', False))
+        with self.captureOnCommitCallbacks(execute=True):
+            ContentItem.objects.create(title='New')
+        self.assertEqual(caching.cached('feed', lambda: self.build('v2'), 'x'), ('v2', False))
+        self.assertEqual(self.builds, 2)
+
+    def test_serves_the_previous_copy_while_another_worker_rebuilds(self):
+        caching.cached('feed', lambda: 'v1', 'x')
+        caching._bump()
+        self.hold_rebuild_lock('feed', 'x')
+        with mock.patch.object(caching.time, 'sleep', side_effect=AssertionError('waited')):
+            self.assertEqual(caching.cached('feed', lambda: self.build('v2'), 'x'), ('v1', True))
+        self.assertEqual(self.builds, 0)
+
+    def test_waits_about_a_second_then_builds_without_a_previous_copy(self):
+        clock = [0.0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        self.hold_rebuild_lock('feed', 'x')
+        with mock.patch.object(caching.time, 'monotonic', lambda: clock[0]), \
+                mock.patch.object(caching.time, 'sleep', sleep):
+            self.assertEqual(caching.cached('feed', lambda: self.build('v1'), 'x'), ('v1', False))
+        self.assertEqual(self.builds, 1)
+        self.assertAlmostEqual(clock[0], caching.WAIT_SECONDS, delta=2 * caching.WAIT_INTERVAL)
+
+    async def test_async_readers_serve_the_previous_copy(self):
+        async def build():
+            self.builds += 1
+            return 'v2'
+
+        async def first():
+            return 'v1'
+
+        await caching.acached('feed', first, 'x')
+        caching._bump()
+        await cache.aadd(f'{caching._key("feed", await caching.ageneration(), ("x",))}:lock', 1)
+        self.assertEqual(await caching.acached('feed', build, 'x'), ('v1', True))
+        self.assertEqual(self.builds, 0)
+
+
+class StaleResponseTests(ContentTestCase):
+    """A response served from the previous cached copy carries no validators.
+
+    Otherwise the client would store the old body under the ETag of the new
+    rows, and revalidating would keep answering 304 until the next change.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('viewer', 'Editor')
+        self.client = self.client_for(self.user)
+        self.first = self.publish('A')
+
+    def publish(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ContentItem.objects.create(
+                title=title, status=ContentItem.STATUS_PUBLISHED, published_at=timezone.now(), created_by=self.user,
+            )
+
+    def lock_key(self, name, *parts):
+        return f'{caching._key(name, caching.generation(), parts + ("http://testserver/",))}:lock'
+
+    def hold_rebuild_lock(self, name, *parts):
+        cache.add(self.lock_key(name, *parts), 1)
+
+    def release_rebuild_lock(self, name, *parts):
+        cache.delete(self.lock_key(name, *parts))
+
+    def test_feed(self):
+        url = '/api/content/game/content/'
+        self.client.get(url)
+        self.publish('B')
+        self.hold_rebuild_lock('feed')
+        stale = self.client.get(url)
+        self.assertEqual([row['title'] for row in stale.data], ['A'])
+        self.assert_no_validators(stale)
+
+        # The other worker's rebuild finishes
+        self.release_rebuild_lock('feed')
+        fresh = self.client.get(url)
+        self.assertEqual([row['title'] for row in fresh.data], ['B', 'A'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=fresh['ETag']).status_code, 304)
+
+    def test_item(self):
+        url = f'/api/content/items/{self.first.pk}/'
+        self.client.get(url)
+        self.first.title = 'A2'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        self.hold_rebuild_lock('item', self.first.pk)
+        stale = self.client.get(url)
+        self.assertEqual(stale.data['title'], 'A')
+        self.assert_no_validators(stale)
+
+        self.release_rebuild_lock('item', self.first.pk)
+        fresh = self.client.get(url)
+        self.assertEqual(fresh.data['title'], 'A2')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=fresh['ETag']).status_code, 304)
+
+    def assert_no_validators(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+
+class SearchTests(ContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.volcano = ContentItem.objects.create(title='Volcanoes of the Philippines', body='Mayon and Taal')
+        self.river = ContentItem.objects.create(title='Rivers', body='The Pasig river flows past a volcano')
+
+    def titles(self, query):
+        return [item.title for item in search.search_items(ContentItem.objects.all(), query)]
+
+    def test_title_matches_rank_above_body_matches(self):
+        self.assertEqual(self.titles('volcano'), ['Volcanoes of the Philippines', 'Rivers'])
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        self.assertEqual(self.titles('Mayon'), ['Volcanoes of the Philippines'])
+        ContentItem.objects.filter(pk=self.volcano.pk).update(body='Taal only')
+        self.assertEqual(self.titles('Mayon'), [])
+        self.river.delete()
+        self.assertEqual(self.titles('Pasig'), [])
+        ContentItem.objects.bulk_create([ContentItem(title='Mountains', slug='mayon-peak')])
+        self.assertEqual(self.titles('Mayon'), ['Mountains'])
+
+    def test_queryset_writes_reindex_every_column(self):
+        ContentItem.objects.filter(pk=self.volcano.pk).update(title='Lava fields', slug='lava-fields')
+        self.assertEqual(self.titles('lava'), ['Lava fields'])
+        self.assertEqual(self.titles('Philippines'), [])
+        self.river.slug = 'pasig-delta'
+        ContentItem.objects.bulk_update([self.river], ['slug'])
+        self.assertEqual(self.titles('delta'), ['Rivers'])
+        ContentItem.bulk_create_with_slugs([ContentItem(title=f'Delta {n}') for n in range(3)])
+        self.assertEqual(len(self.titles('delta')), 4)
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 triggers are SQLite only')
+    def test_post_migrate_restores_triggers_dropped_by_a_table_rebuild(self):
+        # SQLite rebuilds the table for most ALTERs, which drops its triggers
+        with connection.cursor() as cursor:
+            for statement in search.SQLITE_DROP[:3]:
+                cursor.execute(statement)
+        ContentItem.objects.create(title='Geysers')
+        self.assertEqual(self.titles('Geysers'), [])
+
+        config = django_apps.get_app_config('contentmanagement')
+        post_migrate.send(
+            sender=config, app_config=config, verbosity=0, interactive=False, using='default',
+            apps=django_apps, plan=[],
+        )
+        self.assertEqual(self.titles('Geysers'), ['Geysers'])
+        ContentItem.objects.create(title='Hot springs')
+        self.assertEqual(self.titles('springs'), ['Hot springs'])
+
+    def test_user_input_is_not_fts_syntax(self):
+        self.assertEqual(self.titles('volcano"s OR NOT'), [])
+        self.assertEqual(self.titles('"'), [])
+
+    def test_other_databases_match_substrings(self):
+        with mock.patch.object(search, 'connection', mock.Mock(vendor='mysql')):
+            self.assertEqual(sorted(self.titles('volcano')), ['Rivers', 'Volcanoes of the Philippines'])
+            self.assertEqual(self.titles('volcano mayon'), ['Volcanoes of the Philippines'])
+
+    def test_rows_do_not_carry_the_search_vector(self):
+        self.assertIn('search_vector', ContentItem.objects.get(pk=self.volcano.pk).get_deferred_fields())
+
+    def test_search_endpoint(self):
+        client = self.client_for(self.make_user('viewer', 'Editor'))
+        response = client.get('/api/content/items/', {'q': 'Taal'})
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['id'] for row in rows], [self.volcano.pk])
+
+
+class QueryBudgetTests(ContentTestCase):
+    """Every endpoint in QUERY_BUDGETS, through PerformanceMiddleware."""
+
+    def setUp(self):
+        super().setUp()
+        user = self.make_user('viewer', 'Editor')
+        self.client = self.client_for(user)
+        self.item = ContentItem.objects.create(
+            title='Published', status=ContentItem.STATUS_PUBLISHED, published_at=timezone.now(), created_by=user,
+        )
+        self.urls = {
+            'ContentItemViewSet.list': '/api/content/items/',
+            'ContentItemViewSet.retrieve': f'/api/content/items/{self.item.pk}/',
+            'GamePublishedContentList.get': '/api/content/game/content/',
+            'GameContentSyncView.get': '/api/content/game/content/sync/',
+            'MeView.get': '/api/auth/me/',
+        }
+
+    def test_every_budget_is_covered(self):
+        self.assertEqual(set(self.urls), set(settings.QUERY_BUDGETS))
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=True)
+    def test_server_timing_reports_queries_within_budget(self):
+        for endpoint, url in self.urls.items():
+            with self.subTest(endpoint=endpoint):
+                cache.clear()
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                timing = response['Server-Timing']
+                self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries"')
+                self.assertRegex(timing, r'total;dur=[\d.]+$')
+                queries = int(re.search(r'"(\d+) queries"', timing)[1])
+                self.assertLessEqual(queries, settings.QUERY_BUDGETS[endpoint])
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_can_be_switched_off(self):
+        self.assertFalse(self.client.get(self.urls['MeView.get']).has_header('Server-Timing'))
+
+    def test_going_over_budget_fails(self):
+        with override_settings(QUERY_BUDGETS=dict.fromkeys(self.urls, 1)):
+            for endpoint, url in self.urls.items():
+                with self.subTest(endpoint=endpoint):
+                    cache.clear()
+                    with self.assertRaisesMessage(QueryBudgetExceeded, f'{endpoint} ran'):
+                        self.client.get(url)
+
+    @override_settings(QUERY_BUDGET_STRICT=False, QUERY_BUDGETS={'MeView.get': 1})
+    def test_going_over_budget_only_logs_when_not_strict(self):
+        with self.assertLogs('middleware.performance', 'WARNING') as logs:
+            response = self.client.get(self.urls['MeView.get'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('MeView.get ran', logs.output[0])
+
+
+class MetricsTests(ContentTestCase):
+    """Workflow transitions and request latency as scraped from ``/metrics``."""
+
+    def setUp(self):
+        super().setUp()
+        self.approver = self.make_user('approver', 'Approver')
+        self.client = self.client_for(self.approver)
+        # Prometheus scrapes without a user's JWT
+        self.scraper = Client()
+
+    def scrape(self):
+        response = self.scraper.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+
+    def sample(self, scraped, name, **labels):
+        return scraped.get((name, tuple(sorted(labels.items()))), 0)
+
+    def test_transitions_and_request_latency(self):
+        to_publish = ContentItem.objects.create(title='Ready', status=ContentItem.STATUS_FOR_PUBLISHING)
+        to_deny = ContentItem.objects.create(title='Not yet', status=ContentItem.STATUS_FOR_APPROVAL)
+        before = self.scrape()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            published = self.client.post(f'/api/content/items/{to_publish.pk}/publish/')
+        with self.captureOnCommitCallbacks(execute=True):
+            denied = self.client.post(f'/api/content/items/{to_deny.pk}/deny/')
+        self.assertEqual((published.status_code, denied.status_code), (200, 200))
+        after = self.scrape()
+
+        for transition in ('publish', 'deny'):
+            with self.subTest(transition=transition):
+                name = 'content_workflow_transitions_total'
+                self.assertEqual(
+                    self.sample(after, name, transition=transition) - self.sample(before, name, transition=transition), 1,
+                )
+        for response in (published, denied):
+            labels = {'url_name': response.resolver_match.view_name, 'method': 'POST'}
+            with self.subTest(**labels):
+                name = 'http_request_duration_seconds_count'
+                self.assertEqual(self.sample(after, name, **labels) - self.sample(before, name, **labels), 1)
+
+    def test_transition_is_counted_on_commit(self):
+        item = ContentItem.objects.create(title='Ready', status=ContentItem.STATUS_FOR_PUBLISHING)
+        before = self.sample(self.scrape(), 'content_workflow_transitions_total', transition='publish')
+        with self.captureOnCommitCallbacks(execute=False):
+            item.publish(user=self.approver)
+        after = self.sample(self.scrape(), 'content_workflow_transitions_total', transition='publish')
+        self.assertEqual(after, before)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_is_required_when_set(self):
+        for headers in ({}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'scrape-secret'}):
+            with self.subTest(headers=headers):
+                response = self.scraper.get('/metrics', headers=headers)
+                self.assertEqual(response.status_code, 403)
+                self.assertEqual(response.json(), {'detail': 'Invalid or missing metrics token'})
+        response = self.scraper.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertEqual(response.status_code, 200)
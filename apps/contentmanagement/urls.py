@@ -1,13 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ContentItemViewSet, ContentPageViewSet
-from .views import GamePublishedContentList
+from .views import ContentItemViewSet, ContentPageViewSet, ContentUploadViewSet
+from .views import GamePublishedContentList, GameContentSyncView, ContentItemDownloadView
+from .views import GameContentPackView, GameContentPackFileView
 
 router = DefaultRouter()
 router.register(r'items', ContentItemViewSet, basename='contentitem')
 router.register(r'pages', ContentPageViewSet, basename='contentpage')
+router.register(r'uploads', ContentUploadViewSet, basename='contentupload')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('items/<int:pk>/download/', ContentItemDownloadView.as_view(), name='contentitem-download'),
     path('game/content/', GamePublishedContentList.as_view(), name='game-published-content'),
+    path('game/content/sync/', GameContentSyncView.as_view(), name='game-content-sync'),
+    path('game/packs/latest/', GameContentPackView.as_view(), name='game-content-pack'),
+    path('game/packs/<int:version>/<str:kind>/', GameContentPackFileView.as_view(), name='game-content-pack-file'),
 ]
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Delta-compressed body history for ContentPage.
+
+Each stored version is either a snapshot (the full body) or a delta against
+the version before it. A snapshot is written every ``SNAPSHOT_INTERVAL``
+versions, so rebuilding any version replays at most that many deltas.
+
+Bodies are rich-text HTML that often sits on one line, so they are tokenised
+after every ``>`` and newline before diffing. A delta is a list of ops:
+``[start, end]`` copies that token range from the previous version, and a
+string inserts literal text. Payloads are JSON, zlib-compressed.
+"""
+
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+
+SNAPSHOT_INTERVAL = 10
+
+_TOKEN_BOUNDARY = re.compile(r'(?<=[>\n])')
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_BOUNDARY.split(text or '') if token]
+
+
+def make_delta(old, new):
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    ops = []
+    matcher = SequenceMatcher(None, old_tokens, new_tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(new_tokens[j1:j2]))
+    return ops
+
+
+def apply_delta(old, ops):
+    old_tokens = tokenize(old)
+    return ''.join(
+        ''.join(old_tokens[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in ops
+    )
+
+
+def pack(payload):
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def encode_version(body, previous_body, chain_length):
+    """Return ``(is_snapshot, data)`` for a new version.
+
+    ``chain_length`` is how many versions have been stored since (and
+    including) the most recent snapshot; ``previous_body`` is the body of the
+    newest of those, or None when the page has no history yet.
+    """
+    if previous_body is None or chain_length >= SNAPSHOT_INTERVAL:
+        return True, pack(body or '')
+    return False, pack(make_delta(previous_body, body))
+
+
+def rebuild(chain):
+    """Rebuild a body from ``(is_snapshot, data)`` pairs, oldest first.
+
+    The first pair must be a snapshot.
+    """
+    body = None
+    for is_snapshot, data in chain:
+        payload = unpack(data)
+        body = payload if is_snapshot else apply_delta(body, payload)
+    return body
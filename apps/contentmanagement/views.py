@@ -1,29 +1,205 @@
+import re
+import time
+from functools import partial
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
-from .permissions import IsContentWorkflowAllowed
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import NotAuthenticated
+from .permissions import IsContentWorkflowAllowed, CanUploadContent
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-
-from .models import ContentItem
-from .serializers import ContentItemSerializer, ContentPageSerializer
-from .permissions import user_in_group
+from django.http import Http404
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from datetime import datetime, timedelta
+
+from .models import ContentItem, ContentItemTombstone, ContentPack, UploadSession, UploadError
+from .caching import acached, cached, serialize_shared, sign_file_urls
+from .conditional import (
+    aconditional_response, aitem_validators, conditional_response, item_detail_validators, item_validators,
+    make_etag, mark_stale, page_validators,
+)
+from .downloads import download_filename, file_version, read_download_signature, serve_file
+from .importers import FORMATS, READ_ERRORS, ContentImporter, ImportFormatError, detect_format
+from .search import search_items, search_pages
+from .serializers import (
+    ContentItemSerializer, ContentItemListSerializer, ContentPageSerializer, BulkTransitionSerializer,
+    ContentPageVersionSerializer, ContentPageVersionDetailSerializer,
+    UploadSessionSerializer, UploadFinalizeSerializer, ContentPackSerializer,
+)
+from .pagination import ContentItemCursorPagination, ContentPageVersionPagination
+from .permissions import user_in_group, can_transition, can_view_unpublished
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from apps.authentication.asyncapi import AsyncAPIView
 
 
-class GamePublishedContentList(APIView):
+class GamePublishedContentList(AsyncAPIView):
     """Authenticated endpoint to list published content for mobile games.
 
     GET /api/game/content/ -> returns published items (status=published) with absolute file_url
     Mobile clients must include a valid token (e.g. JWT) in the Authorization header.
+    Async, so under ASGI slow game clients do not tie up a worker.
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, format=None):
+    async def get(self, request, format=None):
         qs = ContentItem.objects.filter(is_deleted=False, status=ContentItem.STATUS_PUBLISHED).order_by('-published_at')
-        serializer = ContentItemSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+
+        async def serialize():
+            # Users and their groups are loaded up front, so serializing runs no queries
+            items = [item async for item in ContentItemSerializer.setup_eager_loading(qs)]
+            return serialize_shared(ContentItemSerializer, items, request, many=True)
+
+        async def build():
+            # One worker serializes the feed per content change; the rest read it from the cache
+            (data, versions), stale = await acached('feed', serialize, request.build_absolute_uri('/'))
+            response = Response(sign_file_urls(request, data, versions))
+            return mark_stale(response) if stale else response
+
+        # Most polls find nothing new and get a 304 from two aggregate queries
+        return await aconditional_response(request, await aitem_validators(request, qs), build)
+
+
+class GameContentSyncView(APIView):
+    """Delta sync for the game client's published content cache.
+
+    GET /api/content/game/content/sync/ -> full snapshot plus a sync_token
+    GET /api/content/game/content/sync/?since=<sync_token> -> only changes
+
+    Items published or edited since the token come back in ``items``. Items
+    that were published once but have since been deleted, soft or hard, or
+    have otherwise left the published state come back as tombstones in
+    ``deleted`` so the client can drop them. An invalid or expired token
+    falls back to a full snapshot with ``full_sync`` set.
+    """
+    permission_classes = [IsAuthenticated]
+
+    TOKEN_SALT = 'contentmanagement.game-sync'
+    # Hard-delete tombstones are kept as long as a token stays valid
+    TOKEN_MAX_AGE = int(ContentItemTombstone.KEEP.total_seconds())
+    # Re-send a small window before the token so rows committed by a slower
+    # concurrent transaction are not skipped. Clients upsert, so repeats are harmless.
+    OVERLAP = timedelta(seconds=5)
+
+    def get(self, request, format=None):
+        since = self._read_token(request.query_params.get('since'))
+        issued_at = timezone.now()
+        published = Q(is_deleted=False, status=ContentItem.STATUS_PUBLISHED)
+
+        if since is None:
+            items = ContentItem.objects.filter(published)
+            deleted = []
+        else:
+            changed = ContentItem.objects.filter(updated_at__gt=since - self.OVERLAP)
+            items = changed.filter(published)
+            left = changed.exclude(published).filter(published_at__isnull=False).values_list('id', 'updated_at')
+            removed = ContentItemTombstone.objects.filter(
+                deleted_at__gt=since - self.OVERLAP,
+            ).values_list('item_id', 'deleted_at')
+            deleted = [
+                {'id': pk, 'deleted': True, 'updated_at': updated_at}
+                for pk, updated_at in [*left, *removed]
+            ]
+
+        items = ContentItemSerializer.setup_eager_loading(items.order_by('-published_at'))
+        serializer = ContentItemSerializer(items, many=True, context={'request': request})
+        return Response({
+            'sync_token': signing.dumps(issued_at.isoformat(), salt=self.TOKEN_SALT),
+            'full_sync': since is None,
+            'items': serializer.data,
+            'deleted': deleted,
+        })
+
+    def _read_token(self, token):
+        if not token:
+            return None
+        try:
+            value = signing.loads(token, salt=self.TOKEN_SALT, max_age=self.TOKEN_MAX_AGE)
+            return datetime.fromisoformat(value)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+
+
+class GameContentPackView(APIView):
+    """The latest content pack: every published item in one archive.
+
+    GET /api/content/game/packs/latest/?from=<version>
+    -> {"version": 8, "archive_url": ..., "archive_sha256": ..., "patch": {...} | null, ...}
+
+    ``patch`` is set when ``from`` is the previous version, so an up-to-date
+    client downloads one small patch instead of the whole pack (see ``packs``).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        pack = ContentPack.objects.order_by('-version').first()
+        if pack is None:
+            raise Http404("No content pack has been built yet")
+        from_version = request.query_params.get('from')
+        from_version = int(from_version) if (from_version or '').isdigit() else None
+        context = {'request': request, 'from_version': from_version}
+        validators = make_etag('pack', pack.version, pack.archive_sha256, from_version), int(pack.created_at.timestamp())
+        return conditional_response(
+            request, validators, lambda: Response(ContentPackSerializer(pack, context=context).data),
+        )
+
+
+class GameContentPackFileView(APIView):
+    """A pack archive or patch. Versions never change, so they cache forever."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, version, kind, format=None):
+        pack = get_object_or_404(ContentPack, version=version)
+        field_file = {'archive': pack.archive, 'patch': pack.patch}.get(kind)
+        if not field_file:
+            raise Http404("This pack has no patch")
+        return serve_file(
+            request, field_file, 'private, max-age=31536000, immutable',
+            filename=f"content-pack-{pack.version}{'' if kind == 'archive' else '-patch'}.zip",
+        )
+
+
+class ContentItemDownloadView(APIView):
+    """Authorized download of a ContentItem's file.
+
+    GET /api/content/items/<pk>/download/
+    Authenticate with the usual JWT header, or with the ``sig`` of a signed
+    ``file_url``. Published items are open to any authenticated user; items
+    in other workflow states need a content role. See ``downloads`` for how
+    the bytes are sent.
+    """
+    # A valid signature stands in for the JWT, so the checks happen in get()
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk, format=None):
+        item = get_object_or_404(ContentItem.objects.only('pk', 'slug', 'file', 'status'), pk=pk, is_deleted=False)
+        published = item.status == ContentItem.STATUS_PUBLISHED
+        user, payload = request.user, None
+        if request.query_params.get('sig'):
+            payload = read_download_signature(request.query_params['sig'], item.pk)
+            if payload is None:
+                return Response({'detail': 'Download link is invalid or has expired'}, status=status.HTTP_403_FORBIDDEN)
+            if not published:
+                # Re-check the role of whoever the link was issued to
+                user = get_user_model().objects.filter(pk=payload['u'], is_active=True).first()
+        elif not user.is_authenticated:
+            raise NotAuthenticated()
+        if not published and not (user and can_view_unpublished(user)):
+            return Response({'detail': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        if not item.file:
+            raise Http404("No file attached")
+
+        version = file_version(item.file.name)
+        if payload and version and payload.get('v') == version:
+            # Until it expires this URL always names the same bytes
+            cache_control = f"private, max-age={max(int(payload['e'] - time.time()), 0)}"
+        else:
+            cache_control = 'private, no-cache'
+        return serve_file(request, item.file, cache_control, filename=download_filename(item.slug, item.file.name))
 
 
 class ContentItemViewSet(viewsets.ModelViewSet):
@@ -31,13 +207,51 @@ class ContentItemViewSet(viewsets.ModelViewSet):
     serializer_class = ContentItemSerializer
     # Require authentication and check role-based permissions for actions
     permission_classes = [IsAuthenticated, IsContentWorkflowAllowed]
+    pagination_class = ContentItemCursorPagination
+
+    def get_serializer_class(self):
+        # Paginated lists get the compact row; retrieve and the legacy
+        # unpaginated list (CONTENT_LIST_PAGINATED off) keep the full payload.
+        if self.action == 'list' and self.paginator.is_requested(self.request):
+            return ContentItemListSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         qs = ContentItem.objects.filter(is_deleted=False)
         status_q = self.request.query_params.get('status')
         if status_q:
             qs = qs.filter(status=status_q)
-        return qs.order_by('-created_at')
+        return self.get_serializer_class().setup_eager_loading(qs.order_by('-created_at'))
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self.request.query_params.get('q', '').strip()
+        if query and self.action == 'list':
+            queryset = search_items(queryset, query)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        # Search results are ranked, not keyset-ordered; they come back as one capped list
+        if self.request.query_params.get('q', '').strip():
+            return None
+        return super().paginate_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        # Search results derive from the same rows, so the unsearched set validates them too
+        validators = item_validators(request, self.get_queryset())
+        return conditional_response(request, validators, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = item_detail_validators(request, kwargs['pk'])
+        return conditional_response(request, validators, partial(self.cached_retrieve, request, kwargs['pk']))
+
+    def cached_retrieve(self, request, pk):
+        # Object permissions repeat the role check from initial(), so a cache hit can skip get_object()
+        (data, versions), stale = cached('item', lambda: serialize_shared(
+            self.get_serializer_class(), self.get_object(), request,
+        ), pk, request.build_absolute_uri('/'))
+        response = Response(sign_file_urls(request, data, versions))
+        return mark_stale(response) if stale else response
 
     def perform_create(self, serializer):
         # When a new content item is uploaded by an Encoder/Editor, set its status
@@ -93,12 +307,7 @@ class ContentItemViewSet(viewsets.ModelViewSet):
         if not (request.user.is_superuser or user_in_group(request.user, 'Approver')):
             return Response({'detail': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         # clear approval metadata and move back to editing
-        item.status = ContentItem.STATUS_FOR_EDITING
-        item.approved_by = None
-        item.approved_at = None
-        # record that it was sent back for editing
-        item.edited_at = item.edited_at or None
-        item.save(update_fields=['status', 'approved_by', 'approved_at', 'edited_at'])
+        item.deny(user=request.user)
         return Response(self.get_serializer(item).data)
 
     @action(detail=True, methods=['post'])
@@ -110,6 +319,68 @@ class ContentItemViewSet(viewsets.ModelViewSet):
         item.publish(user=request.user)
         return Response(self.get_serializer(item).data)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch_create(self, request):
+        """Create many items in one request.
+
+        POST {"items": [{"title": "...", "body": "..."}, ...]}
+        or multipart with ``file`` = a .csv, .ndjson or .zip (add ``file_format``
+        when the file name has no such extension).
+
+        Rows that fail validation are skipped and listed in ``errors`` by row
+        number; the rest are created in the "For editing" state. A file that
+        cannot be read past some row keeps the rows before it and lists the
+        read error under that row:
+        { "message": "Content Uploaded", "created": 2, "failed": 1, "ids": [...],
+          "errors": [{"row": 3, "errors": {"title": ["This field may not be blank."]}}] }
+        """
+        importer = ContentImporter(user=request.user)
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                fmt = request.data.get('file_format') or detect_format(upload.name)
+                if fmt not in FORMATS:
+                    raise ImportFormatError(f'Unsupported format: {fmt}')
+                importer.import_file(upload.file, fmt)
+            elif isinstance(request.data.get('items'), list):
+                importer.import_records(request.data['items'])
+            else:
+                return Response({'error': 'Send an "items" list or a "file" upload'}, status=status.HTTP_400_BAD_REQUEST)
+        except READ_ERRORS as exc:
+            # Nothing was imported: no manifest, not a ZIP, an unknown format
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = importer.summary
+        if not summary['created']:
+            return Response({'message': 'Content Failed to Upload', **summary}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'Content Uploaded', **summary}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def bulk_transition(self, request):
+        """Move many items through one workflow step.
+
+        POST {"ids": [1, 2, 3], "transition": "publish"}
+        -> {"transition": "publish", "updated": 2,
+            "results": [{"id": 1, "ok": true}, {"id": 3, "ok": false, "error": "..."}, ...]}
+        """
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        transition = serializer.validated_data['transition']
+        if not can_transition(request.user, transition):
+            return Response({'detail': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        outcome = ContentItem.bulk_transition(ids, transition, user=request.user)
+        results = [
+            {'id': pk, 'ok': True} if outcome[pk] is None else {'id': pk, 'ok': False, 'error': outcome[pk]}
+            for pk in ids
+        ]
+        return Response({
+            'transition': transition,
+            'updated': sum(result['ok'] for result in results),
+            'results': results,
+        })
+
     def destroy(self, request, *args, **kwargs):
         # soft delete
         instance = self.get_object()
@@ -117,11 +388,105 @@ class ContentItemViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ContentUploadViewSet(viewsets.GenericViewSet):
+    """Resumable chunked uploads for ContentItem files.
+
+    POST   /api/content/uploads/                {filename, size, sha256?, content_item?}
+    PUT    /api/content/uploads/<id>/           raw bytes with Content-Range: bytes <start>-<end>/<size>
+    GET    /api/content/uploads/<id>/           current offset (also in the Upload-Offset header, for HEAD)
+    POST   /api/content/uploads/<id>/finalize/  {sha256?, title?, body?}
+    DELETE /api/content/uploads/<id>/           cancel
+
+    After a dropped connection the client asks for the offset and PUTs the
+    rest from there. Finalize checks the sha256 (given at create or finalize)
+    and attaches the file to ``content_item``, or creates a new item.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated, CanUploadContent]
+
+    CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(created_by=self.request.user)
+
+    def _session_response(self, session, status_code=status.HTTP_200_OK, **extra):
+        return Response(
+            {**extra, **self.get_serializer(session).data},
+            status=status_code,
+            headers={'Upload-Offset': str(session.received)},
+        )
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Replacing the file of an existing item is an edit
+        if serializer.validated_data.get('content_item') and not (
+            request.user.is_superuser or user_in_group(request.user, 'Editor')
+        ):
+            return Response({'detail': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        session = serializer.save(created_by=request.user)
+        return self._session_response(session, status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return self._session_response(self.get_object())
+
+    def update(self, request, pk=None):
+        session = self.get_object()
+        if session.status != UploadSession.STATUS_UPLOADING:
+            return self._session_response(session, status.HTTP_409_CONFLICT, error='This upload has already been finalized')
+
+        match = self.CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response(
+                {'error': 'A Content-Range: bytes <start>-<end>/<size> header is required'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start, end = int(match[1]), int(match[2])
+        if end < start or end >= session.size or match[3] not in ('*', str(session.size)):
+            return Response({'error': f'Range must lie within the {session.size}-byte file'}, status=status.HTTP_400_BAD_REQUEST)
+        length = end - start + 1
+        if int(request.META.get('CONTENT_LENGTH') or 0) != length:
+            return Response({'error': 'Content-Length does not match Content-Range'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Read the raw body stream; request.data would buffer it through the parsers
+        try:
+            written = session.write_chunk(start, request.stream, length)
+        except UploadError as e:
+            return self._session_response(session, status.HTTP_409_CONFLICT, error=str(e))
+        if written != length:
+            return self._session_response(session, status.HTTP_400_BAD_REQUEST, error='Chunk ended early; resume from offset')
+        return self._session_response(session)
+
+    def destroy(self, request, pk=None):
+        session = self.get_object()
+        session.discard()
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        serializer = UploadFinalizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            item = session.finalize(request.user, **serializer.validated_data)
+        except UploadError as e:
+            return self._session_response(session, status.HTTP_400_BAD_REQUEST, error=str(e))
+        if item is None:
+            return self._session_response(
+                session, status.HTTP_400_BAD_REQUEST, error='Checksum mismatch; upload the file again from byte 0',
+            )
+        return Response({
+            'message': 'Content Uploaded',
+            'id': item.id,
+            'item': ContentItemSerializer(item, context={'request': request}).data,
+        }, status=status.HTTP_201_CREATED)
+
+
 # New viewset for ContentPage model
 from wagtail.models import Page
 from django.contrib.auth.models import Group
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import Http404
 
 
 class ContentPageViewSet(viewsets.ModelViewSet):
@@ -131,7 +496,27 @@ class ContentPageViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Get the actual ContentPage instances
         from .models import ContentPage
-        return ContentPage.objects.all()
+        qs = ContentPage.objects.all()
+        status_q = self.request.query_params.get('status')
+        if status_q:
+            qs = qs.filter(status=status_q)
+        return qs
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self.request.query_params.get('q', '').strip()
+        if query and self.action == 'list':
+            queryset = search_pages(queryset, query)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        validators = page_validators(self.get_queryset())
+        return conditional_response(request, validators, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs['pk']
+        validators = page_validators(self.get_queryset().filter(pk=pk)) if str(pk).isdigit() else (None, None)
+        return conditional_response(request, validators, partial(super().retrieve, request, *args, **kwargs))
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -194,15 +579,39 @@ class ContentPageViewSet(viewsets.ModelViewSet):
         except ContentPage.DoesNotExist:
             raise Http404("Content does not exist")
 
+    @action(detail=True, methods=['get'])
+    def documents(self, request, pk=None):
+        """Download the page's attached document (see ``downloads``)."""
+        page = self.get_object()
+        if not page.documents:
+            raise Http404("No document attached")
+        return serve_file(
+            request, page.documents, 'private, no-cache',
+            filename=download_filename(page.slug, page.documents.name),
+        )
+
     @action(detail=True, methods=['get'])
     def version_history(self, request, pk=None):
-        from .models import ContentPage
-        try:
-            content = ContentPage.objects.get(pk=pk)
-            return Response({'versions': content.previous_versions})
-        except ContentPage.DoesNotExist:
+        """Paginated version metadata, newest first.
+
+        ``?version=N`` returns that single version with its body rebuilt.
+        """
+        from .models import ContentPage, ContentPageVersion
+        if not ContentPage.objects.filter(pk=pk).exists():
             raise Http404("Content does not exist")
 
+        version_number = request.query_params.get('version')
+        if version_number is not None:
+            if not version_number.isdigit():
+                return Response({'error': 'version must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            version = get_object_or_404(ContentPageVersion, page_id=pk, version_number=version_number)
+            return Response(ContentPageVersionDetailSerializer(version).data)
+
+        versions = ContentPageVersion.objects.filter(page_id=pk).defer('data')
+        paginator = ContentPageVersionPagination()
+        page = paginator.paginate_queryset(versions, request, view=self)
+        return paginator.get_paginated_response(ContentPageVersionSerializer(page, many=True).data)
+
 
 from django.shortcuts import render
 
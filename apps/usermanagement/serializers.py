@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from django.contrib.auth.models import Group
+from apps.authentication.roles import clear_role_cache
 
 User = get_user_model()
 
@@ -27,6 +28,7 @@ class UserSerializer(serializers.ModelSerializer):
             user.set_unusable_password()
         user.save()
         user.groups.set(groups)
+        clear_role_cache(user)
         return user
 
     def update(self, instance, validated_data):
@@ -39,4 +41,5 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         if groups is not None:
             instance.groups.set(groups)
+            clear_role_cache(instance)
         return instance
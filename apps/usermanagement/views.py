@@ -3,6 +3,7 @@ from rest_framework import viewsets
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from .serializers import UserSerializer
+from apps.authentication.roles import user_has_role
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -15,13 +16,10 @@ class IsAdminOrSuperuser(IsAuthenticated):
 		if not super().has_permission(request, view):
 			return False
 		# allow only superusers or users in Admin/Super Admin groups
-		# request.user.groups is a RelatedManager; use values_list to avoid
-		# accidentally iterating the manager itself (which raises TypeError).
 		if request.user.is_superuser:
 			return True
-		# Use values_list for an efficient DB-level fetch of group names
-		names = set(request.user.groups.values_list('name', flat=True))
-		return ('Admin' in names) or ('Super Admin' in names)
+		# Role names are resolved once per request (see apps.authentication.roles)
+		return user_has_role(request.user, 'Admin', 'Super Admin')
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -2,6 +2,9 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Production runs it under gunicorn with uvicorn workers when SERVER_MODE=asgi
+(deploy/gunicorn.conf.py). ``config.settings`` loads .env and the base
+settings, the same as config/wsgi.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
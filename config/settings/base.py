@@ -92,6 +92,50 @@ else:
         }
     }
 
+# Connection reuse. Opening a Postgres connection (TCP, TLS, auth) costs a
+# network round trip or three, so connections outlive the request:
+# - with psycopg 3 and psycopg_pool installed, each worker process keeps a pool
+#   (DB_POOL, on by default) sized for the requests it serves at once: one per
+#   thread under WSGI (GUNICORN_THREADS), and up to DB_POOL_MAX_SIZE under
+#   ASGI, where every request runs its queries on a thread of its own;
+# - otherwise a connection is kept for DB_CONN_MAX_AGE seconds. Under ASGI
+#   that would leave one open connection per request thread, so the default
+#   there is 0, as Django's docs advise.
+# Keep GUNICORN_WORKERS x pool size below the server's max_connections.
+# `manage.py benchmark_connections` compares the options.
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', '1'))
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '0' if SERVER_MODE == 'asgi' else '600'))
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+DB_POOL = os.environ.get('DB_POOL', 'True') == 'True'
+
+
+def configure_db_connections(database):
+    """Apply the connection reuse settings above to a DATABASES entry."""
+    database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    database['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+    if not (DB_POOL and database['ENGINE'] == 'django.db.backends.postgresql'):
+        return
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        # psycopg2: Django has no pool for it, persistent connections only
+        return
+    pool = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', str(GUNICORN_THREADS if SERVER_MODE == 'wsgi' else 10))),
+        # Seconds a request waits for a free connection before failing
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    }
+    # CONN_HEALTH_CHECKS makes Django check pooled connections before use
+    database.setdefault('OPTIONS', {})['pool'] = pool
+    # Pooled connections go back to the pool after each request
+    database['CONN_MAX_AGE'] = 0
+
+
+configure_db_connections(DATABASES['default'])
+
 
 # Application definition
 INSTALLED_APPS = [
@@ -140,6 +184,8 @@ INSTALLED_APPS.extend([
 ])
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover every other middleware
+    'middleware.performance.PerformanceMiddleware',
     # CORS middleware should be placed as high as possible
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -156,7 +202,7 @@ MIDDLEWARE = [
 # Add Supabase middleware if environment variables are set
 if os.environ.get('SUPABASE_URL') and os.environ.get('SUPABASE_ANON_KEY'):
     # Insert Supabase middleware after CORS but before other middleware
-    MIDDLEWARE.insert(1, 'middleware.supabase_auth.SupabaseAuthMiddleware')
+    MIDDLEWARE.insert(2, 'middleware.supabase_auth.SupabaseAuthMiddleware')
 
 ROOT_URLCONF = 'config.urls'
 
@@ -223,6 +269,37 @@ STATICFILES_DIRS = [BASE_DIR / 'static'] if (BASE_DIR / 'static').exists() else
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # ContentItem.file and ContentPage.documents: deduplicated by SHA-256 under MEDIA_ROOT/cas/
+    'content': {'BACKEND': 'apps.contentmanagement.storage.ContentAddressedStorage'},
+}
+
+# Partial files of resumable ContentItem uploads. Kept on the media volume so
+# finalizing can move the file into place instead of copying it; nginx must
+# not serve this directory.
+CONTENT_UPLOAD_SESSION_DIR = os.environ.get('CONTENT_UPLOAD_SESSION_DIR', str(MEDIA_ROOT / 'upload_sessions'))
+CONTENT_UPLOAD_MAX_SIZE = int(os.environ.get('CONTENT_UPLOAD_MAX_SIZE', str(4 * 1024 ** 3)))
+
+# /api/content/items/ returns cursor pages of compact rows. Set to False only
+# while a client that still expects the full bare list is being migrated; the
+# list then paginates just when ?cursor= or ?page_size= is sent.
+CONTENT_LIST_PAGINATED = os.environ.get('CONTENT_LIST_PAGINATED', 'True') == 'True'
+
+# Content files are served by authorized download views. Behind nginx set this
+# to its internal location (deploy/nginx.conf: /protected-media/) so nginx sends
+# the bytes; when empty Django streams them itself.
+CONTENT_DOWNLOAD_ACCEL_PREFIX = os.environ.get('CONTENT_DOWNLOAD_ACCEL_PREFIX', '')
+# Signed file_url links stay valid (and unchanged) for at least this long
+CONTENT_DOWNLOAD_URL_SECONDS = int(os.environ.get('CONTENT_DOWNLOAD_URL_SECONDS', '3600'))
+
+# Also build the game content pack in a background thread of the web worker
+# that published; cron `build_content_pack --pending` picks up builds cut short
+CONTENT_PACK_BUILD_ON_PUBLISH = os.environ.get('CONTENT_PACK_BUILD_ON_PUBLISH', 'True') == 'True'
+# How many pack versions (and their patches) to keep
+CONTENT_PACK_KEEP = int(os.environ.get('CONTENT_PACK_KEEP', '5'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -246,7 +323,12 @@ CORS_ALLOW_CREDENTIALS = True
 # Django REST Framework + Simple JWT configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication that reports its time through utils/timing.py
+        'apps.authentication.authentication.TimedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'middleware.performance.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -261,6 +343,54 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': False,
 }
 
+# One cache shared by all gunicorn workers on the host, without running Redis.
+# The file cache is per container: when several containers serve traffic,
+# set REDIS_URL so they share one cache (and one content cache generation).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', '/var/tmp/django_cache'),
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', '2000'))},
+        },
+    }
+
+# Published feed and item detail responses are shared through the cache until
+# the next content change (see apps/contentmanagement/caching.py); 0 disables.
+CONTENT_CACHE_SECONDS = int(os.environ.get('CONTENT_CACHE_SECONDS', '300'))
+
+# Request instrumentation (middleware/performance.py): Server-Timing headers,
+# per-endpoint histograms over the last one to two windows, and query budgets.
+# Server-Timing shows the query count and phase timings to any client, so it
+# is only sent in development unless switched on explicitly.
+PERFORMANCE_SERVER_TIMING = os.environ.get('PERFORMANCE_SERVER_TIMING', str(DEBUG)) == 'True'
+PERFORMANCE_WINDOW_SECONDS = int(os.environ.get('PERFORMANCE_WINDOW_SECONDS', '300'))
+# Most queries an endpoint may run, counting authentication and role lookups.
+# Over budget is logged as a warning, or raises under QUERY_BUDGET_STRICT.
+QUERY_BUDGETS = {
+    'ContentItemViewSet.list': 8,
+    'ContentItemViewSet.retrieve': 7,
+    'GamePublishedContentList.get': 7,
+    'GameContentSyncView.get': 6,
+    'MeView.get': 3,
+}
+# The test suites switch it on with override_settings.
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+# Prometheus metrics at /metrics (utils/metrics.py). When set, scrapers
+# must send "Authorization: Bearer <token>"; nginx keeps /metrics internal either way.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Analytics dashboard responses are cached briefly; set to 0 to disable.
+ANALYTICS_CACHE_SECONDS = int(os.environ.get('ANALYTICS_CACHE_SECONDS', '30'))
+
 
 # ---------- Security / production defaults
 # When STAGING_ENVIRONMENT is True, use relaxed security settings appropriate for staging
@@ -14,7 +14,7 @@ import dj_database_url  # This will need to be installed
 SUPABASE_DB_URL = os.environ.get('SUPABASE_DB_URL')
 if SUPABASE_DB_URL:
     DATABASES = {
-        'default': dj_database_url.config(default=SUPABASE_DB_URL, conn_max_age=600, ssl_require=True)
+        'default': dj_database_url.config(default=SUPABASE_DB_URL, ssl_require=True)
     }
 else:
     # Fallback to environment variables
@@ -31,12 +31,21 @@ else:
             },
         }
     }
+configure_db_connections(DATABASES['default'])
 
 # Supabase Auth Integration
 SUPABASE_ANON_KEY = os.environ.get('SUPABASE_ANON_KEY')
 SUPABASE_SERVICE_ROLE_KEY = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
 SUPABASE_URL = os.environ.get('SUPABASE_URL', 'https://your-project.supabase.co')
 
+# Local JWT verification (middleware/supabase_auth.py). The secret is only needed
+# for projects still signing with the legacy HS256 key; otherwise the JWKS is used.
+SUPABASE_JWT_SECRET = os.environ.get('SUPABASE_JWT_SECRET')
+SUPABASE_JWT_AUDIENCE = os.environ.get('SUPABASE_JWT_AUDIENCE', 'authenticated')
+SUPABASE_JWKS_CACHE_SECONDS = int(os.environ.get('SUPABASE_JWKS_CACHE_SECONDS', '600'))
+SUPABASE_TOKEN_CACHE_SIZE = int(os.environ.get('SUPABASE_TOKEN_CACHE_SIZE', '1024'))
+SUPABASE_TOKEN_CACHE_SECONDS = int(os.environ.get('SUPABASE_TOKEN_CACHE_SECONDS', '60'))
+
 # If using Supabase Auth, you might want to configure it as an alternative to Django's built-in auth
 # This would require additional configuration for the frontend to interact with Supabase Auth directly
 
@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from wagtail import urls as wagtail_urls
 
+from utils.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('cms/', include(wagtail_urls)),
@@ -27,6 +29,7 @@ urlpatterns = [
     path('api/content/', include('apps.contentmanagement.urls')),
     path('api/users/', include('apps.usermanagement.urls')),
     path('api/analytics/', include('apps.analyticsmanagement.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # During development serve media and static files through Django's static() helper
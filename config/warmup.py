@@ -0,0 +1,79 @@
+"""
+Warm-up for gunicorn workers (deploy/gunicorn.conf.py).
+
+With ``preload_app`` the master imports the project once and runs
+``warm_app``: the URL resolver is populated and every API serializer builds
+its fields, so the import and introspection work is done before the fork and
+shared by all workers. It does not touch the database; a connection opened
+in the master would be shared by every forked worker.
+
+Each worker then runs ``warm_connections`` before it accepts requests, which
+opens its database connection (or fills its pool) so the first request does
+not pay for the connect.
+
+BOOT_STARTED_AT (epoch seconds, set by docker/entrypoint.sh) lets both report
+how long the container took from start to ready.
+"""
+
+import os
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.db import connections
+from django.urls import resolve, reverse
+from rest_framework import serializers
+
+# Requests the game client and the CMS make first; resolving them compiles the
+# patterns along their path
+WARM_PATHS = (
+    '/api/auth/me/',
+    '/api/content/items/',
+    '/api/content/game/content/',
+    '/api/analytics/',
+)
+
+
+def seconds_since_boot():
+    started = os.environ.get('BOOT_STARTED_AT')
+    return time.time() - float(started) if started else None
+
+
+def _project_serializers():
+    for app_config in apps.get_app_configs():
+        if not app_config.name.startswith('apps.'):
+            continue
+        try:
+            module = import_module(f'{app_config.name}.serializers')
+        except ModuleNotFoundError:
+            continue
+        for value in vars(module).values():
+            if (isinstance(value, type) and issubclass(value, serializers.Serializer)
+                    and value.__module__ == module.__name__):
+                yield value
+
+
+def warm_app():
+    """Resolve URLs and build serializers in the master; returns how many of each."""
+    # Builds the reverse lookup tables for every URL name
+    reverse('metrics')
+    for path in WARM_PATHS:
+        resolve(path)
+
+    built = 0
+    for serializer_class in _project_serializers():
+        # ModelSerializer introspects the model the first time fields are built
+        serializer_class().fields
+        built += 1
+    connections.close_all()
+    return len(WARM_PATHS), built
+
+
+def warm_connections():
+    """Open each worker's database connections before it takes traffic."""
+    for connection in connections.all():
+        connection.ensure_connection()
+        if not connection.settings_dict['CONN_MAX_AGE']:
+            # Pooled: back to the pool, which stays open. Otherwise the
+            # connection would not outlive the first request anyway.
+            connection.close()
@@ -0,0 +1,89 @@
+"""Gunicorn settings for the web container (docker/entrypoint.sh).
+
+SERVER_MODE picks the serving path:
+  wsgi (default)  sync workers running config.wsgi
+  asgi            uvicorn workers running config.asgi; the game feed,
+                  analytics and /api/auth/me/ views are async there, so slow
+                  clients and database round trips do not hold a worker
+
+Compare the two with scripts/load_test.py.
+
+The app is preloaded in the master (GUNICORN_PRELOAD) and warmed up there
+once; each worker opens its database connection before taking traffic, and
+both log how long it has been since the container started (config/warmup.py).
+
+Workers write Prometheus samples to files in PROMETHEUS_MULTIPROC_DIR and
+/metrics adds them up (utils/metrics.py). The directory is emptied when
+gunicorn starts so counters do not carry over from a previous run.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '3'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+# Import Django, Wagtail and DRF once in the master; workers fork with them loaded.
+# Code changes then need a restart rather than a HUP.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # Connections per worker before it stops accepting; sized for launch-day bursts
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+else:
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'sync'
+    # More than one thread makes gunicorn use gthread workers. The settings
+    # size each worker's database pool from the same variable.
+    threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+
+# Set before any worker imports prometheus_client, which picks its storage then
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'prometheus_multiproc'),
+)
+shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    # Drops the exited worker's live gauges; its counters and histograms stay summed
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from config.warmup import seconds_since_boot, warm_app
+    started = time.perf_counter()
+    try:
+        paths, serializers = warm_app()
+    except Exception:
+        server.log.exception('Warm-up failed; starting workers anyway')
+        return
+    server.log.info(
+        'Warmed up %d URLs and %d serializers in %.2fs', paths, serializers, time.perf_counter() - started,
+    )
+    boot = seconds_since_boot()
+    if boot is not None:
+        server.log.info('Master ready %.2fs after boot', boot)
+
+
+def post_worker_init(worker):
+    from config.warmup import seconds_since_boot, warm_connections
+    try:
+        warm_connections()
+    except Exception:
+        worker.log.exception('Could not open database connections during warm-up')
+    boot = seconds_since_boot()
+    if boot is not None:
+        worker.log.info('Worker %s ready %.2fs after boot', worker.pid, boot)
@@ -1,15 +1,25 @@
 #!/usr/bin/env bash
 set -e
 
-# Run database migrations, collect static files, then start Gunicorn.
+# Apply migrations and collect static files, then start Gunicorn.
 # This script assumes environment variables are provided via an .env file
 # mounted or passed to the container.
+#
+# STARTUP_MODE=fast (default) skips migrate when there is nothing to apply and
+# collectstatic when the static sources hash the same as last time;
+# STARTUP_MODE=full always runs both.
 
-echo "Running migrations..."
-python manage.py migrate --noinput
+# Gunicorn logs how long the container took to become ready from here
+export BOOT_STARTED_AT="$(date +%s.%N)"
 
-echo "Collecting static files..."
-python manage.py collectstatic --noinput
+if [ "${STARTUP_MODE:-fast}" = "full" ]; then
+    echo "Running startup tasks (full)..."
+    python manage.py prepare_startup --full
+else
+    echo "Running startup tasks..."
+    python manage.py prepare_startup
+fi
 
-echo "Starting Gunicorn..."
-exec gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers 3
+# SERVER_MODE=asgi serves config.asgi with uvicorn workers (see deploy/gunicorn.conf.py)
+echo "Starting Gunicorn (${SERVER_MODE:-wsgi})..."
+exec gunicorn --config deploy/gunicorn.conf.py
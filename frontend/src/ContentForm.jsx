@@ -12,6 +12,16 @@ export default function ContentForm({ item = null, onDone }) {
   useEffect(() => {
     setTitle(item?.title || '');
     setBody(item?.body || '');
+    // List rows leave the body out; load it before it can be saved back empty
+    if (item && item.body === undefined) {
+      let cancelled = false;
+      fetchAuth(`/api/content/items/${item.id}/`)
+        .then(res => (res.ok ? res.json() : null))
+        .then(full => { if (full && !cancelled) setBody(full.body || ''); })
+        .catch(err => console.error(err));
+      return () => { cancelled = true; };
+    }
+    return undefined;
   }, [item]);
 
   const submit = async (e) => {
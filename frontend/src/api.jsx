@@ -18,4 +18,21 @@ export async function fetchAuth(path, options = {}) {
   return fetch(url, Object.assign({}, options, { headers }));
 }
 
+// /api/content/items/ answers in cursor pages of compact rows (no body, the
+// creator as created_by_name). Follows `next` to collect every row matching
+// `params`, e.g. { status: 'for_approval' }, one bounded page per request.
+export async function fetchContentItems(params = {}, options = {}) {
+  const query = new URLSearchParams({ page_size: '200', ...params });
+  let url = `/api/content/items/?${query}`;
+  const items = [];
+  while (url) {
+    const res = await fetchAuth(url, options);
+    if (!res.ok) throw new Error('Failed to load items');
+    const page = await res.json();
+    items.push(...page.results);
+    url = page.next;
+  }
+  return items;
+}
+
 export { API_BASE };
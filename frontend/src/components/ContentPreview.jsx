@@ -46,11 +46,13 @@ export default function ContentPreview({ item: initialItem, id, onClose }) {
               {item.body && <div style={{ whiteSpace: 'pre-wrap', marginBottom: 12 }}>{item.body}</div>}
               {item.file ? (
                 (() => {
-                  let src = (typeof item.file === 'string') ? item.file : (item.file && (item.file.url || item.file.name));
+                  const name = (typeof item.file === 'string') ? item.file : (item.file && (item.file.url || item.file.name));
+                  // file_url is the signed download link; /media/ does not serve content files
+                  let src = item.file_url || name;
                   if (src && !src.startsWith('http') && !src.startsWith('/')) {
                     src = `${window.location.origin}/${src}`;
                   }
-                  const t = fileTypeFromUrl(src || '');
+                  const t = fileTypeFromUrl(name || '');
                   if (t === 'image') return <img src={src} alt={item.title} style={{ maxWidth: '100%', height: 'auto', borderRadius: 4 }} />;
                   if (t === 'video') return <video controls src={src} style={{ width: '100%', maxHeight: 500 }} />;
                   if (t === 'audio') return <audio controls src={src} style={{ width: '100%' }} />;
@@ -3,6 +3,7 @@ import { Table, Button, Card, Modal, message, Tag, Space, Pagination } from 'ant
 import { CheckCircleOutlined, CloseCircleOutlined, EyeOutlined } from '@ant-design/icons';
 import { useOutletContext } from 'react-router-dom';
 import statusLabel from '../utils/statusLabels.jsx';
+import { fetchContentItems } from '../api';
 
 export default function ApproveContentPage() {
   const [contents, setContents] = useState([]);
@@ -25,12 +26,9 @@ export default function ApproveContentPage() {
     
     setLoading(true);
     try {
-      const res = await fetch(`/api/content/items/?status=for_approval`, { 
-        headers: { Authorization: `Bearer ${token}` } 
-      });
-      
-      if (!res.ok) throw new Error('Failed to load content');
-      const data = await res.json();
+      const data = await fetchContentItems(
+        { status: 'for_approval' }, { headers: { Authorization: `Bearer ${token}` } },
+      );
       setContents(data);
     } catch (error) {
       console.error('Error fetching content:', error);
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Table, Button, Space, Tag, Modal, message, Card } from 'antd';
 import { EditOutlined, CheckCircleOutlined, CloseCircleOutlined, EyeOutlined, DeleteOutlined, PushpinOutlined, PlayCircleOutlined, UploadOutlined } from '@ant-design/icons';
 import axios from 'axios';
+import { fetchContentItems } from '../api';
 import './ContentListPage.css';
 
 const ContentList = () => {
@@ -35,21 +36,21 @@ const ContentList = () => {
     try {
       const token = localStorage.getItem('token');
       // Using the correct endpoint: /api/content/items/
-      const response = await axios.get('/api/content/items/', {
+      const items = await fetchContentItems({}, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
       
       // Transform the data to match table structure
-      const transformedData = response.data.map(item => ({
+      const transformedData = items.map(item => ({
         key: item.id,
         id: item.id,
         title: item.title,
         status: item.status,
         type: item.file ? (item.file.endsWith('.mp4') || item.file.endsWith('.mov') ? 'video' : 
                           item.file.endsWith('.jpg') || item.file.endsWith('.png') || item.file.endsWith('.jpeg') ? 'image' : 'text') : 'text',
-        author: item.created_by?.username || 'Unknown',
+        author: item.created_by_name || 'Unknown',
         createdAt: item.created_at ? new Date(item.created_at).toLocaleDateString() : 'N/A',
         item: item // Keep the original item for reference
       }));
@@ -69,7 +70,7 @@ const ContentList = () => {
     const item = contentItem.item; // Get the original item
     
     // Check if current user is the creator of the content
-    const isCreator = item.created_by && item.created_by.id === currentUser?.id;
+    const isCreator = Boolean(item.created_by_name) && item.created_by_name === currentUser?.username;
     
     // Encoder can edit their own content if it's in 'for_editing' status
     if (currentUser?.role === 'encoder' && isCreator && item.status === 'for_editing') {
@@ -3,6 +3,7 @@ import { useOutletContext } from 'react-router-dom';
 import ContentForm from '../ContentForm.jsx';
 import statusLabel from '../utils/statusLabels.jsx';
 import ContentPreview from '../components/ContentPreview.jsx';
+import { fetchContentItems } from '../api';
 
 export default function ContentManagementPage() {
   const { user } = useOutletContext();
@@ -17,11 +18,7 @@ export default function ContentManagementPage() {
   const fetchItems = React.useCallback(async () => {
     setLoading(true);
     try {
-      const res = await fetch('/api/content/items/', {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (!res.ok) throw new Error('Failed to load items');
-      const data = await res.json();
+      const data = await fetchContentItems({}, { headers: { Authorization: `Bearer ${token}` } });
       // Only show items that are in an "editable" state on the Edit Content page.
       // Once an item moves to approval/publishing/published it should live in those
       // respective sections and not reappear here unless an approver denies it.
@@ -124,7 +121,7 @@ import { useOutletContext, useNavigate } from 'react-router-dom';
 import ContentForm from '../ContentForm';
 import statusLabel from '../utils/statusLabels';
 import ContentPreview from '../components/ContentPreview';
-import { fetchAuth } from '../api';
+import { fetchAuth, fetchContentItems } from '../api';
 
 export default function ContentManagementPage() {
   const { user } = useOutletContext();
@@ -137,9 +134,7 @@ export default function ContentManagementPage() {
   const fetchItems = React.useCallback(async () => {
     setLoading(true);
     try {
-      const res = await fetchAuth('/api/content/items/');
-      if (!res.ok) throw new Error('Failed to load items');
-      const data = await res.json();
+      const data = await fetchContentItems({ status: 'for_editing' });
       // Only show items that are still editable (not sent for approval/publishing/published/deleted)
       // Match backend model strings: 'for_editing', 'for_approval', 'for_publishing', 'published', 'deleted'
       const editableStatuses = new Set(['for_editing']);
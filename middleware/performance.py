@@ -0,0 +1,186 @@
+"""
+Request Performance Instrumentation
+
+Measures where each request's time goes and reports it three ways:
+
+- a ``Server-Timing`` header (db, auth, serialize, render, app, total) that
+  browser dev tools show per request;
+- rolling per-endpoint histograms kept in this process (``histograms``);
+- Prometheus metrics per URL name, served at ``/metrics`` (``utils.metrics``);
+- per-endpoint query budgets (``QUERY_BUDGETS``): going over one is logged,
+  or raises ``QueryBudgetExceeded`` when ``QUERY_BUDGET_STRICT`` is on (the
+  API test cases turn it on).
+
+The middleware starts a ``RequestMetrics`` for each request; database time
+and the ``timed`` phases are added to it by ``utils.timing``. Auth,
+serialization and render time are reported by ``TimedJWTAuthentication``,
+``timed('serialize')`` and ``TimedJSONRenderer``;
+``app`` is whatever is left: view code, middleware and cache lookups.
+
+Endpoints are named after the view class and action, e.g.
+``ContentItemViewSet.list`` or ``GamePublishedContentList.get``.
+"""
+
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import JSONRenderer
+
+from utils import metrics as prometheus
+from utils.timing import PHASES, RequestMetrics, install_wrapper, request_metrics, timed
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _empty_stats():
+    return {
+        'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'queries': 0,
+        'buckets': [0] * (len(BUCKETS_MS) + 1), 'phases_ms': dict.fromkeys(PHASES, 0.0),
+    }
+
+
+class Histograms:
+    """Per-endpoint latency histograms over the last one to two windows.
+
+    Observations go into the current window; when it is older than
+    ``window`` seconds it becomes the previous one and the one before is
+    dropped, so a snapshot always covers recent traffic only.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._current, self._previous = {}, {}
+        self._rotated = time.monotonic()
+
+    def _rotate(self):
+        now = time.monotonic()
+        if now - self._rotated >= self.window:
+            self._previous = self._current if now - self._rotated < 2 * self.window else {}
+            self._current = {}
+            self._rotated = now
+
+    def observe(self, endpoint, total_ms, queries, timings_ms):
+        bucket = next((i for i, bound in enumerate(BUCKETS_MS) if total_ms <= bound), len(BUCKETS_MS))
+        with self._lock:
+            self._rotate()
+            stats = self._current.get(endpoint)
+            if stats is None:
+                stats = self._current[endpoint] = _empty_stats()
+            stats['count'] += 1
+            stats['total_ms'] += total_ms
+            stats['max_ms'] = max(stats['max_ms'], total_ms)
+            stats['queries'] += queries
+            stats['buckets'][bucket] += 1
+            for phase in PHASES:
+                stats['phases_ms'][phase] += timings_ms[phase]
+
+    def snapshot(self):
+        """``{endpoint: stats}`` merged over the current and previous window."""
+        with self._lock:
+            self._rotate()
+            merged = {}
+            for window in (self._previous, self._current):
+                for endpoint, stats in window.items():
+                    into = merged.setdefault(endpoint, _empty_stats())
+                    into['count'] += stats['count']
+                    into['total_ms'] += stats['total_ms']
+                    into['max_ms'] = max(into['max_ms'], stats['max_ms'])
+                    into['queries'] += stats['queries']
+                    into['buckets'] = [a + b for a, b in zip(into['buckets'], stats['buckets'])]
+                    for phase in PHASES:
+                        into['phases_ms'][phase] += stats['phases_ms'][phase]
+        return merged
+
+
+histograms = Histograms(getattr(settings, 'PERFORMANCE_WINDOW_SECONDS', 300))
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    cls = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if cls is None:
+        return f'{func.__module__}.{func.__name__}'
+    actions = getattr(func, 'actions', None)
+    method = request.method.lower()
+    return f'{cls.__name__}.{actions.get(method, method) if actions else method}'
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_wrapper(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        timings_ms = {phase: seconds * 1000 for phase, seconds in metrics.timings.items()}
+        total_ms = total * 1000
+        app_ms = max(total_ms - sum(timings_ms.values()), 0.0)
+
+        if settings.PERFORMANCE_SERVER_TIMING:
+            entries = [f'db;dur={timings_ms["db"]:.1f};desc="{metrics.queries} queries"']
+            entries += [f'{phase};dur={timings_ms[phase]:.1f}' for phase in PHASES[1:] if timings_ms[phase]]
+            entries += [f'app;dur={app_ms:.1f}', f'total;dur={total_ms:.1f}']
+            response['Server-Timing'] = ', '.join(entries)
+
+        prometheus.observe_request(request, total, metrics.queries, metrics.connections)
+        endpoint = endpoint_name(request)
+        if endpoint is None:
+            return response
+        histograms.observe(endpoint, total_ms, metrics.queries, timings_ms)
+
+        budget = settings.QUERY_BUDGETS.get(endpoint)
+        if budget is not None and metrics.queries > budget:
+            message = f'{endpoint} ran {metrics.queries} queries (budget {budget}) for {request.method} {request.path}'
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -1,12 +1,14 @@
 """
 Supabase Authentication Middleware
 
-This middleware checks for Supabase authentication tokens and manages user sessions
+This middleware checks for Supabase authentication tokens and manages user sessions.
+Tokens are verified locally (signature, expiry, audience, issuer) against the
+cached project JWKS or JWT secret, see utils/supabase_jwt.py.
 """
 
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from utils.supabase_client import get_supabase_service
+from utils.supabase_jwt import get_jwt_verifier
 from django.contrib.auth import authenticate, login
 from django.conf import settings
 import jwt
@@ -49,17 +51,13 @@ class SupabaseAuthMiddleware(MiddlewareMixin):
                 'error': 'Invalid authorization header format. Expected "Bearer <token>".'
             }, status=401)
         
-        # Validate the token with Supabase
-        supabase_service = get_supabase_service()
-        client = supabase_service.get_client()
-        
+        # Validate the token locally; no round trip to Supabase Auth
         try:
-            # Verify the JWT token with Supabase
-            user = client.auth.get_user(token)
-            # At this point, we have a valid user from Supabase
-            # We could create/update a Django user based on the Supabase user
-            # or store the user data in the request for later use
-            request.supabase_user = user
+            claims = get_jwt_verifier().verify(token)
+            # At this point, we have a valid user from Supabase. The verified
+            # claims (sub, email, role, app_metadata, ...) stand in for the user
+            # object the Auth API used to return.
+            request.supabase_user = claims
         except Exception as e:
             return JsonResponse({
                 'error': f'Invalid or expired token: {str(e)}'
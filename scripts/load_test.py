@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Load test for the read-heavy endpoints: WSGI vs ASGI serving.
+
+Opens CONCURRENCY keep-alive connections per target and has each one send
+GET requests back to back for DURATION seconds, then prints throughput and
+latency percentiles per target. Only the standard library is used.
+
+    # two deployments of the same build, e.g. SERVER_MODE=wsgi on :8001
+    # and SERVER_MODE=asgi on :8002
+    python scripts/load_test.py --token "$JWT" --concurrency 500 \\
+        wsgi=http://127.0.0.1:8001/api/content/game/content/ \\
+        asgi=http://127.0.0.1:8002/api/content/game/content/
+
+500 connections need a higher open-file limit than the usual default
+(`ulimit -n 4096`) on both the client and the server.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns the status code."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    length, chunked, closing = 0, False, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+        elif name == 'connection' and value == 'close':
+            closing = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, closing
+
+
+async def client(url, headers, deadline, results):
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+        + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        + '\r\n'
+    ).encode()
+    reader = writer = None
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, port, ssl=parts.scheme == 'https' or None,
+                )
+            writer.write(request)
+            await writer.drain()
+            status, closing = await read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            results['errors'] += 1
+            closing = True
+        else:
+            results['latencies'].append(time.monotonic() - started)
+            results['statuses'][status] = results['statuses'].get(status, 0) + 1
+        if closing and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, concurrency, duration, headers):
+    results = {'latencies': [], 'statuses': {}, 'errors': 0}
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(client(url, headers, deadline, results) for _ in range(concurrency)))
+    results['elapsed'] = time.monotonic() - started
+    return results
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare throughput of WSGI and ASGI deployments')
+    parser.add_argument('targets', nargs='+', help='label=url, e.g. asgi=http://127.0.0.1:8002/api/content/game/content/')
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--token', help='JWT access token sent as a Bearer token')
+    args = parser.parse_args()
+
+    headers = {'Accept': 'application/json'}
+    if args.token:
+        headers['Authorization'] = f'Bearer {args.token}'
+
+    print(f"{'target':<10} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}  statuses")
+    for target in args.targets:
+        label, _, url = target.partition('=')
+        if not url:
+            label, url = target, target
+        results = asyncio.run(run(url, args.concurrency, args.duration, headers))
+        latencies = sorted(results['latencies'])
+        print(
+            f"{label:<10} {len(latencies):>9} {len(latencies) / results['elapsed']:>9.1f} "
+            f"{percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.1f} {results['errors']:>7}  {results['statuses']}"
+        )
+        if latencies:
+            print(f"{'':<10} mean {statistics.fmean(latencies) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Prometheus Metrics
+
+``/metrics`` serves these in the Prometheus text exposition format:
+
+- ``http_request_duration_seconds``: request latency per URL name and method
+- ``http_request_db_queries``: queries run per request, per URL name
+- ``content_workflow_transitions_total``: ContentItem transitions that committed
+- ``jwt_verification_seconds``: time to verify an access token, per verifier
+- ``jwt_token_cache_requests_total``: Supabase token cache hits and misses
+- ``db_connections_opened_total`` and ``db_connection_requests_total``: how
+  often a request had to open a database connection instead of reusing one
+
+Under gunicorn (deploy/gunicorn.conf.py) ``PROMETHEUS_MULTIPROC_DIR`` points at
+a temp directory where every worker writes its samples to its own files;
+``/metrics`` adds them up, so a scrape sees the whole server whichever worker
+answers it. Without the variable (runserver, tests) samples stay in the
+process. Nothing here talks to a Prometheus server, it only has to scrape.
+
+Requests are recorded by ``PerformanceMiddleware``; requests no URL matched are
+recorded as ``unmatched`` so unknown paths cannot create new series.
+"""
+
+import hmac
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Request latency', ['url_name', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+request_queries = Histogram(
+    'http_request_db_queries', 'Database queries run per request', ['url_name'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+workflow_transitions = Counter(
+    'content_workflow_transitions_total', 'ContentItem workflow transitions', ['transition'],
+)
+jwt_verification = Histogram(
+    'jwt_verification_seconds', 'Access token verification time', ['verifier'],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+token_cache_requests = Counter(
+    'jwt_token_cache_requests_total', 'Supabase token cache lookups', ['result'],
+)
+connections_opened = Counter(
+    'db_connections_opened_total', 'Database connections opened', ['alias'],
+)
+connection_requests = Counter(
+    'db_connection_requests_total', 'Requests that ran queries, by whether they opened a connection',
+    ['connection'],
+)
+
+
+def observe_request(request, duration, queries, connections):
+    match = getattr(request, 'resolver_match', None)
+    url_name = (match.view_name if match else None) or 'unmatched'
+    request_duration.labels(url_name, request.method).observe(duration)
+    request_queries.labels(url_name).observe(queries)
+    if queries:
+        connection_requests.labels('new' if connections else 'reused').inc()
+
+
+def count_transition(transition, count=1):
+    """Count ``transition`` once the surrounding transaction commits."""
+    transaction.on_commit(lambda: workflow_transitions.labels(transition).inc(count))
+
+
+def _registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return JsonResponse({'detail': 'Invalid or missing metrics token'}, status=403)
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
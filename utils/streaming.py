@@ -0,0 +1,39 @@
+"""
+Streaming Response Bodies
+
+Under ASGI, Django reads a synchronous ``StreamingHttpResponse`` iterator
+with ``sync_to_async(list)``: the whole body is built in memory before the
+first byte is sent. ``streaming_content`` hands such an iterator to the
+response as an async iterator instead, pulling one chunk at a time from the
+sync thread, so exports and file downloads stay constant-memory under
+``SERVER_MODE=asgi`` as they are under WSGI.
+
+Chunks are produced on the request's sync thread (``thread_sensitive``), so
+an iterator reading from a database cursor keeps using one connection.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_DONE = object()
+
+
+def is_asgi(request):
+    # DRF wraps the Django request
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def _aiterate(iterator):
+    iterator = iter(iterator)
+    try:
+        while (chunk := await sync_to_async(next)(iterator, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_content(request, iterator):
+    """``iterator`` as response content that streams under WSGI and ASGI alike."""
+    return _aiterate(iterator) if is_asgi(request) else iterator
@@ -0,0 +1,143 @@
+"""
+Local verification of Supabase Auth access tokens.
+
+Supabase signs access tokens either with the project's JWT secret (HS256) or
+with an asymmetric key published at ``/auth/v1/.well-known/jwks.json``. Both
+can be checked in-process, which avoids a network round trip to Supabase Auth
+on every API request:
+- the JWKS document is cached and refreshed periodically (and on unknown kid)
+- tokens that already passed verification are kept in a small TTL cache
+
+Verification time and token cache hits/misses are exported at ``/metrics``.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+
+from utils.metrics import jwt_verification, token_cache_requests
+
+
+class TokenCache:
+    """Bounded, thread-safe LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SupabaseJWTVerifier:
+    ASYMMETRIC_ALGORITHMS = ('RS256', 'ES256')
+
+    def __init__(self, url, jwt_secret=None, audience='authenticated',
+                 jwks_lifespan=600, cache_size=1024, cache_ttl=60, leeway=0):
+        self.url = url.rstrip('/')
+        self.issuer = f"{self.url}/auth/v1"
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.leeway = leeway
+        # PyJWKClient caches the key set for `lifespan` seconds and refetches
+        # it once when a token names a kid it has not seen (key rotation).
+        self.jwk_client = jwt.PyJWKClient(
+            f"{self.issuer}/.well-known/jwks.json",
+            cache_keys=True,
+            lifespan=jwks_lifespan,
+            timeout=5,
+        )
+        self.cache = TokenCache(max_size=cache_size, ttl=cache_ttl)
+
+    def verify(self, token):
+        """Return the token's claims, or raise ``jwt.InvalidTokenError``."""
+        started = time.perf_counter()
+        try:
+            return self._verify(token)
+        finally:
+            jwt_verification.labels('supabase').observe(time.perf_counter() - started)
+
+    def _verify(self, token):
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        claims = self.cache.get(cache_key)
+        token_cache_requests.labels('miss' if claims is None else 'hit').inc()
+        if claims is not None:
+            return claims
+
+        algorithm = jwt.get_unverified_header(token).get('alg')
+        if algorithm == 'HS256':
+            if not self.jwt_secret:
+                raise jwt.InvalidTokenError('HS256 token received but SUPABASE_JWT_SECRET is not set')
+            key = self.jwt_secret
+        elif algorithm in self.ASYMMETRIC_ALGORITHMS:
+            try:
+                key = self.jwk_client.get_signing_key_from_jwt(token).key
+            except jwt.PyJWKClientError as exc:
+                raise jwt.InvalidTokenError(str(exc)) from exc
+        else:
+            raise jwt.InvalidTokenError(f'Unsupported signing algorithm: {algorithm}')
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={'require': ['exp', 'sub']},
+        )
+        # Never serve a cached token past its own expiry.
+        self.cache.set(cache_key, claims, ttl=claims['exp'] - time.time())
+        return claims
+
+
+# Global instance shared by the middleware (one per worker process)
+jwt_verifier = None
+
+
+def get_jwt_verifier() -> SupabaseJWTVerifier:
+    """Get the Supabase JWT verifier, creating it if needed"""
+    global jwt_verifier
+    if jwt_verifier is None:
+        url = os.environ.get('SUPABASE_URL', getattr(settings, 'SUPABASE_URL', None))
+        if not url:
+            raise ValueError("SUPABASE_URL must be set in environment or settings")
+        jwt_verifier = SupabaseJWTVerifier(
+            url,
+            jwt_secret=os.environ.get('SUPABASE_JWT_SECRET', getattr(settings, 'SUPABASE_JWT_SECRET', None)),
+            audience=getattr(settings, 'SUPABASE_JWT_AUDIENCE', 'authenticated'),
+            jwks_lifespan=getattr(settings, 'SUPABASE_JWKS_CACHE_SECONDS', 600),
+            cache_size=getattr(settings, 'SUPABASE_TOKEN_CACHE_SIZE', 1024),
+            cache_ttl=getattr(settings, 'SUPABASE_TOKEN_CACHE_SECONDS', 60),
+        )
+    return jwt_verifier
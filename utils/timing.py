@@ -0,0 +1,85 @@
+"""
+Per-request Timing
+
+The request currently being served carries a ``RequestMetrics`` in the
+``request_metrics`` context variable (set by ``PerformanceMiddleware``), so
+code anywhere below the view can report where its time goes without a
+reference to the request:
+
+- ``timed(phase)`` adds the time spent in a block to ``auth``, ``serialize``
+  or ``render``;
+- an ``execute_wrapper`` installed on every connection counts queries and
+  their time as ``db``. The context variable follows the request onto the
+  worker threads async views run queries on.
+
+Outside a request (management commands, shell) all of this is a no-op.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.db.backends.signals import connection_created
+
+from utils import metrics as prometheus
+
+request_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+PHASES = ('db', 'auth', 'serialize', 'render')
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'connections', 'timings')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        # Connections opened while serving the request (0: reused a persistent one)
+        self.connections = 0
+        self.timings = dict.fromkeys(PHASES, 0.0)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to ``phase`` of the current request.
+
+    Queries run inside the block count as ``db`` only, so phases never overlap.
+    """
+    metrics = request_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started, db_before = time.perf_counter(), metrics.timings['db']
+    try:
+        yield
+    finally:
+        db_spent = metrics.timings['db'] - db_before
+        metrics.timings[phase] += time.perf_counter() - started - db_spent
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.timings['db'] += time.perf_counter() - started
+
+
+def install_wrapper(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _connection_opened(sender, connection, **kwargs):
+    install_wrapper(connection)
+    prometheus.connections_opened.labels(connection.alias).inc()
+    metrics = request_metrics.get()
+    if metrics is not None:
+        metrics.connections += 1
+
+
+connection_created.connect(_connection_opened)